@@ -1,5 +1,75 @@
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar, TypedDict
 from abc import ABC
+from enum import IntEnum
+
+
+class GatewayOpcode(IntEnum):
+    """
+    Opcodes of the Discord Gateway protocol.
+    """
+    DISPATCH = 0
+    HEARTBEAT = 1
+    IDENTIFY = 2
+    PRESENCE_UPDATE = 3
+    VOICE_STATE_UPDATE = 4
+    RESUME = 6
+    RECONNECT = 7
+    REQUEST_GUILD_MEMBERS = 8
+    INVALID_SESSION = 9
+    HELLO = 10
+    HEARTBEAT_ACK = 11
+
+class DispatchStats(TypedDict):
+    """
+    Gateway dispatch filtering metrics.
+
+    Attributes:
+        decoded (int): The number of messages which were fully JSON-decoded.
+        dropped (int): The number of dispatches dropped before decoding, having no handler.
+        unpeekable (int): The number of messages whose header could not be read without decoding.
+    """
+    decoded: int
+    dropped: int
+    unpeekable: int
+
+
+class ShardStats(TypedDict):
+    """
+    Metrics reported by one shard process.
+
+    Attributes:
+        shard_id (int): The shard's ID.
+        pid (int): The ID of the shard's process.
+        events (int): The number of dispatches received since the process started.
+        rate (float): Dispatches per second over the last reporting interval.
+        sequence (int | None): The last sequence number received.
+        latency (float | None): The last heartbeat round trip, in seconds.
+        resumable (bool): Whether the shard holds a session it can resume.
+    """
+    shard_id: int
+    pid: int
+    events: int
+    rate: float
+    sequence: int | None
+    latency: float | None
+    resumable: bool
+
+
+class TransportStats(TypedDict):
+    """
+    Gateway transport compression metrics.
+
+    Attributes:
+        messages (int): The number of complete messages decoded.
+        wire_bytes (int): The compressed bytes received.
+        decoded_bytes (int): The bytes after decompression.
+        ratio (float): Decoded bytes per wire byte.
+    """
+    messages: int
+    wire_bytes: int
+    decoded_bytes: int
+    ratio: float
+
 
 class EventPayload(ABC):
     pass
@@ -52,6 +122,187 @@ class IdentityEvent(EventPayload):
         self.presence = presence or {}
         self.intents = intents
 
+    def to_payload(self) -> dict[str, Any]:
+        """
+        Builds the `d` field of an IDENTIFY message.
+
+        Returns:
+            dict[str, Any]: The payload, omitting optional fields which are unset.
+        """
+        payload: dict[str, Any] = {
+            'token': self.token,
+            'properties': self.properties,
+            'compress': self.compress,
+            'large_threshold': self.large_threshold,
+            'intents': self.intents
+        }
+        if self.shard is not None:
+            payload['shard'] = list(self.shard)
+        if self.presence:
+            payload['presence'] = self.presence
+        return payload
+
+
+class ResumeEvent(EventPayload):
+    """
+    Replays the events missed since a disconnect on an existing session
+    """
+
+    __slots__ = (
+        'token',
+        'session_id',
+        'seq'
+    )
+
+    def __init__(
+            self,
+            token: str,
+            session_id: str,
+            seq: int | None
+    ) -> None:
+        """
+        Initializes a ResumeEvent instance.
+
+        Args:
+            token (str): The bot's token for authentication
+            session_id (str): The session ID received in the READY event
+            seq (int): The last sequence number received
+        """
+        self.token = token
+        self.session_id = session_id
+        self.seq = seq
+
+    def to_payload(self) -> dict[str, Any]:
+        """
+        Builds the `d` field of a RESUME message.
+
+        Returns:
+            dict[str, Any]: The payload.
+        """
+        return {
+            'token': self.token,
+            'session_id': self.session_id,
+            'seq': self.seq
+        }
+
+
+class ReadyEvent(EventPayload):
+    """
+    The session state sent once an IDENTIFY succeeds
+    """
+
+    __slots__ = (
+        'session_id',
+        'resume_gateway_url',
+        'user_id',
+        'username'
+    )
+
+    def __init__(
+            self,
+            session_id: str,
+            resume_gateway_url: str,
+            user_id: str | None = None,
+            username: str | None = None
+    ) -> None:
+        """
+        Initializes a ReadyEvent instance.
+
+        Args:
+            session_id (str): The session ID, used for resuming
+            resume_gateway_url (str): The gateway URL to resume on
+            user_id (str): The ID of the bot user (optional)
+            username (str): The name of the bot user (optional)
+        """
+        self.session_id = session_id
+        self.resume_gateway_url = resume_gateway_url
+        self.user_id = user_id
+        self.username = username
+
+    @classmethod
+    def from_payload(cls, d: dict[str, Any]) -> "ReadyEvent":
+        """
+        Builds a ReadyEvent from the `d` field of a READY dispatch.
+        """
+        user = d.get('user') or {}
+        return cls(
+            d['session_id'],
+            d['resume_gateway_url'],
+            user.get('id'),
+            user.get('username')
+        )
+
+
+class MessageCreateEvent(EventPayload):
+    """
+    A message sent in a channel the bot can see
+    """
+
+    __slots__ = (
+        'id',
+        'channel_id',
+        'guild_id',
+        'author_id',
+        'author_name',
+        'author_bot',
+        'content'
+    )
+
+    def __init__(
+            self,
+            id: str,
+            channel_id: str,
+            content: str,
+            author_id: str,
+            author_name: str,
+            author_bot: bool = False,
+            guild_id: str | None = None
+    ) -> None:
+        """
+        Initializes a MessageCreateEvent instance.
+
+        Args:
+            id (str): The message ID
+            channel_id (str): The ID of the channel the message was sent in
+            content (str): The message text, empty without the message content intent
+            author_id (str): The ID of the author
+            author_name (str): The username of the author
+            author_bot (bool): Whether the author is a bot (default is False)
+            guild_id (str): The ID of the guild, None for direct messages (optional)
+        """
+        self.id = id
+        self.channel_id = channel_id
+        self.content = content
+        self.author_id = author_id
+        self.author_name = author_name
+        self.author_bot = author_bot
+        self.guild_id = guild_id
+
+    @classmethod
+    def from_payload(cls, d: dict[str, Any]) -> "MessageCreateEvent":
+        """
+        Builds a MessageCreateEvent from the `d` field of a MESSAGE_CREATE dispatch.
+        """
+        author = d.get('author') or {}
+        return cls(
+            d['id'],
+            d['channel_id'],
+            d.get('content', ""),
+            author.get('id'),
+            author.get('username'),
+            author.get('bot', False),
+            d.get('guild_id')
+        )
+
+
+PAYLOAD_DECODERS: dict[str, Any] = {
+    'READY': ReadyEvent.from_payload,
+    'MESSAGE_CREATE': MessageCreateEvent.from_payload
+}
+"""
+Default decoders turning the `d` field of a dispatch into a typed payload, by event name.
+"""
+
 
 class GatewayEvent(Generic[PayloadType]):
     """
@@ -94,3 +345,40 @@ class GatewayEvent(Generic[PayloadType]):
         self.d = d
         self.s = s
         self.t = t
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "GatewayEvent":
+        """
+        Builds a GatewayEvent from a decoded gateway message.
+
+        Args:
+            payload (dict[str, Any]): The decoded message.
+
+        Returns:
+            GatewayEvent: The event.
+        """
+        return cls(
+            payload.get('op'),
+            payload.get('d'),
+            payload.get('s'),
+            payload.get('t')
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        """
+        Builds the message to send to the gateway.
+        Payload objects are converted through their own `to_payload`.
+
+        Returns:
+            dict[str, Any]: The message.
+        """
+        d = self.d.to_payload() if isinstance(self.d, EventPayload) else self.d
+        payload: dict[str, Any] = {'op': int(self.op), 'd': d}
+        if self.s is not None:
+            payload['s'] = self.s
+        if self.t is not None:
+            payload['t'] = self.t
+        return payload
+
+    def __repr__(self) -> str:
+        return f"GatewayEvent(op={self.op!r}, s={self.s!r}, t={self.t!r})"
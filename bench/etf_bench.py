@@ -0,0 +1,139 @@
+"""
+Compares gateway message decoding with JSON and ETF.
+
+Each capture is a JSON Lines file holding one gateway message per line, e.g.
+recorded from GatewayClient with a "*" handler. Without captures, a synthetic
+READY and a large GUILD_CREATE are used instead.
+
+Usage:
+    python bench/etf_bench.py [capture.jsonl ...] [--repeat N]
+"""
+from typing import Any, Callable
+from argparse import ArgumentParser
+from pathlib import Path
+from json import dumps, loads
+from time import perf_counter
+import tracemalloc
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import etf
+
+
+def synthetic_capture(members: int = 5000) -> list[dict[str, Any]]:
+    """
+    Builds a READY and a GUILD_CREATE shaped like the ones of a large guild.
+
+    Args:
+        members (int): The number of members and presences in the guild.
+
+    Returns:
+        list[dict[str, Any]]: The gateway messages.
+    """
+    ready = {
+        'op': 0, 's': 1, 't': "READY",
+        'd': {
+            'v': 10,
+            'session_id': "0123456789abcdef0123456789abcdef",
+            'resume_gateway_url': "wss://gateway-us-east1-b.discord.gg",
+            'user': {'id': 1100000000000000001, 'username': "orca", 'bot': True},
+            'guilds': [{'id': 1200000000000000000 + i, 'unavailable': True} for i in range(100)]
+        }
+    }
+    guild = {
+        'op': 0, 's': 2, 't': "GUILD_CREATE",
+        'd': {
+            'id': 1200000000000000000,
+            'name': "A large guild",
+            'member_count': members,
+            'channels': [
+                {'id': 1300000000000000000 + i, 'name': f"channel-{i}", 'type': 0, 'position': i, 'nsfw': False}
+                for i in range(200)
+            ],
+            'members': [
+                {
+                    'user': {'id': 1400000000000000000 + i, 'username': f"member{i}", 'global_name': None},
+                    'roles': [1500000000000000000 + i % 7],
+                    'joined_at': "2024-05-01T12:00:00.000000+00:00",
+                    'deaf': False,
+                    'mute': False
+                }
+                for i in range(members)
+            ],
+            'presences': [
+                {
+                    'user': {'id': 1400000000000000000 + i},
+                    'status': ("online", "idle", "dnd")[i % 3],
+                    'activities': [{'name': "something", 'type': 0}] if i % 4 == 0 else [],
+                    'client_status': {'desktop': "online"}
+                }
+                for i in range(members)
+            ]
+        }
+    }
+    return [ready, guild]
+
+
+def load_capture(path: Path) -> list[dict[str, Any]]:
+    """
+    Reads a JSON Lines capture of gateway messages.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [loads(line) for line in f if line.strip()]
+
+
+def measure(decode: Callable[[bytes], Any], frames: list[bytes], repeat: int) -> tuple[float, int]:
+    """
+    Times decoding every frame `repeat` times, then traces one pass for memory.
+
+    Returns:
+        tuple[float, int]: The best seconds per pass and the peak bytes allocated during one pass.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for frame in frames:
+            decode(frame)
+        best = min(best, perf_counter() - start)
+
+    tracemalloc.start()
+    for frame in frames:
+        decode(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("captures", nargs="*", type=Path, help="JSON Lines captures of gateway messages.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per decoder; the best is reported.")
+    args = parser.parse_args()
+
+    messages = [msg for path in args.captures for msg in load_capture(path)] or synthetic_capture()
+
+    json_frames = [dumps(msg, separators=(',', ':')).encode() for msg in messages]
+    etf_frames = [etf.py_dumps(msg) for msg in messages]
+    decoders: list[tuple[str, Callable[[bytes], Any], list[bytes]]] = [
+        ("json", loads, json_frames),
+        ("etf (pure Python)", etf.py_loads, etf_frames)
+    ]
+    if etf.ACCELERATED:
+        decoders.append(("etf (erlpack)", etf.loads, etf_frames))
+
+    print(f"{len(messages)} messages")
+    print(f"{'decoder':<20}{'encoded':>12}{'MB/s':>10}{'msgs/s':>12}{'peak MB':>10}")
+    for name, decode, frames in decoders:
+        size = sum(len(frame) for frame in frames)
+        seconds, peak = measure(decode, frames, args.repeat)
+        print(
+            f"{name:<20}{size:>12,}{size / seconds / 1e6:>10.1f}"
+            f"{len(frames) / seconds:>12,.0f}{peak / 1e6:>10.2f}"
+        )
+    if not etf.ACCELERATED:
+        print("erlpack is not installed; only the pure-Python ETF decoder was measured.")
+
+
+if __name__ == "__main__":
+    main()
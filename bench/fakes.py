@@ -0,0 +1,657 @@
+"""
+Local stand-ins for Ollama and Discord, for benchmarking ORCA offline.
+
+FakeOllama serves the parts of the Ollama API the bot uses, generating
+tokens at a configurable rate. FakeDiscord serves the REST endpoints and the
+websocket gateway which discord.py and server_raw.GatewayClient talk to,
+including zlib-stream compression, ETF encoding and per-channel rate limits.
+"""
+from typing import Any, Final
+from asyncio import Future, Lock, Semaphore, get_running_loop, sleep
+from datetime import datetime, timezone
+from itertools import count
+from json import dumps, loads
+from re import compile as re_compile
+from time import monotonic, perf_counter, time
+import zlib
+
+from aiohttp import WSMsgType, web
+
+import etf
+
+API_PATH: Final[str] = "/api/v10"
+NANOSECONDS: Final[int] = 1_000_000_000
+
+_LOGIN = re_compile(r"username: (\S*) and password: (\S*)")
+_WORDS = (
+    "Orcas", "sleep", "with", "one", "half", "of", "the", "brain", "at", "a", "time,",
+    "and", "adults", "need", "seven", "to", "nine", "hours", "for", "good", "health."
+)
+
+
+def _json(data: Any, status: int = 200, headers: dict[str, str] | None = None) -> web.Response:
+    """
+    A JSON response without a charset, as discord.py only decodes an exact `application/json`.
+    """
+    return web.Response(body=dumps(data).encode(), status=status, headers=headers, content_type="application/json")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _text_tokens(tokens: int) -> list[str]:
+    """
+    Builds an answer of `tokens` tokens, with a paragraph break every forty.
+    """
+    return [
+        _WORDS[i % len(_WORDS)] + ("\n\n" if i % 40 == 39 else " ")
+        for i in range(tokens)
+    ]
+
+
+class FakeOllama:
+    """
+    Serves `/api/tags`, `/api/create`, `/api/generate` and `/api/chat`.
+    Chat answers are streamed as NDJSON or returned whole, after `first_token`
+    seconds of prompt evaluation and at `token_rate` tokens per second. At most
+    `parallel` requests generate at once, as with OLLAMA_NUM_PARALLEL; the rest queue.
+    A login turn is answered with a `login` tool call when `tool_calls` is set.
+    """
+    __slots__ = (
+        "MODEL",
+        "TOKENRATE",
+        "FIRSTTOKEN",
+        "TOKENS",
+        "THINKINGTOKENS",
+        "TOOLCALLS",
+        "LOADTIME",
+        "URL",
+        "_MODELS",
+        "_GPU",
+        "_LOADED",
+        "_RUNNER",
+        "_STATS"
+    )
+
+    def __init__(
+            self,
+            model: str = "ORCA",
+            token_rate: float = 50.0,
+            first_token: float = 0.2,
+            tokens: int = 48,
+            thinking_tokens: int = 8,
+            tool_calls: bool = True,
+            parallel: int = 4,
+            load_time: float = 0.0
+    ) -> None:
+        """
+        Initializes a FakeOllama instance.
+
+        Args:
+            model (str): The model reported as installed.
+            token_rate (float): Tokens generated per second, per request.
+            first_token (float): Seconds of prompt evaluation before the first token.
+            tokens (int): Tokens in every answer.
+            thinking_tokens (int): Thinking tokens generated first when thinking is requested.
+            tool_calls (bool): Whether login turns are answered with a tool call.
+            parallel (int): Requests generating at once.
+            load_time (float): Seconds the first request spends loading the model.
+        """
+        self.MODEL = model
+        self.TOKENRATE = token_rate
+        self.FIRSTTOKEN = first_token
+        self.TOKENS = tokens
+        self.THINKINGTOKENS = thinking_tokens
+        self.TOOLCALLS = tool_calls
+        self.LOADTIME = load_time
+        self.URL: str | None = None
+        self._MODELS: set[str] = {model}
+        self._GPU = Semaphore(max(1, parallel))
+        self._LOADED = False
+        self._RUNNER: web.AppRunner | None = None
+        self._STATS: dict[str, int] = {'requests': 0, 'tokens': 0, 'tool_calls': 0}
+
+    def stats(self) -> dict[str, int]:
+        return dict(self._STATS)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Starts serving.
+
+        Returns:
+            str: The base URL, for OLLAMA_HOST.
+        """
+        app = web.Application()
+        app.router.add_get("/api/tags", self._tags)
+        app.router.add_post("/api/create", self._create)
+        app.router.add_post("/api/generate", self._generate)
+        app.router.add_post("/api/chat", self._chat)
+        self._RUNNER = web.AppRunner(app, access_log=None)
+        await self._RUNNER.setup()
+        site = web.TCPSite(self._RUNNER, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.URL = f"http://{host}:{port}"
+        return self.URL
+
+    async def close(self) -> None:
+        if self._RUNNER is not None:
+            await self._RUNNER.cleanup()
+            self._RUNNER = None
+
+    async def _tags(self, request: web.Request) -> web.Response:
+        return _json({
+            'models': [
+                {
+                    'name': f"{name}:latest",
+                    'model': f"{name}:latest",
+                    'modified_at': _now(),
+                    'size': 0,
+                    'digest': "0" * 64,
+                    'details': {'format': "gguf", 'family': "fake", 'parameter_size': "0B"}
+                }
+                for name in sorted(self._MODELS)
+            ]
+        })
+
+    async def _create(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self._MODELS.add(body['model'])
+        return _json({'status': "success"})
+
+    def _load(self) -> float:
+        if self._LOADED: return 0.0
+        self._LOADED = True
+        return self.LOADTIME
+
+    async def _generate(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        load = self._load()
+        await sleep(load)
+        return _json({
+            'model': body.get('model', self.MODEL),
+            'created_at': _now(),
+            'response': "",
+            'done': True,
+            'done_reason': "load",
+            'load_duration': int(load * NANOSECONDS),
+            'total_duration': int(load * NANOSECONDS)
+        })
+
+    def _reply(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Picks the answer to a conversation: a tool call for a login turn, text otherwise.
+        """
+        last = messages[-1] if messages else {}
+        login = _LOGIN.search(last.get('content', "") or "")
+        if self.TOOLCALLS and last.get('role', None) == "user" and login:
+            self._STATS['tool_calls'] += 1
+            return {
+                'role': "assistant",
+                'content': "",
+                'tool_calls': [
+                    {
+                        'function': {
+                            'name': "login",
+                            'arguments': {'username': login.group(1), 'password': login.group(2)}
+                        }
+                    }
+                ]
+            }
+        return {'role': "assistant", 'content': "".join(_text_tokens(self.TOKENS))}
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get('model', self.MODEL)
+        messages = body.get('messages', [])
+        stream = body.get('stream', True)
+        thinking = self.THINKINGTOKENS if body.get('think', None) else 0
+        prompt_tokens = sum(len(message.get('content', "") or "") for message in messages) // 4
+        # A preload asks for a single token
+        limit = (body.get('options', None) or {}).get('num_predict', None)
+        reply = self._reply(messages)
+        tokens = [] if 'tool_calls' in reply else _text_tokens(self.TOKENS)
+        if limit is not None:
+            tokens = tokens[:limit]
+            reply['content'] = "".join(tokens)
+        self._STATS['requests'] += 1
+
+        queued = monotonic()
+        response: web.StreamResponse | None = None
+        async with self._GPU:
+            load = self._load()
+            await sleep(load + self.FIRSTTOKEN)
+            if stream:
+                response = web.StreamResponse(headers={'Content-Type': "application/x-ndjson"})
+                await response.prepare(request)
+
+            start = monotonic()
+            for i in range(thinking + len(tokens)):
+                if i: await sleep(1.0 / self.TOKENRATE)
+                if response is not None:
+                    message = {'role': "assistant", 'content': ""}
+                    if i < thinking:
+                        message['thinking'] = _WORDS[i % len(_WORDS)] + " "
+                    else:
+                        message['content'] = tokens[i - thinking]
+                    await response.write(dumps({
+                        'model': model, 'created_at': _now(), 'message': message, 'done': False
+                    }).encode() + b"\n")
+            generated = thinking + max(1, len(tokens))
+            self._STATS['tokens'] += generated
+
+        final = {
+            'model': model,
+            'created_at': _now(),
+            'message': reply if response is None else {
+                'role': "assistant",
+                'content': "",
+                **({'tool_calls': reply['tool_calls']} if 'tool_calls' in reply else {})
+            },
+            'done': True,
+            'done_reason': "stop",
+            'total_duration': int((monotonic() - queued) * NANOSECONDS),
+            'load_duration': int(load * NANOSECONDS),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(self.FIRSTTOKEN * NANOSECONDS),
+            'eval_count': generated,
+            'eval_duration': max(1, int((monotonic() - start) * NANOSECONDS))
+        }
+        if response is None:
+            return _json(final)
+        await response.write(dumps(final).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+
+class _Connection:
+    """
+    One gateway connection, with its own sequence and compression context.
+    """
+    __slots__ = ("WS", "ENCODING", "ZLIB", "SEQUENCE", "SESSIONID", "LOCK")
+
+    def __init__(self, ws: web.WebSocketResponse, encoding: str, compress: bool) -> None:
+        self.WS = ws
+        self.ENCODING = encoding
+        self.ZLIB = zlib.compressobj() if compress else None
+        self.SEQUENCE = 0
+        self.SESSIONID: str | None = None
+        self.LOCK = Lock()
+        """
+        Keeps compressing and sending one frame at a time, as the zlib stream is ordered.
+        """
+
+    async def send(self, op: int, d: Any = None, t: str | None = None) -> None:
+        # Discord sends the header fields first, which GatewayClient relies on to filter before parsing
+        payload: dict[str, Any] = {'t': t, 's': None, 'op': op, 'd': d}
+        async with self.LOCK:
+            if op == 0:
+                self.SEQUENCE += 1
+                payload['s'] = self.SEQUENCE
+            data = etf.dumps(payload) if self.ENCODING == "etf" else dumps(payload).encode()
+            if self.ZLIB is not None:
+                await self.WS.send_bytes(self.ZLIB.compress(data) + self.ZLIB.flush(zlib.Z_SYNC_FLUSH))
+            elif self.ENCODING == "etf":
+                await self.WS.send_bytes(data)
+            else:
+                await self.WS.send_str(data.decode())
+
+
+class FakeDiscord:
+    """
+    Serves a one-guild Discord: the REST endpoints for logging in, finding the
+    gateway and sending or editing messages, and a gateway at `/ws` which says
+    HELLO, answers IDENTIFY with READY and GUILD_CREATE, RESUME with RESUMED
+    and acknowledges heartbeats. Messages sent or edited in a channel count against
+    a bucket of `rate` per `per` seconds, answered with 429s once exhausted.
+    Events are sent to every identified connection with `dispatch`.
+    """
+    __slots__ = (
+        "TOKEN",
+        "CHANNELS",
+        "RATE",
+        "PER",
+        "HEARTBEAT",
+        "GUILDID",
+        "BOTUSER",
+        "URL",
+        "GATEWAYURL",
+        "_IDS",
+        "_CONNECTIONS",
+        "_BUCKETS",
+        "_WATCHERS",
+        "_RUNNER",
+        "_STATS"
+    )
+
+    def __init__(
+            self,
+            token: str,
+            channels: int = 1,
+            rate: int = 5,
+            per: float = 5.0,
+            heartbeat_interval: float = 41.25
+    ) -> None:
+        """
+        Initializes a FakeDiscord instance.
+
+        Args:
+            token (str): The only bot token accepted.
+            channels (int): Text channels in the guild.
+            rate (int): Messages a channel accepts per window, 0 for no limit.
+            per (float): The length of the rate-limit window, in seconds.
+            heartbeat_interval (float): The heartbeat interval sent in HELLO, in seconds.
+        """
+        self.TOKEN = token
+        self.RATE = rate
+        self.PER = per
+        self.HEARTBEAT = heartbeat_interval
+        self._IDS = count(1_100_000_000_000_000_000)
+        self.GUILDID = next(self._IDS)
+        self.BOTUSER: dict[str, Any] = {
+            'id': str(next(self._IDS)),
+            'username': "ORCA",
+            'discriminator': "0",
+            'global_name': None,
+            'avatar': None,
+            'bot': True,
+            'verified': True,
+            'mfa_enabled': False,
+            'flags': 0
+        }
+        self.CHANNELS: list[int] = [next(self._IDS) for _ in range(channels)]
+        self.URL: str | None = None
+        self.GATEWAYURL: str | None = None
+        self._CONNECTIONS: set[_Connection] = set()
+        self._BUCKETS: dict[int, list[float]] = {}
+        self._WATCHERS: dict[int, Future] = {}
+        self._RUNNER: web.AppRunner | None = None
+        self._STATS: dict[str, int] = {
+            'identifies': 0, 'resumes': 0, 'events': 0,
+            'messages': 0, 'edits': 0, 'rate_limited': 0
+        }
+
+    def stats(self) -> dict[str, int]:
+        return dict(self._STATS)
+
+    @property
+    def connections(self) -> int:
+        """
+        The number of identified gateway connections.
+        """
+        return sum(1 for connection in self._CONNECTIONS if connection.SESSIONID is not None)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Starts serving.
+
+        Returns:
+            str: The API base URL, e.g. for discord.http.Route.BASE.
+        """
+        app = web.Application()
+        app.router.add_get(f"{API_PATH}/users/@me", self._me)
+        app.router.add_get(f"{API_PATH}/oauth2/applications/@me", self._application)
+        app.router.add_get(f"{API_PATH}/gateway", self._gateway)
+        app.router.add_get(f"{API_PATH}/gateway/bot", self._gateway)
+        app.router.add_post(f"{API_PATH}/channels/{{channel_id}}/messages", self._create_message)
+        app.router.add_patch(f"{API_PATH}/channels/{{channel_id}}/messages/{{message_id}}", self._edit_message)
+        app.router.add_post(f"{API_PATH}/channels/{{channel_id}}/typing", self._typing)
+        app.router.add_get("/ws", self._websocket)
+        app.router.add_get("/ws/", self._websocket)
+        self._RUNNER = web.AppRunner(app, access_log=None)
+        await self._RUNNER.setup()
+        site = web.TCPSite(self._RUNNER, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.URL = f"http://{host}:{port}{API_PATH}"
+        self.GATEWAYURL = f"ws://{host}:{port}/ws/"
+        return self.URL
+
+    async def close(self) -> None:
+        for connection in list(self._CONNECTIONS):
+            await connection.WS.close()
+        if self._RUNNER is not None:
+            await self._RUNNER.cleanup()
+            self._RUNNER = None
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get('Authorization', None) == f"Bot {self.TOKEN}"
+
+    async def _me(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            return _json({'message': "401: Unauthorized", 'code': 0}, status=401)
+        return _json(self.BOTUSER)
+
+    async def _application(self, request: web.Request) -> web.Response:
+        return _json({
+            'id': self.BOTUSER['id'],
+            'name': "ORCA",
+            'icon': None,
+            'description': "",
+            'bot_public': False,
+            'bot_require_code_grant': False,
+            'verify_key': "0" * 64,
+            'flags': 0,
+            'owner': {**self.BOTUSER, 'bot': False}
+        })
+
+    async def _gateway(self, request: web.Request) -> web.Response:
+        return _json({
+            'url': self.GATEWAYURL,
+            'shards': 1,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}
+        })
+
+    async def _typing(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    def _limit(self, channel_id: int) -> tuple[dict[str, str], float | None]:
+        """
+        Takes one message from the channel's bucket.
+
+        Returns:
+            tuple[dict[str, str], float | None]: The rate-limit headers, and the seconds to
+                                                 retry after if the bucket was exhausted.
+        """
+        if not self.RATE: return {}, None
+        now = monotonic()
+        bucket = self._BUCKETS.get(channel_id, None)
+        if bucket is None or now >= bucket[0]:
+            bucket = self._BUCKETS[channel_id] = [now + self.PER, float(self.RATE)]
+        reset_after = bucket[0] - now
+        retry = reset_after if bucket[1] == 0 else None
+        if retry is None:
+            bucket[1] -= 1
+        headers = {
+            'X-RateLimit-Limit': str(self.RATE),
+            'X-RateLimit-Remaining': str(int(bucket[1])),
+            'X-RateLimit-Reset': f"{time() + reset_after:.3f}",
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}",
+            'X-RateLimit-Bucket': "channel-messages"
+        }
+        return headers, retry
+
+    def _message(self, channel_id: int, message_id: int, content: str, author: dict[str, Any]) -> dict[str, Any]:
+        return {
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'guild_id': str(self.GUILDID),
+            'author': author,
+            'content': content,
+            'timestamp': _now(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'components': [],
+            'pinned': False,
+            'type': 0,
+            'flags': 0
+        }
+
+    async def _write(self, request: web.Request, message_id: int | None) -> web.Response:
+        if not self._authorized(request):
+            return _json({'message': "401: Unauthorized", 'code': 0}, status=401)
+        channel_id = int(request.match_info['channel_id'])
+        headers, retry = self._limit(channel_id)
+        if retry is not None:
+            self._STATS['rate_limited'] += 1
+            return _json(
+                {'message': "You are being rate limited.", 'retry_after': retry, 'global': False},
+                status=429,
+                # discord.py takes a 429 without Via for a Cloudflare ban
+                headers={**headers, 'Retry-After': f"{retry:.3f}", 'X-RateLimit-Scope': "user", 'Via': "1.1 google"}
+            )
+
+        content = (await request.json()).get('content', "") or ""
+        if message_id is None:
+            self._STATS['messages'] += 1
+            message_id = next(self._IDS)
+        else:
+            self._STATS['edits'] += 1
+        watcher = self._WATCHERS.pop(channel_id, None)
+        if watcher is not None and not watcher.done():
+            watcher.set_result((perf_counter(), content))
+        return _json(self._message(channel_id, message_id, content, self.BOTUSER), headers=headers)
+
+    async def _create_message(self, request: web.Request) -> web.Response:
+        return await self._write(request, None)
+
+    async def _edit_message(self, request: web.Request) -> web.Response:
+        return await self._write(request, int(request.match_info['message_id']))
+
+    def watch(self, channel_id: int) -> Future:
+        """
+        Returns a future resolved with the time and content of the bot's next message to a channel,
+        sent or edited.
+        """
+        future = get_running_loop().create_future()
+        self._WATCHERS[channel_id] = future
+        return future
+
+    def _guild(self) -> dict[str, Any]:
+        guild_id = str(self.GUILDID)
+        return {
+            'id': guild_id,
+            'name': "ORCA load test",
+            'owner_id': self.BOTUSER['id'],
+            'icon': None,
+            'unavailable': False,
+            'large': False,
+            'member_count': 1,
+            'features': [],
+            'emojis': [],
+            'stickers': [],
+            'threads': [],
+            'presences': [],
+            'voice_states': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+            'roles': [
+                {
+                    'id': guild_id, 'name': "@everyone", 'permissions': "3072", 'position': 0,
+                    'color': 0, 'hoist': False, 'managed': False, 'mentionable': False, 'flags': 0
+                }
+            ],
+            'members': [{'user': self.BOTUSER, 'roles': [], 'joined_at': _now(), 'deaf': False, 'mute': False, 'flags': 0}],
+            'channels': [
+                {
+                    'id': str(channel_id), 'type': 0, 'name': f"load-{i}", 'position': i,
+                    'guild_id': guild_id, 'permission_overwrites': [], 'nsfw': False
+                }
+                for i, channel_id in enumerate(self.CHANNELS)
+            ]
+        }
+
+    def user(self, index: int) -> dict[str, Any]:
+        """
+        The user object of simulated user `index`.
+        """
+        return {
+            'id': str(1_300_000_000_000_000_000 + index),
+            'username': f"user{index}",
+            'discriminator': "0",
+            'global_name': None,
+            'avatar': None
+        }
+
+    async def message_create(self, channel_id: int, user: dict[str, Any], content: str) -> None:
+        """
+        Sends a MESSAGE_CREATE from a user to every identified connection.
+        """
+        data = self._message(channel_id, next(self._IDS), content, user)
+        data['member'] = {'roles': [], 'joined_at': _now(), 'deaf': False, 'mute': False, 'flags': 0}
+        await self.dispatch("MESSAGE_CREATE", data)
+
+    async def dispatch(self, event: str, data: Any) -> None:
+        """
+        Sends a dispatch event to every identified connection.
+        """
+        for connection in list(self._CONNECTIONS):
+            if connection.SESSIONID is None: continue
+            self._STATS['events'] += 1
+            try:
+                await connection.send(0, data, event)
+            except ConnectionError:
+                self._CONNECTIONS.discard(connection)
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0, compress=False)
+        await ws.prepare(request)
+        connection = _Connection(
+            ws,
+            request.query.get('encoding', "json"),
+            request.query.get('compress', None) == "zlib-stream"
+        )
+        self._CONNECTIONS.add(connection)
+        try:
+            await connection.send(10, {'heartbeat_interval': int(self.HEARTBEAT * 1000)})
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    payload = loads(msg.data)
+                elif msg.type == WSMsgType.BINARY:
+                    payload = etf.loads(msg.data) if connection.ENCODING == "etf" else loads(msg.data)
+                else:
+                    break
+                await self._receive(connection, payload)
+        finally:
+            self._CONNECTIONS.discard(connection)
+        return ws
+
+    async def _receive(self, connection: _Connection, payload: dict[str, Any]) -> None:
+        op, d = payload.get('op', None), payload.get('d', None)
+        if op == 1:
+            await connection.send(11)
+        elif op == 2:
+            if d.get('token', None) not in (self.TOKEN, f"Bot {self.TOKEN}"):
+                await connection.WS.close(code=4004, message=b"Authentication failed.")
+                return
+            self._STATS['identifies'] += 1
+            connection.SESSIONID = f"session-{next(self._IDS)}"
+            await connection.send(0, {
+                'v': 10,
+                'user': self.BOTUSER,
+                'guilds': [{'id': str(self.GUILDID), 'unavailable': True}],
+                'session_id': connection.SESSIONID,
+                'resume_gateway_url': self.GATEWAYURL,
+                'shard': d.get('shard', [0, 1]),
+                'application': {'id': self.BOTUSER['id'], 'flags': 0}
+            }, "READY")
+            await connection.send(0, self._guild(), "GUILD_CREATE")
+        elif op == 6:
+            self._STATS['resumes'] += 1
+            connection.SESSIONID = d.get('session_id', None)
+            connection.SEQUENCE = d.get('seq', None) or 0
+            await connection.send(0, {}, "RESUMED")
+        elif op == 8:
+            await connection.send(0, {
+                'guild_id': str(self.GUILDID),
+                'members': self._guild()['members'],
+                'chunk_index': 0,
+                'chunk_count': 1,
+                'nonce': d.get('nonce', None)
+            }, "GUILD_MEMBERS_CHUNK")
@@ -0,0 +1,167 @@
+"""
+Cold import time of ORCA's modules: a `python -X importtime` report and a budget check.
+
+Every measurement imports the module in a fresh interpreter, as a restart of
+the bot does. `report` shows where the time goes, by module and by top-level
+package. `check` fails when a module takes longer than its budget, or when
+it loads a dependency which is meant to load lazily, on first use.
+
+Usage:
+    python bench/imports.py report [MODULE] [--top 25]
+    python bench/imports.py check [--runs 5] [--scale 1.0]
+"""
+from typing import NamedTuple
+from argparse import ArgumentParser
+from pathlib import Path
+from statistics import median
+import os
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+
+BUDGETS: dict[str, float] = {
+    "llm": 20.0,
+    "llm_stuff": 150.0,
+    "server": 800.0
+}
+"""
+Milliseconds each module may take to import cold, dependencies included.
+discord.py accounts for most of `server`.
+"""
+
+LAZY: tuple[str, ...] = (
+    "ollama",
+    "pydantic",
+    "httpx",
+    "jwt",
+    "dotenv"
+)
+"""
+Dependencies which must not load at import: ollama and pydantic load with the
+model's warm-up, jwt when the login tool runs, dotenv with the environment.
+"""
+
+
+class Entry(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def profile(module: str) -> tuple[list[Entry], set[str]]:
+    """
+    Imports a module in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        tuple[list[Entry], set[str]]: The import time entries, in the order
+                                      imports finished, and the loaded modules.
+    """
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPROFILEIMPORTTIME"}
+    result = subprocess.run(
+        [
+            sys.executable, "-X", "importtime", "-c",
+            f"import sys, {module}; print(' '.join(sys.modules))"
+        ],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"): continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit(): continue
+        entries.append(Entry(
+            module=name.strip(),
+            depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us)
+        ))
+    # The module may print while importing, the loaded modules are the last line
+    lines = result.stdout.strip().splitlines()
+    loaded = set(lines[-1].split()) if lines else set()
+    return entries, loaded
+
+
+def total_ms(entries: list[Entry], module: str) -> float:
+    """
+    The cumulative import time of a module, in milliseconds.
+    """
+    for entry in reversed(entries):
+        if entry.module == module and entry.depth == 0:
+            return entry.cumulative_us / 1e3
+    # Already imported by the interpreter's startup
+    return 0.0
+
+
+def report(module: str, top: int) -> int:
+    entries, loaded = profile(module)
+    print(f"import {module}: {total_ms(entries, module):.1f} ms cold, {len(loaded)} modules loaded\n")
+
+    print(f"{'cumulative':>11}{'self':>9}  module (the {top} slowest)")
+    for entry in sorted(entries, key=lambda entry: entry.cumulative_us, reverse=True)[:top]:
+        print(f"{entry.cumulative_us / 1e3:>8.1f} ms{entry.self_us / 1e3:>6.1f} ms  {'  ' * entry.depth}{entry.module}")
+
+    packages: dict[str, int] = {}
+    for entry in entries:
+        package = entry.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + entry.self_us
+    print(f"\n{'self':>11}  package (the {top} slowest)")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{self_us / 1e3:>8.1f} ms  {package}")
+
+    eager = [name for name in LAZY if name in loaded]
+    if eager:
+        print(f"\nloaded although lazy: {', '.join(eager)}")
+    return 0
+
+
+def check(runs: int, scale: float) -> int:
+    failures: list[str] = []
+    print(f"{'module':<12}{'median':>11}{'budget':>11}")
+    for module, budget in BUDGETS.items():
+        times = []
+        for _ in range(runs):
+            entries, loaded = profile(module)
+            times.append(total_ms(entries, module))
+        milliseconds = median(times)
+        budget *= scale
+        flag = ""
+        if milliseconds > budget:
+            failures.append(f"{module} took {milliseconds:.1f} ms, over its budget of {budget:.0f} ms")
+            flag = "  OVER BUDGET"
+        print(f"{module:<12}{milliseconds:>8.1f} ms{budget:>8.0f} ms{flag}")
+
+        eager = [name for name in LAZY if name in loaded]
+        if eager:
+            failures.append(f"{module} loads {', '.join(eager)} at import")
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="Show where the import time of a module goes.")
+    report_parser.add_argument("module", nargs="?", default="server", help="The module to import.")
+    report_parser.add_argument("--top", type=int, default=25, help="Rows per table.")
+    check_parser = commands.add_parser("check", help="Fail when a module is over its import budget.")
+    check_parser.add_argument("--runs", type=int, default=5, help="Cold imports per module; the median is kept.")
+    check_parser.add_argument("--scale", type=float, default=1.0, help="Multiplies every budget, for slower machines.")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        return report(args.module, args.top)
+    return check(args.runs, args.scale)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
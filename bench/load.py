@@ -0,0 +1,414 @@
+"""
+End-to-end load test of ORCA against local fakes of Ollama and Discord.
+
+The fakes and the simulated users run in a separate process, so that their
+work does not compete with the bot for the interpreter. The bot runs in this
+process as it does in production: `server.py` on discord.py, or with
+`--client raw`, a bare server_raw.GatewayClient flooded with gateway events.
+
+Each simulated user has its own channel and issues `ORCA ask` or `ORCA login`
+commands one after the other. A request's first-reply latency lasts until the
+bot's first message or edit in the channel, its total latency until the command
+completed. Throughput, latency percentiles and memory are reported.
+
+Usage:
+    python bench/load.py [--users N] [--requests R] [--token-rate T] ...
+    python bench/load.py --client raw [--events E] [--encoding etf]
+"""
+from typing import Any
+from argparse import ArgumentParser, Namespace
+from contextlib import nullcontext, redirect_stdout
+from queue import Empty
+from multiprocessing import get_context
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter
+import asyncio
+import logging
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fakes import FakeDiscord, FakeOllama
+
+TOKEN = "load-test-token"
+QUANTILES = (0.5, 0.95, 0.99)
+NOISE = ("TYPING_START", "PRESENCE_UPDATE", "GUILD_MEMBER_UPDATE")
+
+
+def percentiles(samples: list[float]) -> list[float]:
+    if not samples: return [0.0 for _ in QUANTILES]
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES]
+
+
+def peak_rss() -> float:
+    """
+    Returns the peak resident memory of this process in MB, 0 where unknown.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- The fakes' process ---------------------------------------------------
+
+async def _user(
+        discord: FakeDiscord,
+        pending: dict[int, asyncio.Future],
+        index: int,
+        options: Namespace,
+        busy: str,
+        samples: list[dict[str, Any]]
+) -> None:
+    channel_id = discord.CHANNELS[index]
+    user = discord.user(index)
+    rng = Random(index)
+    for i in range(options.requests):
+        login = rng.random() < options.login_ratio
+        command = "login" if login else "ask"
+        content = (
+            f"ORCA login user{index} secret{i}" if login
+            else f"ORCA ask What is health fact {i} for user {index}?"
+        )
+        done = pending[channel_id] = asyncio.get_running_loop().create_future()
+        first = discord.watch(channel_id)
+        start = perf_counter()
+        await discord.message_create(channel_id, user, content)
+
+        sample: dict[str, Any] = {'command': command, 'status': "ok", 'first': None, 'total': None}
+        try:
+            ok = await asyncio.wait_for(done, options.timeout)
+            sample['total'] = perf_counter() - start
+            if not ok:
+                sample['status'] = "error"
+        except asyncio.TimeoutError:
+            sample['status'] = "timeout"
+        if first.done():
+            at, text = first.result()
+            sample['first'] = at - start
+            if text == busy:
+                sample['status'] = "busy"
+        else:
+            first.cancel()
+        samples.append(sample)
+        if options.think:
+            await asyncio.sleep(rng.uniform(0, 2 * options.think))
+
+
+async def _flood(discord: FakeDiscord, events: int, message_ratio: float) -> None:
+    channel_id = discord.CHANNELS[0]
+    rng = Random(0)
+    for i in range(events):
+        if rng.random() < message_ratio:
+            await discord.message_create(channel_id, discord.user(i % 100), f"message {i}")
+        else:
+            event = NOISE[i % len(NOISE)]
+            await discord.dispatch(event, {
+                'guild_id': str(discord.GUILDID),
+                'channel_id': str(channel_id),
+                'user': discord.user(i % 100),
+                'status': "online",
+                'activities': [],
+                'roles': [],
+                'timestamp': i
+            })
+    await discord.message_create(channel_id, discord.user(0), "__end__")
+
+
+async def _drive(options: Namespace, control: Any, results: Any) -> None:
+    ollama = FakeOllama(
+        token_rate=options.token_rate,
+        first_token=options.first_token,
+        tokens=options.tokens,
+        thinking_tokens=options.thinking_tokens,
+        tool_calls=not options.no_tool_calls,
+        parallel=options.parallel,
+        load_time=options.load_time
+    )
+    discord = FakeDiscord(TOKEN, channels=max(1, options.users), rate=options.rate_limit)
+    await ollama.start()
+    await discord.start()
+    results.put(("ready", ollama.URL, discord.URL, discord.GATEWAYURL))
+
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue = asyncio.Queue()
+
+    def read() -> None:
+        while True:
+            msg = control.get()
+            loop.call_soon_threadsafe(inbox.put_nowait, msg)
+            if msg[0] == "stop": return
+
+    Thread(target=read, name="control", daemon=True).start()
+    pending: dict[int, asyncio.Future] = {}
+    samples: list[dict[str, Any]] = []
+    users: asyncio.Future | None = None
+    start = perf_counter()
+    while True:
+        msg = await inbox.get()
+        if msg[0] == "start":
+            start = perf_counter()
+            users = asyncio.gather(*(
+                _user(discord, pending, index, options, msg[1], samples)
+                for index in range(options.users)
+            ))
+            users.add_done_callback(lambda _: inbox.put_nowait(("finished",)))
+        elif msg[0] == "flood":
+            start = perf_counter()
+            await _flood(discord, options.events, options.message_ratio)
+            results.put(("flooded", perf_counter() - start))
+        elif msg[0] == "done":
+            future = pending.pop(msg[1], None)
+            if future is not None and not future.done():
+                future.set_result(msg[2])
+        elif msg[0] == "finished":
+            results.put(("report", {
+                'seconds': perf_counter() - start,
+                'samples': samples,
+                'ollama': ollama.stats(),
+                'discord': discord.stats()
+            }))
+        elif msg[0] == "stop":
+            break
+
+    await discord.close()
+    await ollama.close()
+
+
+def drive(options: Namespace, control: Any, results: Any) -> None:
+    """
+    Entry point of the fakes' process.
+    """
+    asyncio.run(_drive(options, control, results))
+
+
+# --- The bot's process ----------------------------------------------------
+
+async def run_bot(options: Namespace, control: Any, results: Any) -> dict[str, Any]:
+    """
+    Runs server.py against the fakes until every simulated user is done.
+    """
+    # The bot's modules read their configuration at import, after the fakes are up
+    import discord
+    import yarl
+    discord.http.Route.BASE = os.environ['DISCORD_API']
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.environ['DISCORD_GATEWAY'])
+
+    if options.verbose:
+        discord.utils.setup_logging()
+    else:
+        # Loggers without handlers would otherwise print their warnings to stderr
+        logging.getLogger().addHandler(logging.NullHandler())
+    quiet = nullcontext() if options.verbose else redirect_stdout(open(os.devnull, "w"))
+    with TemporaryDirectory() as directory, quiet:
+        import server
+        server.llm_stuff.SESSIONS_DIRECTORY = directory
+        server.CACHE.PATH = None
+        server.METRICS_PORT = options.metrics_port
+
+        async def completed(ctx: Any) -> None:
+            control.put(("done", ctx.channel.id, True))
+
+        async def failed(ctx: Any, error: Exception) -> None:
+            control.put(("done", ctx.channel.id, False))
+
+        server.orca.add_listener(completed, "on_command_completion")
+        server.orca.add_listener(failed, "on_command_error")
+
+        bot = asyncio.get_running_loop().create_task(server.start(TOKEN))
+        await server.READINESS.wait("login", "gateway", "preload")
+        startup = server.READINESS.summary()
+
+        if options.tracemalloc:
+            tracemalloc.start()
+        control.put(("start", server.BUSY_MESSAGE))
+        report = await asyncio.to_thread(_await, results, "report")
+        if options.tracemalloc:
+            report['heap_peak'] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+        report['startup'] = startup
+        report['sessions'] = len(server.llm_stuff.POOL)
+        report['scheduler'] = server.SCHEDULER.stats()
+        report['outbox'] = {'sent': server.OUTBOX.sent, 'dropped': server.OUTBOX.dropped}
+        report['spans'] = {
+            f"{command} {span}": server.METRICS.quantiles('orca_span_seconds', span=span, command=command)
+            for command in ("ask", "login")
+            for span in ("queue_wait", "first_token", "inference", "tools", "discord_send", "command")
+        }
+        await server.orca.close()
+        bot.cancel()
+    return report
+
+
+async def run_raw(options: Namespace, control: Any, results: Any) -> dict[str, Any]:
+    """
+    Floods a server_raw.GatewayClient with events and measures how fast it handles them.
+    """
+    from server_raw import GatewayClient
+    client = GatewayClient(
+        TOKEN,
+        url=os.environ['DISCORD_GATEWAY'],
+        compress=not options.no_compress,
+        encoding=options.encoding
+    )
+    handled = 0
+    end = asyncio.Event()
+
+    @client.on("MESSAGE_CREATE")
+    async def on_message(event: Any) -> None:
+        nonlocal handled
+        handled += 1
+        if event.d.content == "__end__":
+            end.set()
+
+    task = asyncio.get_running_loop().create_task(client.run())
+    while client.session_id is None:
+        await asyncio.sleep(0.05)
+
+    if options.tracemalloc:
+        tracemalloc.start()
+    start = perf_counter()
+    control.put(("flood",))
+    await end.wait()
+    seconds = perf_counter() - start
+    report: dict[str, Any] = {
+        'seconds': seconds,
+        'handled': handled,
+        'sent': await asyncio.to_thread(_await, results, "flooded"),
+        'dispatch': client.dispatch_stats(),
+        'transport': client.transport_stats()
+    }
+    if options.tracemalloc:
+        report['heap_peak'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    await client.close()
+    task.cancel()
+    return report
+
+
+def _await(results: Any, kind: str, timeout: float = 3600.0) -> Any:
+    """
+    Waits for a message of one kind from the fakes' process, polling so that the wait can be interrupted.
+    """
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            msg = results.get(timeout=0.5)
+        except Empty:
+            continue
+        if msg[0] == kind:
+            return msg[1]
+    raise TimeoutError(f"The fakes sent no {kind} within {timeout:.0f}s.")
+
+
+def print_bot_report(options: Namespace, report: dict[str, Any]) -> None:
+    samples = report['samples']
+    seconds = report['seconds']
+    print(f"{options.users} users, {len(samples)} requests in {seconds:.2f}s, {len(samples) / seconds:.2f} requests/s")
+    print(f"{'command':<8}{'count':>7}{'ok':>6}{'busy':>6}{'error':>7}{'timeout':>9}"
+          f"{'first p50':>11}{'p95':>8}{'p99':>8}{'total p50':>11}{'p95':>8}{'p99':>8}")
+    for command in ("ask", "login"):
+        mine = [sample for sample in samples if sample['command'] == command]
+        if not mine: continue
+        statuses = {status: sum(1 for s in mine if s['status'] == status) for status in ("ok", "busy", "error", "timeout")}
+        first = percentiles([s['first'] for s in mine if s['first'] is not None])
+        total = percentiles([s['total'] for s in mine if s['total'] is not None])
+        print(
+            f"{command:<8}{len(mine):>7}{statuses['ok']:>6}{statuses['busy']:>6}{statuses['error']:>7}"
+            f"{statuses['timeout']:>9}{first[0]:>11.3f}{first[1]:>8.3f}{first[2]:>8.3f}"
+            f"{total[0]:>11.3f}{total[1]:>8.3f}{total[2]:>8.3f}"
+        )
+
+    print("\nspans (p50 / p95 / p99 seconds)")
+    for name, values in report['spans'].items():
+        if values:
+            print(f"  {name:<24}" + " / ".join(f"{values[q]:.3f}" for q in QUANTILES))
+
+    scheduler = report['scheduler']
+    print(f"\nscheduler: admitted {scheduler['admitted']}, shed {scheduler['shed']}, "
+          f"wait p50 {scheduler['wait_p50']:.3f}s, p95 {scheduler['wait_p95']:.3f}s")
+    print(f"outbox: sent {report['outbox']['sent']}, dropped {report['outbox']['dropped']}; "
+          f"sessions: {report['sessions']}")
+    print(f"startup: {report['startup']}")
+    print(f"fake ollama: {report['ollama']}")
+    print(f"fake discord: {report['discord']}")
+
+
+def print_raw_report(options: Namespace, report: dict[str, Any]) -> None:
+    seconds = report['seconds']
+    transport = report['transport']
+    print(f"{options.events + 1} events ({options.encoding}, "
+          f"{'zlib-stream' if not options.no_compress else 'uncompressed'}) in {seconds:.2f}s, "
+          f"{(options.events + 1) / seconds:,.0f} events/s")
+    print(f"the fakes took {report['sent']:.2f}s to send them; near the total, the client kept up with the sender")
+    print(f"handled {report['handled']} MESSAGE_CREATE, dispatch {report['dispatch']}")
+    print(f"transport {transport}")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--client", choices=("bot", "raw"), default="bot", help="What to load: server.py or a raw GatewayClient.")
+    parser.add_argument("--users", type=int, default=8, help="Simulated users, each in its own channel.")
+    parser.add_argument("--requests", type=int, default=5, help="Commands each user issues.")
+    parser.add_argument("--login-ratio", type=float, default=0.2, help="The share of commands which are logins.")
+    parser.add_argument("--think", type=float, default=0.5, help="Mean seconds a user waits between commands.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a command counts as timed out.")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Tokens the fake model generates per second.")
+    parser.add_argument("--first-token", type=float, default=0.2, help="Seconds of prompt evaluation per request.")
+    parser.add_argument("--tokens", type=int, default=48, help="Tokens per answer.")
+    parser.add_argument("--thinking-tokens", type=int, default=8, help="Thinking tokens when thinking is requested.")
+    parser.add_argument("--parallel", type=int, default=4, help="Requests the fake model generates at once.")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Seconds the first request spends loading the model.")
+    parser.add_argument("--no-tool-calls", action="store_true", help="Answer logins with text instead of a tool call.")
+    parser.add_argument("--rate-limit", type=int, default=5, help="Messages per channel per 5 seconds, 0 for no limit.")
+    parser.add_argument("--events", type=int, default=20000, help="Events flooded at the raw client.")
+    parser.add_argument("--message-ratio", type=float, default=0.2, help="The share of flooded events which are MESSAGE_CREATE.")
+    parser.add_argument("--encoding", choices=("json", "etf"), default="json", help="The raw client's gateway encoding.")
+    parser.add_argument("--no-compress", action="store_true", help="Turn off the raw client's zlib-stream compression.")
+    parser.add_argument("--metrics-port", type=int, default=9465, help="Where the bot serves its metrics during the run.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also trace the bot's Python heap; slows the bot down.")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's output.")
+    options = parser.parse_args()
+
+    # Spawned like the shards, so the fakes start from a clean interpreter
+    context = get_context("spawn")
+    control, results = context.Queue(), context.Queue()
+    fakes = context.Process(target=drive, args=(options, control, results), name="fakes", daemon=True)
+    fakes.start()
+    _, ollama_url, api_url, gateway_url = results.get(timeout=30)
+
+    os.environ.update({
+        'OLLAMA_HOST': ollama_url,
+        'DISCORD_API': api_url,
+        'DISCORD_GATEWAY': gateway_url,
+        'TOKEN': TOKEN,
+        'CLIENT_ID': "0",
+        'CLIENT_SECRET': "load-test-secret-of-at-least-32-bytes",
+        'CODE': "load-test",
+        'REDIRECT': "http://127.0.0.1/"
+    })
+    try:
+        if options.client == "bot":
+            report = asyncio.run(run_bot(options, control, results))
+            print_bot_report(options, report)
+        else:
+            report = asyncio.run(run_raw(options, control, results))
+            print_raw_report(options, report)
+        if 'heap_peak' in report:
+            print(f"python heap peak during load: {report['heap_peak']:.1f} MB")
+        print(f"peak RSS of the {options.client} process: {peak_rss():.1f} MB")
+    finally:
+        control.put(("stop",))
+        fakes.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Microbenchmarks of the helpers ORCA runs on every message, with a regression check.
+
+Every benchmark times one call of a helper on a realistic input, such as a
+10k-message history or a 100KB model response. The best time per call of
+several repeats is compared against the baseline stored in
+bench/baseline.json; a run fails when any helper got slower than the
+baseline by more than the threshold. Times are compared relative to a
+fixed calibration workload, which absorbs most of the difference in
+speed between machines and runs; a baseline recorded on the machine which
+runs the check is still the most reliable.
+
+Usage:
+    python bench/micro.py [--filter NAME] [--threshold 0.25]
+    python bench/micro.py --save    # records the current results as the baseline
+"""
+from typing import Any, Callable
+from argparse import ArgumentParser
+from pathlib import Path
+from json import dumps, load, dump
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import os
+import platform
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# The bot's modules require their configuration at import
+for key, value in {
+    'TOKEN': "bench-token",
+    'CLIENT_ID': "0",
+    'CLIENT_SECRET': "bench-secret-of-at-least-32-bytes",
+    'CODE': "bench",
+    'REDIRECT': "http://127.0.0.1/"
+}.items():
+    os.environ.setdefault(key, value)
+
+from ollama import Message
+
+from utils import read_json, remove_think_tags_section, write_json
+from llm import BotSession, create_error_response, handle_tool_calls
+from server_raw import GatewayClient, GatewayEvent
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+HISTORY = 10_000
+RESPONSE_BYTES = 100_000
+
+Benchmark = Callable[[Path], Callable[[], Any]]
+"""
+Builds the inputs of a benchmark in a scratch directory and returns the timed call.
+"""
+
+
+def history(count: int = HISTORY) -> list[dict[str, Any]]:
+    """
+    A conversation of alternating questions and answers of realistic length.
+    """
+    return [
+        {
+            'role': "user" if i % 2 == 0 else "assistant",
+            'content': (f"Question {i}: how much sleep does an adult need? " * 2) if i % 2 == 0
+            else (f"Answer {i}: seven to nine hours, according to most guidelines. " * 6)
+        }
+        for i in range(count)
+    ]
+
+
+def prefix() -> list[dict[str, Any]]:
+    return [{'role': "system", 'content': f"System prompt {i}. " * 200} for i in range(4)]
+
+
+def response(size: int = RESPONSE_BYTES, closed: bool = True) -> str:
+    """
+    A model response of about `size` characters with thinking sections between paragraphs.
+    """
+    paragraph = "Orcas sleep with one half of the brain at a time. " * 20 + "\n\n\n"
+    think = "<think>\nThe user asks about sleep, answer briefly.\n</think>\n"
+    parts = []
+    while sum(map(len, parts)) < size:
+        parts.append(think if len(parts) % 4 == 0 else paragraph)
+    if not closed:
+        parts.append("<think>\nStill thinking when the stream was cut")
+    return "".join(parts)
+
+
+def _session(directory: Path, messages: list[dict[str, Any]] | None = None) -> BotSession:
+    logfile = directory / "session.json"
+    if messages is not None:
+        with open(logfile, "w", encoding="utf-8") as f:
+            dump(messages, f)
+    return BotSession(params="14b", logfile=str(logfile))
+
+
+def bench_think_tags(directory: Path) -> Callable[[], Any]:
+    text = response()
+    return lambda: remove_think_tags_section(text)
+
+
+def bench_think_tags_unclosed(directory: Path) -> Callable[[], Any]:
+    text = response(closed=False)
+    return lambda: remove_think_tags_section(text)
+
+
+def bench_error_response(directory: Path) -> Callable[[], Any]:
+    errors = [
+        {'title': "Missing Username", 'detail': "You must provide a username to login.", 'status': 400, 'meta': None},
+        {'title': "Missing Password", 'detail': "You must provide a password to login.", 'status': 400, 'meta': None}
+    ]
+    warnings = [{'title': "Deprecated", 'detail': "The method argument is ignored.", 'status': 299, 'meta': None}]
+    return lambda: create_error_response(errors, warnings)
+
+
+def bench_tool_calls(directory: Path) -> Callable[[], Any]:
+    message = Message(
+        role="assistant",
+        content="",
+        tool_calls=[
+            Message.ToolCall(function=Message.ToolCall.Function(
+                name="login", arguments={'username': "user", 'password': "secret"}
+            )),
+            Message.ToolCall(function=Message.ToolCall.Function(
+                name="generate_random_string", arguments={'length': 32}
+            ))
+        ]
+    )
+    return lambda: handle_tool_calls(message)
+
+
+def bench_write_json(directory: Path) -> Callable[[], Any]:
+    data = {'messages': history()}
+    path = directory / "history.json"
+    return lambda: write_json(path, data)
+
+
+def bench_read_json(directory: Path) -> Callable[[], Any]:
+    path = directory / "history.json"
+    write_json(path, {'messages': history()})
+    return lambda: read_json(path)
+
+
+def bench_load_messages(directory: Path) -> Callable[[], Any]:
+    session = _session(directory, history())
+    defaults = prefix()
+    return lambda: session.load_messages(defaults)
+
+
+def bench_prepend_present(directory: Path) -> Callable[[], Any]:
+    # The prefix sits at the end, so every membership check scans the whole history
+    session = _session(directory, [*history(), *prefix()])
+    defaults = prefix()
+    return lambda: session.prepend_messages(defaults)
+
+
+def bench_gateway_dispatch(directory: Path) -> Callable[[], Any]:
+    client = GatewayClient("bench-token", compress=False)
+
+    @client.on("MESSAGE_CREATE")
+    async def on_message(event: GatewayEvent) -> None:
+        pass
+
+    raw = dumps({
+        't': "MESSAGE_CREATE", 's': 42, 'op': 0,
+        'd': {
+            'id': "1100000000000000100", 'channel_id': "1100000000000000002", 'guild_id': "1100000000000000000",
+            'content': "ORCA ask How much sleep does an adult need?",
+            'author': {'id': "1300000000000000000", 'username': "user0", 'bot': False},
+            'mentions': [], 'attachments': [], 'embeds': [], 'timestamp': "2025-01-01T00:00:00+00:00"
+        }
+    })
+    return lambda: client._decode(raw)
+
+
+def bench_gateway_dropped(directory: Path) -> Callable[[], Any]:
+    client = GatewayClient("bench-token", compress=False)
+    raw = dumps({
+        't': "PRESENCE_UPDATE", 's': 43, 'op': 0,
+        'd': {'user': {'id': "1300000000000000000"}, 'status': "online", 'activities': [], 'guild_id': "1100000000000000000"}
+    })
+    return lambda: client._decode(raw)
+
+
+def bench_gateway_event(directory: Path) -> Callable[[], Any]:
+    payload = {'t': "READY", 's': 1, 'op': 0, 'd': {'session_id': "0123456789abcdef"}}
+    return lambda: GatewayEvent.from_payload(payload)
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "remove_think_tags_section 100KB": bench_think_tags,
+    "remove_think_tags_section 100KB unclosed": bench_think_tags_unclosed,
+    "create_error_response": bench_error_response,
+    "handle_tool_calls login+random": bench_tool_calls,
+    "write_json 10k messages": bench_write_json,
+    "read_json 10k messages": bench_read_json,
+    "BotSession.load_messages 10k": bench_load_messages,
+    "BotSession.prepend_messages 10k": bench_prepend_present,
+    "GatewayClient._decode MESSAGE_CREATE": bench_gateway_dispatch,
+    "GatewayClient._decode dropped": bench_gateway_dropped,
+    "GatewayEvent.from_payload": bench_gateway_event
+}
+
+
+def measure(call: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """
+    Times a call, looping it until one pass lasts `min_time` seconds.
+
+    Returns:
+        float: The best seconds per call over `repeat` passes.
+    """
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = perf_counter() - start
+        if elapsed >= min_time: break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(number):
+            call()
+        best = min(best, (perf_counter() - start) / number)
+    return best
+
+
+def calibration() -> Callable[[], Any]:
+    """
+    A fixed pure-Python workload, timed with every run to factor out the speed of the machine.
+    """
+    data = [{'id': i, 'name': f"item{i}", 'tags': ["a", "b"]} for i in range(200)]
+    return lambda: sorted(dumps(item) for item in data)
+
+
+def _unit(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown over the baseline, 0.25 for 25%%.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes per benchmark; the best is kept.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds of one timed pass.")
+    parser.add_argument("--confirm", type=int, default=2, help="Extra measurements of a benchmark which looks regressed.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="The baseline file.")
+    parser.add_argument("--save", action="store_true", help="Record the results as the new baseline.")
+    args = parser.parse_args()
+
+    baseline: dict[str, float] = {}
+    reference: float | None = None
+    if args.baseline.exists():
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = load(f)
+        baseline = stored['results']
+        reference = stored.get('calibration', None)
+
+    calibrated = measure(calibration(), args.repeat, args.min_time)
+    # Baseline times scaled to this run's machine speed
+    speed = calibrated / reference if reference else 1.0
+    print(f"calibration {_unit(calibrated).strip()}, {speed:.2f}x the baseline's")
+
+    results: dict[str, float] = {}
+    regressions: list[str] = []
+    print(f"{'benchmark':<44}{'per call':>12}{'baseline':>12}{'change':>9}")
+    for name, benchmark in BENCHMARKS.items():
+        if args.filter not in name: continue
+        before = baseline.get(name, None)
+        with TemporaryDirectory() as directory:
+            call = benchmark(Path(directory))
+            seconds = measure(call, args.repeat, args.min_time)
+            # A suspected regression is measured again, so that one noisy pass does not fail the run
+            for _ in range(args.confirm):
+                if before is None or seconds <= before * speed * (1.0 + args.threshold): break
+                seconds = min(seconds, measure(call, args.repeat, args.min_time))
+        results[name] = seconds
+
+        if before is None:
+            print(f"{name:<44}{_unit(seconds):>12}{'-':>12}{'new':>9}")
+            continue
+        before *= speed
+        change = seconds / before - 1.0
+        flag = ""
+        if change > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<44}{_unit(seconds):>12}{_unit(before):>12}{change:>+9.1%}{flag}")
+
+    if args.save:
+        # Benchmarks left out by the filter keep their old baseline
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            dump({
+                'python': platform.python_version(),
+                'machine': f"{platform.system()} {platform.machine()}",
+                'calibration': calibrated,
+                # Kept baselines are rescaled to the new calibration
+                'results': {**{name: seconds * speed for name, seconds in baseline.items()}, **results}
+            }, f, indent=4)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
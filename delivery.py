@@ -0,0 +1,262 @@
+from discord import (
+    HTTPException,
+    Message
+)
+
+from discord.abc import Messageable
+
+from typing import Iterable
+from collections import deque
+from time import monotonic
+from re import compile as re_compile, MULTILINE
+import asyncio
+
+from utils import LOGGER
+from streaming import MESSAGE_LIMIT
+
+FENCE_CLOSE = "\n```"
+
+_FENCE = re_compile(r"^\s*```.*$", MULTILINE)
+_SEPARATORS = ("\n\n", "\n", " ")
+
+
+def _open_fence(text: str) -> str | None:
+    """
+    Returns the opening line of the code block still open at the end of text, if any.
+    """
+    opener = None
+    for match in _FENCE.finditer(text):
+        opener = match.group(0).strip() if opener is None else None
+    return opener
+
+
+def _boundary(text: str, budget: int) -> int:
+    """
+    Finds the best place to cut text within budget: a paragraph break, then a
+    line break, then a space, as long as the head keeps a quarter of the budget.
+    """
+    for separator in _SEPARATORS:
+        cut = text.rfind(separator, 0, budget)
+        if cut > budget // 4:
+            return cut
+    return budget
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    Splits text into messages no longer than limit, on markdown boundaries.
+    Paragraph breaks are preferred over line breaks, and line breaks over spaces.
+    A code block cut in two is closed at the end of one message and reopened,
+    with its language, at the start of the next, so both render as code.
+
+    Args:
+        text (str): The text to split.
+        limit (int): The maximum length of a message.
+
+    Returns:
+        list[str]: The messages, in order. Empty when the text is blank.
+    """
+    chunks: list[str] = []
+    opener: str | None = None
+    rest = text.strip()
+    while rest:
+        prefix = f"{opener}\n" if opener else ""
+        if len(prefix) + len(rest) <= limit:
+            chunks.append(prefix + rest)
+            break
+
+        # Room is kept for closing a code block the cut may land in
+        cut = _boundary(rest, limit - len(prefix) - len(FENCE_CLOSE))
+        chunk = (prefix + rest[:cut]).rstrip()
+        opener = _open_fence(chunk)
+        if opener:
+            chunk += FENCE_CLOSE
+            # Indentation inside the code block is kept
+            rest = rest[cut:].lstrip("\n")
+        else:
+            rest = rest[cut:].lstrip()
+        chunks.append(chunk)
+    return chunks
+
+
+def _channel_key(destination: Messageable) -> int:
+    channel = getattr(destination, 'channel', destination)
+    return getattr(channel, 'id', id(channel))
+
+
+class _Delivery:
+    __slots__ = ("DESTINATION", "CHUNKS", "FUTURE", "QUEUEDAT")
+
+    def __init__(self, destination: Messageable, chunks: list[str], future: asyncio.Future) -> None:
+        self.DESTINATION = destination
+        self.CHUNKS = chunks
+        self.FUTURE = future
+        self.QUEUEDAT = monotonic()
+
+
+class Outbox:
+    """
+    Outbound delivery layer for replies and announcements.
+    Text is split into messages with `split_message` and queued per channel.
+    Each channel has a worker which sends its queue in order, pipelining the
+    chunks of a reply back to back while staying within the channel's send
+    limit of `rate` messages per `per` seconds; channels are served concurrently.
+    A reply whose `send` was cancelled, e.g. because the command was, is dropped
+    along with its unsent chunks, as are replies queued for longer than `stale_after`.
+    A failed send fails only its own reply; the worker goes on with the next one.
+    Workers exit after `idle` seconds without work. Must be used from one event loop.
+    """
+    __slots__ = (
+        "RATE",
+        "PER",
+        "STALEAFTER",
+        "IDLE",
+        "_QUEUES",
+        "_WORKERS",
+        "_SENDS",
+        "_SENT",
+        "_DROPPED"
+    )
+
+    def __init__(
+            self,
+            rate: int = 5,
+            per: float = 5.0,
+            stale_after: float | None = 120.0,
+            idle: float = 60.0
+    ) -> None:
+        """
+        Initializes an Outbox instance.
+
+        Args:
+            rate (int): The number of messages a channel may receive per window.
+            per (float): The length of the window, in seconds.
+            stale_after (float | None): Seconds after which a queued reply is dropped, or None to never drop.
+            idle (float): Seconds after which an idle channel worker exits.
+        """
+        self.RATE = rate
+        self.PER = per
+        self.STALEAFTER = stale_after
+        self.IDLE = idle
+        self._QUEUES: dict[int, asyncio.Queue[_Delivery]] = {}
+        self._WORKERS: dict[int, asyncio.Task] = {}
+        self._SENDS: dict[int, deque[float]] = {}
+        """
+        Recent send times per channel, for the sliding-window send limit.
+        """
+        self._SENT = 0
+        self._DROPPED = 0
+
+    @property
+    def sent(self) -> int:
+        """
+        The number of messages sent.
+        """
+        return self._SENT
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of replies dropped as cancelled or stale.
+        """
+        return self._DROPPED
+
+    async def send(self, destination: Messageable, text: str) -> list[Message]:
+        """
+        Queues text for delivery and waits until it has been sent.
+        Cancelling the wait drops whatever has not been sent yet.
+
+        Args:
+            destination (Messageable): Where to send the text, e.g. a command context or a channel.
+            text (str): The text, of any length.
+
+        Returns:
+            list[Message]: The sent messages.
+
+        Raises:
+            HTTPException: If Discord rejected a message.
+            asyncio.TimeoutError: If the reply went stale in the queue and was dropped.
+            Exception: Whatever else failed the send, e.g. a connection error.
+        """
+        chunks = split_message(text)
+        if not chunks: return []
+        key = _channel_key(destination)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._QUEUES.get(key, None)
+        if queue is None:
+            queue = self._QUEUES[key] = asyncio.Queue()
+        queue.put_nowait(_Delivery(destination, chunks, future))
+
+        worker = self._WORKERS.get(key, None)
+        if worker is None or worker.done():
+            self._WORKERS[key] = asyncio.get_running_loop().create_task(self._work(key, queue))
+        return await future
+
+    async def broadcast(
+            self,
+            destinations: Iterable[Messageable],
+            text: str
+    ) -> list[list[Message] | BaseException]:
+        """
+        Sends the same text to many channels concurrently.
+
+        Args:
+            destinations (Iterable[Messageable]): The channels.
+            text (str): The text.
+
+        Returns:
+            list[list[Message] | BaseException]: Per channel, the sent messages or the error.
+        """
+        return await asyncio.gather(
+            *(self.send(destination, text) for destination in destinations),
+            return_exceptions=True
+        )
+
+    async def _work(self, key: int, queue: asyncio.Queue[_Delivery]) -> None:
+        sends = self._SENDS.setdefault(key, deque(maxlen=self.RATE))
+        while True:
+            try:
+                delivery = await asyncio.wait_for(queue.get(), self.IDLE)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._WORKERS[key]
+                    del self._QUEUES[key]
+                    return
+                continue
+
+            if self.STALEAFTER is not None and monotonic() - delivery.QUEUEDAT > self.STALEAFTER:
+                if not delivery.FUTURE.done():
+                    delivery.FUTURE.set_exception(asyncio.TimeoutError("The reply went stale in the queue."))
+                self._DROPPED += 1
+                continue
+
+            messages: list[Message] = []
+            try:
+                for chunk in delivery.CHUNKS:
+                    if delivery.FUTURE.cancelled():
+                        LOGGER.info(f"Outbox:::Dropped a cancelled reply to channel {key}.")
+                        self._DROPPED += 1
+                        break
+                    if len(sends) == self.RATE:
+                        wait = sends[0] + self.PER - monotonic()
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                    messages.append(await delivery.DESTINATION.send(chunk))
+                    sends.append(monotonic())
+                    self._SENT += 1
+                else:
+                    if not delivery.FUTURE.done():
+                        delivery.FUTURE.set_result(messages)
+            except asyncio.CancelledError:
+                if not delivery.FUTURE.done():
+                    delivery.FUTURE.cancel()
+                raise
+            except HTTPException as err:
+                LOGGER.error(f"Outbox:::Failed to send to channel {key}: {err}")
+                if not delivery.FUTURE.done():
+                    delivery.FUTURE.set_exception(err)
+            except Exception as err:
+                # Not Discord's answer, e.g. a dropped connection or a bad payload
+                LOGGER.exception(f"Outbox:::Error sending to channel {key}: {err}")
+                if not delivery.FUTURE.done():
+                    delivery.FUTURE.set_exception(err)
@@ -0,0 +1,308 @@
+from typing import Any, Callable, Final
+from struct import Struct
+from zlib import decompress
+
+try:
+    import erlpack
+except ImportError:
+    erlpack = None
+
+VERSION: Final[int] = 131
+
+NEW_FLOAT_EXT: Final[int] = 70
+COMPRESSED: Final[int] = 80
+SMALL_INTEGER_EXT: Final[int] = 97
+INTEGER_EXT: Final[int] = 98
+FLOAT_EXT: Final[int] = 99
+ATOM_EXT: Final[int] = 100
+SMALL_TUPLE_EXT: Final[int] = 104
+LARGE_TUPLE_EXT: Final[int] = 105
+NIL_EXT: Final[int] = 106
+STRING_EXT: Final[int] = 107
+LIST_EXT: Final[int] = 108
+BINARY_EXT: Final[int] = 109
+SMALL_BIG_EXT: Final[int] = 110
+LARGE_BIG_EXT: Final[int] = 111
+MAP_EXT: Final[int] = 116
+ATOM_UTF8_EXT: Final[int] = 118
+SMALL_ATOM_UTF8_EXT: Final[int] = 119
+SMALL_ATOM_EXT: Final[int] = 115
+
+_U16 = Struct(">H")
+_U32 = Struct(">I")
+_I32 = Struct(">i")
+_F64 = Struct(">d")
+
+_ATOMS: Final[dict[str, Any]] = {
+    'nil': None,
+    'true': True,
+    'false': False
+}
+
+
+class ETFError(ValueError):
+    """
+    Raised when a term cannot be encoded to or decoded from the Erlang term format.
+    """
+
+
+class _Decoder:
+    """
+    Single-use decoder over one encoded term.
+    Values are read straight out of a memoryview by offset, and the tag of each
+    term selects its reader from a table, so nothing is sliced more than once.
+    """
+    __slots__ = ("_DATA", "_POS", "_READERS")
+
+    def __init__(self, data: bytes | bytearray | memoryview) -> None:
+        self._DATA = memoryview(data)
+        self._POS = 0
+        self._READERS: dict[int, Callable[[], Any]] = {
+            NEW_FLOAT_EXT: self._new_float,
+            SMALL_INTEGER_EXT: self._small_integer,
+            INTEGER_EXT: self._integer,
+            FLOAT_EXT: self._float,
+            ATOM_EXT: self._atom,
+            SMALL_ATOM_EXT: self._small_atom,
+            ATOM_UTF8_EXT: self._atom,
+            SMALL_ATOM_UTF8_EXT: self._small_atom,
+            SMALL_TUPLE_EXT: self._small_tuple,
+            LARGE_TUPLE_EXT: self._large_tuple,
+            NIL_EXT: self._nil,
+            STRING_EXT: self._string,
+            LIST_EXT: self._list,
+            BINARY_EXT: self._binary,
+            SMALL_BIG_EXT: self._small_big,
+            LARGE_BIG_EXT: self._large_big,
+            MAP_EXT: self._map,
+            COMPRESSED: self._compressed
+        }
+
+    def decode(self) -> Any:
+        if not len(self._DATA) or self._DATA[0] != VERSION:
+            raise ETFError("Missing the ETF version byte.")
+        self._POS = 1
+        return self._term()
+
+    def _term(self) -> Any:
+        tag = self._DATA[self._POS]
+        self._POS += 1
+        reader = self._READERS.get(tag, None)
+        if reader is None:
+            raise ETFError(f"Unsupported ETF tag {tag} at offset {self._POS - 1}.")
+        return reader()
+
+    def _take(self, size: int) -> memoryview:
+        start = self._POS
+        self._POS += size
+        if self._POS > len(self._DATA):
+            raise ETFError("Truncated ETF term.")
+        return self._DATA[start:self._POS]
+
+    def _u8(self) -> int:
+        value = self._DATA[self._POS]
+        self._POS += 1
+        return value
+
+    def _u16(self) -> int:
+        value = _U16.unpack_from(self._DATA, self._POS)[0]
+        self._POS += 2
+        return value
+
+    def _u32(self) -> int:
+        value = _U32.unpack_from(self._DATA, self._POS)[0]
+        self._POS += 4
+        return value
+
+    def _new_float(self) -> float:
+        value = _F64.unpack_from(self._DATA, self._POS)[0]
+        self._POS += 8
+        return value
+
+    def _small_integer(self) -> int:
+        return self._u8()
+
+    def _integer(self) -> int:
+        value = _I32.unpack_from(self._DATA, self._POS)[0]
+        self._POS += 4
+        return value
+
+    def _float(self) -> float:
+        return float(bytes(self._take(31)).rstrip(b"\0"))
+
+    def _atom_value(self, size: int) -> Any:
+        name = str(self._take(size), "utf-8")
+        return _ATOMS.get(name, name)
+
+    def _atom(self) -> Any:
+        return self._atom_value(self._u16())
+
+    def _small_atom(self) -> Any:
+        return self._atom_value(self._u8())
+
+    def _small_tuple(self) -> tuple:
+        return tuple(self._term() for _ in range(self._u8()))
+
+    def _large_tuple(self) -> tuple:
+        return tuple(self._term() for _ in range(self._u32()))
+
+    def _nil(self) -> list:
+        return []
+
+    def _string(self) -> str:
+        # A list of small integers, which Discord only uses for short ASCII text
+        return str(self._take(self._u16()), "latin-1")
+
+    def _list(self) -> list:
+        items = [self._term() for _ in range(self._u32())]
+        tail = self._term()
+        if tail != []:
+            items.append(tail)
+        return items
+
+    def _binary(self) -> str | bytes:
+        data = self._take(self._u32())
+        try:
+            return str(data, "utf-8")
+        except UnicodeDecodeError:
+            return bytes(data)
+
+    def _big(self, size: int) -> int:
+        sign = self._u8()
+        value = int.from_bytes(self._take(size), "little")
+        return -value if sign else value
+
+    def _small_big(self) -> int:
+        return self._big(self._u8())
+
+    def _large_big(self) -> int:
+        return self._big(self._u32())
+
+    def _map(self) -> dict:
+        term = self._term
+        return {term(): term() for _ in range(self._u32())}
+
+    def _compressed(self) -> Any:
+        size = self._u32()
+        data = decompress(self._DATA[self._POS:])
+        if len(data) != size:
+            raise ETFError("Compressed ETF term has the wrong size.")
+        self._POS = len(self._DATA)
+        return _Decoder(bytes((VERSION,)) + data).decode()
+
+
+def _encode(value: Any, out: bytearray) -> None:
+    if value is None:
+        out += b"\x77\x03nil"
+    elif value is True:
+        out += b"\x77\x04true"
+    elif value is False:
+        out += b"\x77\x05false"
+    elif isinstance(value, int):
+        if 0 <= value <= 255:
+            out += bytes((SMALL_INTEGER_EXT, value))
+        elif -2**31 <= value < 2**31:
+            out.append(INTEGER_EXT)
+            out += _I32.pack(value)
+        else:
+            magnitude = abs(value)
+            data = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, "little")
+            if len(data) < 256:
+                out += bytes((SMALL_BIG_EXT, len(data), int(value < 0)))
+            else:
+                out.append(LARGE_BIG_EXT)
+                out += _U32.pack(len(data))
+                out.append(int(value < 0))
+            out += data
+    elif isinstance(value, float):
+        out.append(NEW_FLOAT_EXT)
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(BINARY_EXT)
+        out += _U32.pack(len(data))
+        out += data
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out.append(BINARY_EXT)
+        out += _U32.pack(len(value))
+        out += value
+    elif isinstance(value, dict):
+        out.append(MAP_EXT)
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, (list, tuple)):
+        if not value:
+            out.append(NIL_EXT)
+            return
+        out.append(LIST_EXT)
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(item, out)
+        out.append(NIL_EXT)
+    else:
+        raise ETFError(f"Cannot encode {type(value).__name__} as ETF.")
+
+
+def py_dumps(value: Any) -> bytes:
+    """
+    Encodes a value in the Erlang term format, in pure Python.
+    Strings become binaries, None and booleans become atoms, and lists and tuples become lists.
+
+    Args:
+        value (Any): The value to encode.
+
+    Returns:
+        bytes: The encoded term.
+
+    Raises:
+        ETFError: If the value contains a type which cannot be encoded.
+    """
+    out = bytearray((VERSION,))
+    _encode(value, out)
+    return bytes(out)
+
+
+def py_loads(data: bytes | bytearray | memoryview) -> Any:
+    """
+    Decodes a term in the Erlang term format, in pure Python.
+    Binaries are returned as str when they are valid UTF-8, atoms as str except
+    for nil, true and false, and snowflakes as int, as Discord sends them as integers.
+
+    Args:
+        data (bytes | bytearray | memoryview): The encoded term.
+
+    Returns:
+        Any: The decoded value.
+
+    Raises:
+        ETFError: If the data is not a valid term.
+    """
+    try:
+        return _Decoder(data).decode()
+    except (IndexError, ValueError) as err:
+        if isinstance(err, ETFError): raise
+        raise ETFError(f"Invalid ETF term: {err}") from err
+
+
+def _accelerated() -> bool:
+    """
+    Checks that the C accelerator decodes exactly like the pure-Python decoder,
+    since its handling of binaries and atoms differs between versions.
+    """
+    if erlpack is None: return False
+    sample = {'op': 0, 't': "READY", 's': None, 'd': {'id': 2**60, 'ok': True, 'v': [1.5, "é"]}}
+    try:
+        return erlpack.unpack(py_dumps(sample)) == sample and py_loads(erlpack.pack(sample)) == sample
+    except Exception:
+        return False
+
+
+ACCELERATED: Final[bool] = _accelerated()
+"""
+Whether the erlpack C extension is installed and used.
+"""
+
+dumps: Callable[[Any], bytes] = erlpack.pack if ACCELERATED else py_dumps
+loads: Callable[[bytes], Any] = erlpack.unpack if ACCELERATED else py_loads
@@ -1,31 +1,150 @@
-from ._types import (
-    Modelfile,
-    Function,
-    ToolCall,
-    ToolResponse,
-    ToolCallErrorResponse,
-    ToolCallReturnable,
-    ToolCallReturnData,
-    AuthenticationToken,
-)
+from typing import TYPE_CHECKING, Any
+from importlib import import_module
 
-from .startup import (
-    LOGGER,
-    BotSession
-)
+if TYPE_CHECKING:
+    from ._types import (
+        Modelfile,
+        ToolResponse,
+        ToolPolicy,
+        ToolCallErrorResponse,
+        ToolCallReturnable,
+        ToolCallReturnData,
+        AuthenticationToken,
+        ContextStats,
+        SchedulerStats,
+        CacheStats,
+        ResidencyStats,
+        ThinkingStats,
+        StartupPhase,
+    )
+
+    from ._models import (
+        Function,
+        ToolCall
+    )
+
+    from .startup import (
+        LOGGER,
+        BotSession,
+        ThinkingMode,
+        context_options,
+        thinking_stats
+    )
+
+    from .context import (
+        ContextWindow
+    )
+
+    from .scheduler import (
+        InferenceScheduler,
+        Priority,
+        SchedulerBusy
+    )
+
+    from .cache import (
+        ResponseCache,
+        fingerprint,
+        normalize_question
+    )
+
+    from .residency import (
+        ModelResidency
+    )
+
+    from .pool import (
+        SessionPool
+    )
+
+    from .readiness import (
+        Readiness
+    )
+
+    from .metrics import (
+        METRICS,
+        Metrics
+    )
+
+    from .utils import (
+        TOOLS,
+        TOOLS_LOOKUP,
+        TOOL_POLICIES,
+        SYSTEM_PROMPT_TOOLS,
+        SYSTEM_PROMPT_THIKING_SUPPRESION,
+        SYSTEM_PROMPT_COMMANDS,
+        SYSTEM_PROMPT_SUMMARY,
+        SUMMARY_TAG,
+        COMMANDS,
+        generate_random_string,
+        handle_tool_calls,
+        get_specific_call,
+        create_error_response
+    )
+
+_LAZY: dict[str, str] = {
+    "Modelfile": "._types",
+    "Function": "._models",
+    "ToolCall": "._models",
+    "ToolResponse": "._types",
+    "ToolPolicy": "._types",
+    "ToolCallErrorResponse": "._types",
+    "ToolCallReturnable": "._types",
+    "ToolCallReturnData": "._types",
+    "AuthenticationToken": "._types",
+    "ContextStats": "._types",
+    "SchedulerStats": "._types",
+    "CacheStats": "._types",
+    "ResidencyStats": "._types",
+    "ThinkingStats": "._types",
+    "StartupPhase": "._types",
+    "LOGGER": ".startup",
+    "BotSession": ".startup",
+    "ThinkingMode": ".startup",
+    "context_options": ".startup",
+    "thinking_stats": ".startup",
+    "ContextWindow": ".context",
+    "InferenceScheduler": ".scheduler",
+    "Priority": ".scheduler",
+    "SchedulerBusy": ".scheduler",
+    "ResponseCache": ".cache",
+    "fingerprint": ".cache",
+    "normalize_question": ".cache",
+    "ModelResidency": ".residency",
+    "SessionPool": ".pool",
+    "Readiness": ".readiness",
+    "METRICS": ".metrics",
+    "Metrics": ".metrics",
+    "TOOLS": ".utils",
+    "TOOLS_LOOKUP": ".utils",
+    "TOOL_POLICIES": ".utils",
+    "SYSTEM_PROMPT_TOOLS": ".utils",
+    "SYSTEM_PROMPT_THIKING_SUPPRESION": ".utils",
+    "SYSTEM_PROMPT_COMMANDS": ".utils",
+    "SYSTEM_PROMPT_SUMMARY": ".utils",
+    "SUMMARY_TAG": ".utils",
+    "COMMANDS": ".utils",
+    "generate_random_string": ".utils",
+    "handle_tool_calls": ".utils",
+    "get_specific_call": ".utils",
+    "create_error_response": ".utils"
+}
+"""
+The submodule defining each public name. Names are imported on first access,
+so that `ollama`, pydantic and `jwt` only load once something needs them.
+"""
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name, None)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY})
 
-from .utils import (
-    TOOLS,
-    TOOLS_LOOKUP,
-    SYSTEM_PROMPT_TOOLS,
-    SYSTEM_PROMPT_THIKING_SUPPRESION,
-    SYSTEM_PROMPT_COMMANDS,
-    COMMANDS,
-    generate_random_string,
-    handle_tool_calls,
-    get_specific_call,
-    create_error_response
-)
 
 __all__ = (
     "Modelfile",
@@ -34,10 +153,35 @@ __all__ = (
     "ToolResponse",
     "LOGGER",
     "BotSession",
+    "SessionPool",
+    "ContextWindow",
+    "ContextStats",
+    "InferenceScheduler",
+    "Priority",
+    "SchedulerBusy",
+    "SchedulerStats",
+    "ResponseCache",
+    "CacheStats",
+    "fingerprint",
+    "normalize_question",
+    "ModelResidency",
+    "ResidencyStats",
+    "Readiness",
+    "StartupPhase",
+    "ThinkingMode",
+    "ThinkingStats",
+    "thinking_stats",
+    "context_options",
+    "METRICS",
+    "Metrics",
     "TOOLS",
     "TOOLS_LOOKUP",
+    "TOOL_POLICIES",
+    "ToolPolicy",
     "SYSTEM_PROMPT_TOOLS",
     "SYSTEM_PROMPT_THIKING_SUPPRESION",
+    "SYSTEM_PROMPT_SUMMARY",
+    "SUMMARY_TAG",
     "generate_random_string",
     "handle_tool_calls",
     "get_specific_call",
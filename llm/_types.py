@@ -1,23 +1,14 @@
 from typing import (
     TypedDict,
+    NotRequired,
     Any,
     Mapping,
-    Optional,
     Sequence,
     Literal,
-    Union,
     Generic,
     TypeVar
 )
 
-from pydantic import (
-    ConfigDict,
-    Field
-)
-
-from ollama._types import (
-    SubscriptableBaseModel
-)
 
 class Modelfile(TypedDict):
     """
@@ -32,6 +23,7 @@ class Modelfile(TypedDict):
         presence_penalty (float): The presence penalty for the model.
         frequency_penalty (float): The frequency penalty for the model.
         context_length (int): The context length for the model.
+        context_budget (int): The maximum number of prompt tokens sent per request (optional).
         system (str): The system prompt for the model.
     """
     model: str
@@ -42,47 +34,123 @@ class Modelfile(TypedDict):
     presence_penalty: float
     frequency_penalty: float
     context_length: int
+    context_budget: NotRequired[int]
     system: str
 
 
-class Property(SubscriptableBaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-    type: Optional[Union[str, Sequence[str]]] = None
-    items: Optional[Any] = None
-    description: Optional[str] = None
-    enum: Optional[Sequence[Any]] = None
+class ContextStats(TypedDict):
+    """
+    Statistics about the messages selected for one request.
 
+    Attributes:
+        budget (int): The prompt token budget.
+        prompt_tokens (int): The estimated number of prompt tokens sent.
+        prefix_tokens (int): The estimated number of tokens in the system-prompt prefix.
+        history_tokens (int): The estimated number of tokens in the whole history.
+        history_messages (int): The number of messages in the whole history.
+        sent_messages (int): The number of messages sent, including the prefix.
+        dropped_messages (int): The number of history messages left out.
+    """
+    budget: int
+    prompt_tokens: int
+    prefix_tokens: int
+    history_tokens: int
+    history_messages: int
+    sent_messages: int
+    dropped_messages: int
 
-class Parameters(SubscriptableBaseModel):
-    model_config = ConfigDict(populate_by_name=True)
-    type: Optional[Literal['object']] = 'object'
-    defs: Optional[Any] = Field(None, alias='$defs')
-    items: Optional[Any] = None
-    required: Optional[Sequence[str]] = None
-    properties: Optional[Mapping[str, Property]] = None
 
+class SchedulerStats(TypedDict):
+    """
+    Load and queue-wait metrics of the inference scheduler.
 
-class Function(SubscriptableBaseModel):
+    Attributes:
+        in_flight (int): The number of requests currently running.
+        queued (int): The number of requests waiting for a slot.
+        admitted (int): The total number of requests given a slot.
+        shed (int): The total number of requests rejected because the queue was full.
+        wait_p50 (float): The median queue wait of recent requests, in seconds.
+        wait_p95 (float): The 95th percentile queue wait of recent requests, in seconds.
+        wait_max (float): The longest queue wait of recent requests, in seconds.
     """
-    Function definition
+    in_flight: int
+    queued: int
+    admitted: int
+    shed: int
+    wait_p50: float
+    wait_p95: float
+    wait_max: float
+
+
+class CacheStats(TypedDict):
     """
-    name: Optional[str] = None
-    description: Optional[str] = None
-    parameters: Optional[Parameters] = None
+    Hit and miss counters of the response cache.
 
+    Attributes:
+        entries (int): The number of cached answers.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups not found or expired.
+        hit_rate (float): The fraction of lookups answered from the cache.
+    """
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
 
-class _Function(SubscriptableBaseModel):
-    name: Optional[str] = None
-    arguments: Mapping[str, Any]
 
+class ResidencyStats(TypedDict):
+    """
+    Model residency metrics.
 
-class ToolCall(SubscriptableBaseModel):
+    Attributes:
+        cold_requests (int): The number of recent requests which had to load the model.
+        warm_requests (int): The number of recent requests served by the loaded model.
+        cold_first_token (float): The mean first-token latency of cold requests, in seconds.
+        warm_first_token (float): The mean first-token latency of warm requests, in seconds.
+        evictions (int): The number of keep-warm pings which found the model unloaded.
+        pings (int): The number of keep-warm pings sent.
     """
-    Model tool calls.
-    This uses the "arguments" field of the
-    Function, NOT "parameters".
+    cold_requests: int
+    warm_requests: int
+    cold_first_token: float
+    warm_first_token: float
+    evictions: int
+    pings: int
+
+
+class StartupPhase(TypedDict):
     """
-    function: _Function
+    Timing of one startup phase.
+
+    Attributes:
+        started (float): Seconds after startup began at which the phase started.
+        seconds (float): How long the phase took, or has been running so far.
+        done (bool): Whether the phase finished.
+        error (str | None): Why the phase failed, None if it did not.
+    """
+    started: float
+    seconds: float
+    done: bool
+    error: str | None
+
+
+class ThinkingStats(TypedDict):
+    """
+    Tokens generated versus delivered for one command.
+
+    Attributes:
+        requests (int): The number of requests made by the command.
+        generated_tokens (int): The total number of tokens generated, including thinking.
+        thinking_tokens (int): The number of generated tokens spent thinking.
+        delivered_tokens (int): The number of generated tokens which reached the answer.
+        budget_exceeded (int): The number of requests which ran out of thinking budget.
+    """
+    requests: int
+    generated_tokens: int
+    thinking_tokens: int
+    delivered_tokens: int
+    budget_exceeded: int
+
 
 class ToolResponse(TypedDict):
     """
@@ -97,6 +165,17 @@ class ToolResponse(TypedDict):
     content: str | None
     name: str | None
 
+class ToolPolicy(TypedDict):
+    """
+    Execution policy of a tool.
+
+    Attributes:
+        executor (str): "thread" for I/O-bound tools or "process" for CPU-bound tools.
+        timeout (float): Seconds the tool may run before it is reported as timed out.
+    """
+    executor: Literal['thread', 'process']
+    timeout: float
+
 class ToolCallErrorResponse(TypedDict):
     errors: Sequence[Mapping[str, Any]] | None
     warnings: Sequence[Mapping[str, Any]] | None
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from ._types import CacheStats
+
+from typing import TYPE_CHECKING, Sequence
+from collections import OrderedDict
+from hashlib import sha256
+from logging import getLogger, Logger
+from pathlib import Path
+from os import replace
+from json import dumps, load, JSONDecodeError
+from threading import Lock
+from time import time
+from re import compile as re_compile
+
+if TYPE_CHECKING:
+    from ollama import Message
+
+LOGGER: Logger = getLogger(__name__)
+
+_PUNCTUATION = re_compile(r"[^\w\s]+")
+_WHITESPACE = re_compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Folds case, punctuation and whitespace so that trivially different
+    phrasings of the same question share a cache entry.
+
+    Args:
+        question (str): The question as asked.
+
+    Returns:
+        str: The normalized question.
+    """
+    question = _PUNCTUATION.sub(" ", question.casefold())
+    return _WHITESPACE.sub(" ", question).strip()
+
+
+def fingerprint(prefix: Sequence[Message]) -> str:
+    """
+    Hashes a system-prompt prefix, so that cached answers are invalidated
+    whenever the prompts they were generated under change.
+
+    Args:
+        prefix (Sequence[Message]): The system-prompt prefix.
+
+    Returns:
+        str: A hex digest of the prefix.
+    """
+    digest = sha256()
+    for msg in prefix:
+        digest.update((msg.get('role', None) or "").encode())
+        digest.update(b"\0")
+        digest.update((msg.get('content', None) or "").encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache of final answers to `ask` questions.
+    Entries are keyed on the model name, the system-prompt fingerprint and the
+    normalized question. They expire after `ttl` seconds and the least recently
+    used entries are evicted beyond `max_entries`. When a path is given the cache
+    is loaded from it on creation and written back by `save`.
+    """
+    __slots__ = (
+        "TTL",
+        "MAXENTRIES",
+        "PATH",
+        "_ENTRIES",
+        "_HITS",
+        "_MISSES",
+        "CACHELOCK"
+    )
+
+    def __init__(
+            self,
+            ttl: float = 24 * 3600,
+            max_entries: int = 1024,
+            path: Path | None = None
+    ) -> None:
+        """
+        Initializes a ResponseCache instance.
+
+        Args:
+            ttl (float): Seconds an answer stays valid.
+            max_entries (int): The maximum number of cached answers.
+            path (Path | None): Where the cache is persisted across restarts, or None to keep it in memory.
+        """
+        self.TTL = ttl
+        self.MAXENTRIES = max_entries
+        self.PATH = path
+        self._ENTRIES: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        """
+        Answers keyed by cache key, as (expiry timestamp, answer), least recently used first.
+        """
+        self._HITS = 0
+        self._MISSES = 0
+        self.CACHELOCK: Lock = Lock()
+        """
+        A threading lock to ensure that the cache
+        is interacted with in a thread-safe manner.
+        """
+        self.load()
+
+    @staticmethod
+    def key(model: str | None, prefix_fingerprint: str, question: str) -> str:
+        """
+        Builds the cache key of a question.
+
+        Args:
+            model (str | None): The model name.
+            prefix_fingerprint (str): The fingerprint of the system-prompt prefix.
+            question (str): The question as asked.
+
+        Returns:
+            str: The cache key.
+        """
+        return f"{model}\0{prefix_fingerprint}\0{normalize_question(question)}"
+
+    def get(self, key: str) -> str | None:
+        """
+        Looks up a cached answer.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str | None: The answer, or None on a miss or an expired entry.
+        """
+        with self.CACHELOCK:
+            entry = self._ENTRIES.get(key, None)
+            if entry is None or entry[0] < time():
+                if entry is not None:
+                    del self._ENTRIES[key]
+                self._MISSES += 1
+                return None
+            self._ENTRIES.move_to_end(key)
+            self._HITS += 1
+            return entry[1]
+
+    def put(self, key: str, answer: str) -> None:
+        """
+        Caches an answer, without its surrounding whitespace, as every
+        path which produces it delivers it.
+
+        Args:
+            key (str): The cache key.
+            answer (str): The final answer shown to the user.
+        """
+        answer = answer.strip()
+        if not answer: return
+        with self.CACHELOCK:
+            self._ENTRIES[key] = (time() + self.TTL, answer,)
+            self._ENTRIES.move_to_end(key)
+            while len(self._ENTRIES) > self.MAXENTRIES:
+                self._ENTRIES.popitem(last=False)
+
+    def stats(self) -> CacheStats:
+        """
+        Returns the cache's hit and miss counters.
+
+        Returns:
+            CacheStats: The counters.
+        """
+        with self.CACHELOCK:
+            total = self._HITS + self._MISSES
+            return {
+                'entries': len(self._ENTRIES),
+                'hits': self._HITS,
+                'misses': self._MISSES,
+                'hit_rate': self._HITS / total if total else 0.0
+            }
+
+    def load(self) -> None:
+        """
+        Loads the unexpired entries persisted at PATH, if any.
+        """
+        if self.PATH is None or not self.PATH.exists(): return
+        try:
+            with open(self.PATH, "r", encoding="utf-8") as f:
+                entries = load(f)
+        except (IOError, OSError, JSONDecodeError) as err:
+            LOGGER.error(f"Error loading response cache {self.PATH}: {err}")
+            return
+
+        now = time()
+        with self.CACHELOCK:
+            for key, expiry, answer in entries:
+                if expiry > now:
+                    self._ENTRIES[key] = (expiry, answer,)
+            while len(self._ENTRIES) > self.MAXENTRIES:
+                self._ENTRIES.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        Persists the cache to PATH, if one was given.
+        """
+        if self.PATH is None: return
+        with self.CACHELOCK:
+            entries = [[key, expiry, answer] for key, (expiry, answer) in self._ENTRIES.items()]
+
+        temp = self.PATH.with_name(f"{self.PATH.name}.tmp")
+        try:
+            self.PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(dumps(entries, ensure_ascii=False))
+            replace(temp, self.PATH)
+        except (IOError, OSError) as err:
+            LOGGER.error(f"Error saving response cache {self.PATH}: {err}")
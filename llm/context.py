@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from ._types import ContextStats
+
+from typing import TYPE_CHECKING, Sequence
+from collections import OrderedDict
+from threading import Lock
+from logging import getLogger, Logger
+from re import compile as re_compile
+
+if TYPE_CHECKING:
+    from ollama import Message
+
+_TOKEN_PATTERN = re_compile(r"\w+|[^\w\s]")
+"""
+Rough approximation of a BPE tokenizer: words and individual punctuation marks.
+"""
+
+MESSAGE_OVERHEAD: int = 4
+"""
+Tokens spent by the chat template on each message (role markers, separators).
+"""
+
+ESTIMATE_CACHE_SIZE: int = 8192
+"""
+The default number of cached token estimates, for histories without a cap.
+"""
+
+LOGGER: Logger = getLogger(__name__)
+
+
+def estimate_cache_size(messages: int, prefix: int = 0) -> int:
+    """
+    The estimate cache size which holds every message of one scan over a history,
+    with room for the messages added until the next scan, so that it never thrashes.
+
+    Args:
+        messages (int): The most messages the history holds in memory.
+        prefix (int): The number of prefix messages.
+
+    Returns:
+        int: The cache size.
+    """
+    return 2 * (messages + prefix) + 64
+
+
+class ContextWindow:
+    """
+    Fits a session's messages into a token budget before they are sent to the model.
+    The system-prompt prefix and the current turn, from the newest user message on,
+    are always kept, even if they alone exceed the budget. The older turns which fit
+    into the remaining budget are kept, and the rest are replaced by a short system
+    note saying how many were left out.
+    Token estimates are cached per message content, so repeated requests over a
+    growing history only estimate the new messages. The cache must hold a whole
+    history to do so, see `estimate_cache_size`.
+    """
+    __slots__ = (
+        "BUDGET",
+        "_CACHE",
+        "_CACHESIZE",
+        "CACHELOCK"
+    )
+
+    def __init__(
+            self,
+            budget: int,
+            cache_size: int = ESTIMATE_CACHE_SIZE
+    ) -> None:
+        """
+        Initializes a ContextWindow instance.
+
+        Args:
+            budget (int): The maximum number of prompt tokens to send.
+            cache_size (int): The maximum number of cached token estimates.
+        """
+        self.BUDGET = budget
+        self._CACHE: OrderedDict[str, int] = OrderedDict()
+        self._CACHESIZE = cache_size
+        self.CACHELOCK: Lock = Lock()
+        """
+        A threading lock to ensure that the estimate cache
+        is interacted with in a thread-safe manner.
+        """
+
+    def estimate(self, message: Message) -> int:
+        """
+        Estimates the number of tokens a message occupies in the prompt.
+
+        Args:
+            message (Message): The message to estimate.
+
+        Returns:
+            int: The estimated token count.
+        """
+        content = message.get('content', None) or ""
+        calls = message.get('tool_calls', None)
+        if calls:
+            content = f"{content}{calls}"
+
+        with self.CACHELOCK:
+            tokens = self._CACHE.get(content, None)
+            if tokens is not None:
+                self._CACHE.move_to_end(content)
+                return tokens
+
+        tokens = len(_TOKEN_PATTERN.findall(content)) + MESSAGE_OVERHEAD
+        with self.CACHELOCK:
+            self._CACHE[content] = tokens
+            if len(self._CACHE) > self._CACHESIZE:
+                self._CACHE.popitem(last=False)
+        return tokens
+
+    def fit(
+            self,
+            prefix: Sequence[Message],
+            history: Sequence[Message]
+    ) -> tuple[list[Message], ContextStats]:
+        """
+        Selects the messages to send for a request.
+
+        Args:
+            prefix (Sequence[Message]): The system-prompt prefix, always kept.
+            history (Sequence[Message]): The conversation, oldest first.
+
+        Returns:
+            tuple[list[Message], ContextStats]: The messages to send and statistics about the selection.
+        """
+        prefix_tokens = sum(self.estimate(msg) for msg in prefix)
+        history_tokens = 0
+        remaining = self.BUDGET - prefix_tokens
+        kept = 0
+        kept_tokens = 0
+        fits = True
+
+        # The current turn: the newest user message and the tool calls and results after it,
+        # or at least the newest message
+        required = min(1, len(history))
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].get('role', None) == "user":
+                required = len(history) - index
+                break
+
+        for msg in reversed(history):
+            tokens = self.estimate(msg)
+            history_tokens += tokens
+            if kept < required or (fits and kept_tokens + tokens <= remaining):
+                kept += 1
+                kept_tokens += tokens
+            else:
+                fits = False
+
+        if kept_tokens > remaining:
+            LOGGER.warning(
+                f"The context budget of {self.BUDGET} tokens cannot hold the prefix ({prefix_tokens}) "
+                f"and the current turn ({kept_tokens}), sending them over budget."
+            )
+
+        # Make room for the omission note, and never start on a tool response:
+        # without the assistant call which requested it, it confuses the model.
+        note_tokens = MESSAGE_OVERHEAD + 12 if kept < len(history) else 0
+        while kept > required and (
+            kept_tokens + note_tokens > remaining
+            or history[len(history) - kept].get('role', None) == "tool"
+        ):
+            kept_tokens -= self.estimate(history[len(history) - kept])
+            kept -= 1
+            note_tokens = MESSAGE_OVERHEAD + 12
+
+        dropped = len(history) - kept
+        messages = list(prefix)
+        if dropped:
+            note: Message = {
+                'role': "system",
+                'content': f"[{dropped} earlier messages omitted to fit the context window]"
+            }
+            kept_tokens += self.estimate(note)
+            messages.append(note)
+        messages.extend(history[dropped:])
+
+        return messages, {
+            'budget': self.BUDGET,
+            'prompt_tokens': prefix_tokens + kept_tokens,
+            'prefix_tokens': prefix_tokens,
+            'history_tokens': history_tokens,
+            'history_messages': len(history),
+            'sent_messages': len(messages),
+            'dropped_messages': dropped
+        }
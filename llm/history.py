@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from .journal import dumps_message
+
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence, overload
+from logging import getLogger, Logger
+from pathlib import Path
+from json import loads, JSONDecodeError
+
+if TYPE_CHECKING:
+    from ollama import Message
+
+LOGGER: Logger = getLogger(__name__)
+
+
+def _size(message: Message) -> int:
+    return len(message.get('content', None) or "")
+
+
+class HistoryView(Sequence["Message"]):
+    """
+    Read-only, live view over the hot messages of a MessageHistory.
+    Creating one is O(1); nothing is copied until it is indexed or iterated.
+    """
+    __slots__ = ("_HOT",)
+
+    def __init__(self, hot: list[Message]) -> None:
+        self._HOT = hot
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[Message]: ...
+    def __getitem__(self, index):
+        return self._HOT[index]
+
+    def __len__(self) -> int:
+        return len(self._HOT)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._HOT)
+
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self._HOT)
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._HOT
+
+    def __repr__(self) -> str:
+        return f"HistoryView({self._HOT!r})"
+
+
+class MessageHistory:
+    """
+    Bounded message history for a BotSession.
+    Only the newest messages are kept hot in memory, capped by count and/or by
+    content size. Older messages are spilled in batches to an append-only cold
+    segment on disk, which is only read when explicitly requested through `cold`.
+
+    Every message has an absolute position: the number of cold messages plus its
+    index in the hot window. Loading a stream with a known base position skips
+    messages which were already spilled, so replaying a journal never duplicates
+    the cold segment.
+    This class is not thread-safe; the owning BotSession guards it with MSGLOCK.
+    """
+    __slots__ = (
+        "_HOT",
+        "_BYTES",
+        "_COLDCOUNT",
+        "COLDFILE",
+        "MAXMESSAGES",
+        "MAXBYTES"
+    )
+
+    def __init__(
+            self,
+            coldfile: Path,
+            max_messages: int | None = None,
+            max_bytes: int | None = None
+    ) -> None:
+        """
+        Initializes a MessageHistory instance.
+
+        Args:
+            coldfile (Path): The cold segment older messages are spilled to.
+            max_messages (int | None): The maximum number of hot messages, or None for no limit.
+            max_bytes (int | None): The maximum content size of hot messages, or None for no limit.
+        """
+        self._HOT: list[Message] = []
+        self._BYTES = 0
+        self.COLDFILE = coldfile
+        self.MAXMESSAGES = max_messages
+        self.MAXBYTES = max_bytes
+        self._COLDCOUNT = self._count_cold()
+
+    def _count_cold(self) -> int:
+        if not self.COLDFILE.exists(): return 0
+        with open(self.COLDFILE, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    @property
+    def hot(self) -> list[Message]:
+        """
+        The live list of hot messages. Must not be mutated by callers.
+        """
+        return self._HOT
+
+    @property
+    def cold_count(self) -> int:
+        """
+        The number of messages spilled to the cold segment.
+        """
+        return self._COLDCOUNT
+
+    def view(self) -> HistoryView:
+        """
+        Returns a cheap read-only view over the hot messages.
+        """
+        return HistoryView(self._HOT)
+
+    def copy(self) -> list[Message]:
+        """
+        Returns a shallow copy of the hot messages.
+        """
+        return self._HOT.copy()
+
+    def __len__(self) -> int:
+        return len(self._HOT)
+
+    def __getitem__(self, index: int) -> Message:
+        return self._HOT[index]
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._HOT)
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._HOT
+
+    def append(self, message: Message) -> None:
+        self._HOT.append(message)
+        self._BYTES += _size(message)
+        self._spill()
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            self._HOT.append(message)
+            self._BYTES += _size(message)
+        self._spill()
+
+    def drop_head(self, count: int) -> None:
+        """
+        Removes the oldest hot messages without spilling them.
+        """
+        self._BYTES -= sum(_size(msg) for msg in self._HOT[:count])
+        del self._HOT[:count]
+
+    def load(self, messages: Iterable[Message], base: int | None = None) -> None:
+        """
+        Replaces the hot messages with a stream of messages.
+
+        Args:
+            messages (Iterable[Message]): The messages, oldest first.
+            base (int | None): The absolute position of the first message. Messages
+                               positioned before the end of the cold segment are skipped.
+                               Defaults to the end of the cold segment, skipping nothing.
+        """
+        position = self._COLDCOUNT if base is None else base
+        # Cleared in place so that existing views stay live
+        self._HOT.clear()
+        self._BYTES = 0
+        for message in messages:
+            if position >= self._COLDCOUNT:
+                self._HOT.append(message)
+                self._BYTES += _size(message)
+                if len(self._HOT) % 256 == 0:
+                    self._spill()
+            position += 1
+        self._spill()
+
+    def _over(self, messages: int, size: int) -> bool:
+        return (
+            (self.MAXMESSAGES is not None and messages > self.MAXMESSAGES)
+            or (self.MAXBYTES is not None and size > self.MAXBYTES)
+        )
+
+    def _spill(self) -> None:
+        """
+        Spills the oldest hot messages once a cap is exceeded.
+        Spilling goes down to three quarters of the caps, so the cost of
+        trimming the list and writing the segment is paid once per batch.
+        """
+        if not self._over(len(self._HOT), self._BYTES): return
+
+        low_messages = None if self.MAXMESSAGES is None else self.MAXMESSAGES * 3 // 4
+        low_bytes = None if self.MAXBYTES is None else self.MAXBYTES * 3 // 4
+        count = 0
+        size = self._BYTES
+        while count < len(self._HOT) - 1 and (
+            (low_messages is not None and len(self._HOT) - count > low_messages)
+            or (low_bytes is not None and size > low_bytes)
+        ):
+            size -= _size(self._HOT[count])
+            count += 1
+
+        if not self._write_cold(count): return
+        del self._HOT[:count]
+        self._BYTES = size
+        self._COLDCOUNT += count
+
+    def _write_cold(self, count: int) -> bool:
+        """
+        Appends the oldest `count` hot messages to the cold segment.
+        """
+        try:
+            with open(self.COLDFILE, "a", encoding="utf-8") as f:
+                f.write("".join(dumps_message(msg) + "\n" for msg in self._HOT[:count]))
+            return True
+        except (IOError, OSError, TypeError) as err:
+            LOGGER.error(f"Error spilling messages to {self.COLDFILE}: {err}")
+            return False
+
+    def fold_head(self, count: int, summary: Message) -> bool:
+        """
+        Replaces the oldest `count` hot messages with a single summary message.
+        The replaced messages are archived to the cold segment, so exports stay complete.
+
+        Args:
+            count (int): The number of hot messages the summary replaces.
+            summary (Message): The message standing in for them.
+
+        Returns:
+            bool: Whether the messages were replaced.
+        """
+        if not self._write_cold(count): return False
+        self._BYTES -= sum(_size(msg) for msg in self._HOT[:count])
+        self._HOT[:count] = [summary]
+        self._BYTES += _size(summary)
+        self._COLDCOUNT += count
+        return True
+
+    def cold(self) -> Iterator[Message]:
+        """
+        Streams the spilled messages from disk, oldest first.
+
+        Yields:
+            Message: Each cold message.
+        """
+        if not self.COLDFILE.exists(): return
+        with open(self.COLDFILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                try:
+                    yield loads(line)
+                except JSONDecodeError:
+                    LOGGER.warning(f"Skipping unreadable line in {self.COLDFILE}.")
+
+    def all(self) -> Iterator[Message]:
+        """
+        Streams the complete history: the cold messages, then the hot ones.
+        """
+        yield from self.cold()
+        yield from list(self._HOT)
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence
+from logging import getLogger, Logger
+from pathlib import Path
+from os import fsync, replace
+from json import dumps, loads, JSONDecodeError
+from threading import Event, Lock, Thread
+
+if TYPE_CHECKING:
+    from ollama import Message
+
+LOGGER: Logger = getLogger(__name__)
+
+
+def encode_message(obj: Any) -> Any:
+    """
+    JSON fallback for ollama `Message` objects (pydantic models) stored in a history.
+
+    Args:
+        obj (Any): The object the json module could not serialize.
+
+    Returns:
+        Any: A JSON-serializable representation of the object.
+    """
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_message(message: Message) -> str:
+    """
+    Serializes a single message to one compact JSON line.
+    """
+    return dumps(message, ensure_ascii=False, separators=(',', ':'), default=encode_message)
+
+
+class Journal:
+    """
+    Append-only JSONL persistence for a session's messages.
+
+    Every message becomes one compact line in the current journal segment.
+    Appends only queue the line; a background writer flushes queued lines in
+    one batch with an fsync every `interval` seconds (group commit).
+    Compaction writes a snapshot of the whole history and starts a new segment.
+    The snapshot header records the last segment it includes, so the segments it
+    replaced can be deleted at any point afterwards without risking a replay twice.
+
+    Files, for a log file named `chatlog.json`:
+        - chatlog.snapshot.jsonl: header line, then one message per line
+        - chatlog.000001.jsonl: journal segments, replayed in order after the snapshot
+    """
+    __slots__ = (
+        "SNAPSHOT",
+        "_STEM",
+        "INTERVAL",
+        "COMPACTEVERY",
+        "_ONCOMPACT",
+        "_PENDING",
+        "_SINCECOMPACT",
+        "_SEGMENT",
+        "_FILE",
+        "PENDINGLOCK",
+        "WRITELOCK",
+        "SNAPSHOTLOCK",
+        "_WAKE",
+        "_STOP",
+        "_THREAD"
+    )
+
+    def __init__(
+            self,
+            logfile: Path,
+            interval: float = 1.0,
+            compact_every: int = 1000,
+            on_compact: Callable[[], None] | None = None
+    ) -> None:
+        """
+        Initializes a Journal instance.
+
+        Args:
+            logfile (Path): The session's log file, whose stem names the journal files.
+            interval (float): Seconds between group commits.
+            compact_every (int): Number of appended messages after which `on_compact` is called.
+            on_compact (Callable[[], None] | None): Called from the writer thread to compact the journal.
+        """
+        self._STEM = logfile.with_suffix("")
+        self.SNAPSHOT = self._STEM.with_name(f"{self._STEM.name}.snapshot.jsonl")
+        self.INTERVAL = interval
+        self.COMPACTEVERY = compact_every
+        self._ONCOMPACT = on_compact
+        self._PENDING: list[str] = []
+        self._SINCECOMPACT = 0
+        self._SEGMENT = max([*self._segments(), self._header().get('through', 0) + 1])
+        self._FILE = None
+
+        self.PENDINGLOCK: Lock = Lock()
+        """
+        A threading lock guarding the queued lines.
+        """
+
+        self.WRITELOCK: Lock = Lock()
+        """
+        A threading lock guarding the open segment file.
+        """
+
+        self.SNAPSHOTLOCK: Lock = Lock()
+        """
+        A threading lock held from `rotate` through `write_snapshot`, so that
+        concurrent compactions cannot write their snapshots out of order.
+        """
+
+        self._WAKE = Event()
+        self._STOP = Event()
+        self._THREAD: Thread | None = None
+
+    def _segment_path(self, segment: int) -> Path:
+        return self._STEM.with_name(f"{self._STEM.name}.{segment:06d}.jsonl")
+
+    def _segments(self) -> list[int]:
+        """
+        Lists the numbers of the journal segments on disk, in order.
+        """
+        found = []
+        for path in self._STEM.parent.glob(f"{self._STEM.name}.*.jsonl"):
+            number = path.name[len(self._STEM.name) + 1:-len(".jsonl")]
+            if number.isdigit():
+                found.append(int(number))
+        return sorted(found)
+
+    def _header(self) -> dict[str, int]:
+        """
+        Reads the snapshot header, or an empty header without a snapshot.
+        """
+        if not self.SNAPSHOT.exists(): return {}
+        try:
+            with open(self.SNAPSHOT, "r", encoding="utf-8") as f:
+                return loads(f.readline() or "{}")
+        except (IOError, OSError, JSONDecodeError):
+            return {}
+
+    @property
+    def offset(self) -> int:
+        """
+        The absolute position of the first message in the snapshot.
+        Non-zero when older messages were kept elsewhere, e.g. spilled to a cold segment.
+        """
+        return self._header().get('offset', 0)
+
+    @property
+    def exists(self) -> bool:
+        """
+        Whether a snapshot or any journal segment is on disk.
+        """
+        return self.SNAPSHOT.exists() or bool(self._segments())
+
+    def start(self) -> None:
+        """
+        Starts the background writer thread.
+        """
+        if self._THREAD is not None: return
+        self._THREAD = Thread(target=self._run, name=f"journal-{self._STEM.name}", daemon=True)
+        self._THREAD.start()
+
+    def close(self) -> None:
+        """
+        Stops the writer thread and flushes any queued lines.
+        Messages appended afterwards are written synchronously.
+        """
+        self._STOP.set()
+        self._WAKE.set()
+        if self._THREAD is not None:
+            self._THREAD.join()
+            self._THREAD = None
+        self.flush()
+        with self.WRITELOCK:
+            if self._FILE is not None:
+                self._FILE.close()
+                self._FILE = None
+
+    def append(self, messages: Sequence[Message]) -> None:
+        """
+        Queues messages to be written with the next group commit.
+
+        Args:
+            messages (Sequence[Message]): The messages to append.
+        """
+        lines = [dumps_message(msg) for msg in messages]
+        with self.PENDINGLOCK:
+            self._PENDING.extend(lines)
+            self._SINCECOMPACT += len(lines)
+
+        # No writer thread flushes after close, so write now rather than lose the lines
+        if self._STOP.is_set():
+            self.flush()
+            with self.WRITELOCK:
+                if self._FILE is not None:
+                    self._FILE.close()
+                    self._FILE = None
+
+    def flush(self) -> None:
+        """
+        Writes every queued line to the current segment and fsyncs it.
+        """
+        with self.WRITELOCK:
+            with self.PENDINGLOCK:
+                lines, self._PENDING = self._PENDING, []
+            if not lines: return
+
+            try:
+                if self._FILE is None:
+                    self._FILE = open(self._segment_path(self._SEGMENT), "a", encoding="utf-8")
+                self._FILE.write("\n".join(lines) + "\n")
+                self._FILE.flush()
+                fsync(self._FILE.fileno())
+            except (IOError, OSError) as err:
+                LOGGER.error(f"Error writing journal {self._STEM}: {err}")
+                with self.PENDINGLOCK:
+                    self._PENDING = lines + self._PENDING
+
+    def rotate(self) -> int:
+        """
+        Flushes the current segment and starts appending to a new one.
+        Call while the history is locked, right after copying it for a snapshot,
+        and hold SNAPSHOTLOCK until the snapshot is written.
+
+        Returns:
+            int: The last segment included in the copied history.
+        """
+        self.flush()
+        with self.WRITELOCK:
+            if self._FILE is not None:
+                self._FILE.close()
+                self._FILE = None
+            through = self._SEGMENT
+            self._SEGMENT += 1
+        with self.PENDINGLOCK:
+            self._SINCECOMPACT = 0
+        return through
+
+    def write_snapshot(self, messages: Sequence[Message], through: int, offset: int = 0) -> None:
+        """
+        Atomically replaces the snapshot and deletes the segments it includes.
+        A snapshot older than the one on disk is discarded, as the segments it
+        would need have already been deleted.
+
+        Args:
+            messages (Sequence[Message]): The history as of the end of segment `through`.
+            through (int): The last segment included in `messages`, as returned by `rotate`.
+            offset (int): The absolute position of the first message in `messages`.
+        """
+        if through < self._header().get('through', 0):
+            LOGGER.warning(f"Discarding snapshot of {self._STEM.name} through segment {through}, a newer one is on disk.")
+            return
+
+        temp = self.SNAPSHOT.with_name(f"{self.SNAPSHOT.name}.tmp")
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(dumps({'through': through, 'offset': offset}) + "\n")
+                for msg in messages:
+                    f.write(dumps_message(msg) + "\n")
+                f.flush()
+                fsync(f.fileno())
+            replace(temp, self.SNAPSHOT)
+        except (IOError, OSError, TypeError) as err:
+            LOGGER.error(f"Error writing snapshot {self.SNAPSHOT}: {err}")
+            return
+
+        for segment in self._segments():
+            if segment <= through:
+                self._segment_path(segment).unlink(missing_ok=True)
+        LOGGER.info(f"Journal {self._STEM.name} compacted through segment {through}.")
+
+    def replay(self) -> Iterator[Message]:
+        """
+        Streams the persisted messages: the snapshot, then every newer segment.
+        A torn final line from a crash mid-write is skipped.
+
+        Yields:
+            Message: Each persisted message, oldest first.
+        """
+        through = 0
+        if self.SNAPSHOT.exists():
+            with open(self.SNAPSHOT, "r", encoding="utf-8") as f:
+                header = loads(f.readline() or "{}")
+                through = header.get('through', 0)
+                yield from self._read_lines(f)
+
+        for segment in self._segments():
+            if segment > through:
+                with open(self._segment_path(segment), "r", encoding="utf-8") as f:
+                    yield from self._read_lines(f)
+
+    @staticmethod
+    def _read_lines(f) -> Iterator[Message]:
+        for line in f:
+            if not line.strip(): continue
+            try:
+                yield loads(line)
+            except JSONDecodeError:
+                LOGGER.warning(f"Skipping unreadable journal line in {f.name}.")
+
+    def _run(self) -> None:
+        while not self._STOP.is_set():
+            self._WAKE.wait(self.INTERVAL)
+            self._WAKE.clear()
+            self.flush()
+            with self.PENDINGLOCK:
+                due = self._SINCECOMPACT >= self.COMPACTEVERY
+            if due and self._ONCOMPACT is not None:
+                self._ONCOMPACT()
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Mapping
+from collections import deque
+from contextlib import contextmanager
+from logging import getLogger, Logger
+from threading import Lock, Thread
+from time import perf_counter
+from bisect import bisect_left
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+    from ollama import ChatResponse
+
+LOGGER: Logger = getLogger(__name__)
+
+NANOSECONDS: float = 1e9
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+"""
+Histogram bounds in seconds.
+"""
+
+RATE_BUCKETS: tuple[float, ...] = (
+    1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 5000.0
+)
+"""
+Histogram bounds in tokens per second.
+"""
+
+QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: Mapping[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = labels + (extra,) if extra else labels
+    if not pairs: return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with a window of recent samples, from which quantiles are computed.
+    Not thread-safe by itself; Metrics guards it with METRICSLOCK.
+    """
+    __slots__ = ("BOUNDS", "_COUNTS", "_SUM", "_COUNT", "_RECENT")
+
+    def __init__(self, bounds: tuple[float, ...], window: int = 1024) -> None:
+        self.BOUNDS = bounds
+        self._COUNTS = [0] * (len(bounds) + 1)
+        self._SUM = 0.0
+        self._COUNT = 0
+        self._RECENT: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self._COUNTS[bisect_left(self.BOUNDS, value)] += 1
+        self._SUM += value
+        self._COUNT += 1
+        self._RECENT.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self._RECENT: return 0.0
+        recent = sorted(self._RECENT)
+        return recent[min(len(recent) - 1, int(q * len(recent)))]
+
+    def render(self, name: str, labels: Labels) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.BOUNDS, self._COUNTS):
+            cumulative += count
+            yield f"{name}_bucket{_format(labels, ('le', repr(bound)))} {cumulative}"
+        yield f"{name}_bucket{_format(labels, ('le', '+Inf'))} {self._COUNT}"
+        yield f"{name}_sum{_format(labels)} {self._SUM}"
+        yield f"{name}_count{_format(labels)} {self._COUNT}"
+
+
+class Metrics:
+    """
+    Registry of latency spans, histograms and counters, rendered as Prometheus text.
+    Every histogram also exports the p50, p95 and p99 of its recent samples as a
+    `<name>_recent` gauge, so percentiles can be read without a Prometheus server.
+    `serve` exposes the registry on a local HTTP port.
+    This class is thread-safe, as tools record from executor threads.
+    """
+    __slots__ = (
+        "_HISTOGRAMS",
+        "_COUNTERS",
+        "_HELP",
+        "_SERVER",
+        "METRICSLOCK"
+    )
+
+    def __init__(self) -> None:
+        self._HISTOGRAMS: dict[str, dict[Labels, Histogram]] = {}
+        self._COUNTERS: dict[str, dict[Labels, float]] = {}
+        self._HELP: dict[str, str] = {
+            'orca_span_seconds': "Time spent in each stage of handling a command.",
+            'orca_ollama_prompt_eval_seconds': "Time Ollama spent evaluating the prompt.",
+            'orca_ollama_eval_seconds': "Time Ollama spent generating the response.",
+            'orca_ollama_load_seconds': "Time Ollama spent loading the model.",
+            'orca_ollama_total_seconds': "Total time of an Ollama request.",
+            'orca_ollama_tokens_per_second': "Prompt evaluation and generation speed.",
+            'orca_ollama_prompt_tokens_total': "Prompt tokens evaluated.",
+            'orca_ollama_eval_tokens_total': "Tokens generated.",
+            'orca_ollama_requests_total': "Completed Ollama requests.",
+            'orca_tool_errors_total': "Tool calls which failed or timed out."
+        }
+        self._SERVER: ThreadingHTTPServer | None = None
+        self.METRICSLOCK: Lock = Lock()
+        """
+        A threading lock to ensure that the metrics
+        are interacted with in a thread-safe manner.
+        """
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        """
+        Records a sample in a histogram.
+
+        Args:
+            name (str): The metric name. Names ending in `_per_second` get rate buckets,
+                        all others latency buckets in seconds.
+            value (float): The sample.
+            **labels (object): The sample's labels; None values are left out.
+        """
+        key = _labels(labels)
+        with self.METRICSLOCK:
+            series = self._HISTOGRAMS.setdefault(name, {})
+            histogram = series.get(key, None)
+            if histogram is None:
+                bounds = RATE_BUCKETS if name.endswith("_per_second") else LATENCY_BUCKETS
+                histogram = series[key] = Histogram(bounds)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: object) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The metric name, ending in `_total`.
+            amount (float): The increment.
+            **labels (object): The counter's labels; None values are left out.
+        """
+        key = _labels(labels)
+        with self.METRICSLOCK:
+            series = self._COUNTERS.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    @contextmanager
+    def span(self, stage: str, **labels: object) -> Iterator[None]:
+        """
+        Times a block as one stage of handling a command, in `orca_span_seconds`.
+        The time is recorded even when the block raises.
+
+        Args:
+            stage (str): The stage, e.g. "ask", "queue_wait" or "discord_send".
+            **labels (object): Further labels, e.g. the command.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('orca_span_seconds', perf_counter() - start, span=stage, **labels)
+
+    def record_response(
+            self,
+            model: str | None,
+            response: ChatResponse,
+            command: str | None = None
+    ) -> None:
+        """
+        Records Ollama's timings and token counts from a final response.
+
+        Args:
+            model (str | None): The model which produced the response.
+            response (ChatResponse): The response, or the last part of a stream.
+            command (str | None): The command which made the request.
+        """
+        prompt_tokens = response.get('prompt_eval_count', None) or 0
+        prompt_seconds = (response.get('prompt_eval_duration', None) or 0) / NANOSECONDS
+        eval_tokens = response.get('eval_count', None) or 0
+        eval_seconds = (response.get('eval_duration', None) or 0) / NANOSECONDS
+        load_seconds = (response.get('load_duration', None) or 0) / NANOSECONDS
+        total_seconds = (response.get('total_duration', None) or 0) / NANOSECONDS
+
+        self.inc('orca_ollama_requests_total', model=model, command=command)
+        self.inc('orca_ollama_prompt_tokens_total', prompt_tokens, model=model)
+        self.inc('orca_ollama_eval_tokens_total', eval_tokens, model=model)
+        if prompt_seconds:
+            self.observe('orca_ollama_prompt_eval_seconds', prompt_seconds, model=model)
+            self.observe('orca_ollama_tokens_per_second', prompt_tokens / prompt_seconds, model=model, phase="prompt")
+        if eval_seconds:
+            self.observe('orca_ollama_eval_seconds', eval_seconds, model=model)
+            self.observe('orca_ollama_tokens_per_second', eval_tokens / eval_seconds, model=model, phase="eval")
+        if load_seconds:
+            self.observe('orca_ollama_load_seconds', load_seconds, model=model)
+        if total_seconds:
+            self.observe('orca_ollama_total_seconds', total_seconds, model=model, command=command)
+
+    def quantiles(self, name: str, **labels: object) -> dict[float, float]:
+        """
+        Returns the p50, p95 and p99 of a histogram's recent samples.
+
+        Args:
+            name (str): The metric name.
+            **labels (object): The labels of the series.
+
+        Returns:
+            dict[float, float]: The value at each quantile, empty if nothing was recorded.
+        """
+        with self.METRICSLOCK:
+            histogram = self._HISTOGRAMS.get(name, {}).get(_labels(labels), None)
+            if histogram is None: return {}
+            return {q: histogram.quantile(q) for q in QUANTILES}
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition.
+        """
+        lines: list[str] = []
+        with self.METRICSLOCK:
+            for name, series in sorted(self._COUNTERS.items()):
+                lines.append(f"# HELP {name} {self._HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format(labels)} {value}" for labels, value in series.items())
+
+            for name, series in sorted(self._HISTOGRAMS.items()):
+                lines.append(f"# HELP {name} {self._HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    lines.extend(histogram.render(name, labels))
+
+                recent = f"{name}_recent"
+                lines.append(f"# HELP {recent} Quantiles of the recent samples of {name}.")
+                lines.append(f"# TYPE {recent} gauge")
+                for labels, histogram in series.items():
+                    lines.extend(
+                        f"{recent}{_format(labels, ('quantile', str(q)))} {histogram.quantile(q)}"
+                        for q in QUANTILES
+                    )
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> None:
+        """
+        Serves the metrics as Prometheus text at `/metrics` on a background thread.
+        Does nothing if already serving.
+
+        Args:
+            port (int): The port to listen on.
+            host (str): The interface to listen on; local only by default.
+        """
+        if self._SERVER is not None: return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                LOGGER.debug(f"Metrics:::{format % args}")
+
+        try:
+            self._SERVER = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as err:
+            LOGGER.error(f"Error starting the metrics endpoint on {host}:{port}: {err}")
+            return
+        Thread(target=self._SERVER.serve_forever, name="metrics", daemon=True).start()
+        LOGGER.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def close(self) -> None:
+        """
+        Stops serving the metrics.
+        """
+        if self._SERVER is None: return
+        self._SERVER.shutdown()
+        self._SERVER.server_close()
+        self._SERVER = None
+
+
+METRICS: Metrics = Metrics()
+"""
+The process-wide metrics registry.
+"""
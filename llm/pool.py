@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+from .startup import (
+    LOGGER,
+    BotSession,
+    ThinkingMode
+)
+
+from .context import estimate_cache_size
+
+from .scheduler import InferenceScheduler
+
+from typing import TYPE_CHECKING, Mapping, Sequence
+from collections import OrderedDict
+from threading import Event, Lock
+from re import compile as re_compile
+
+if TYPE_CHECKING:
+    from ollama import (
+        Message,
+        Tool
+    )
+
+_UNSAFE_KEY = re_compile(r"[^A-Za-z0-9_.-]")
+"""
+Characters which are not allowed in a session key when it is used as a file name.
+"""
+
+
+class SessionPool:
+    """
+    Hands out one BotSession per conversation key (a channel or a user).
+    Every session shares the same model and system-prompt prefix.
+    The pool is capped by session count and, optionally, by the total number
+    of messages held in memory. The least recently used sessions are saved to
+    disk and dropped when a cap is exceeded, and are loaded back from their
+    log file the next time their key is requested.
+    Sessions held with `acquire` are pinned and never evicted until `release`,
+    so a command in flight cannot lose the messages it adds.
+    """
+    __slots__ = (
+        "_SESSIONS",
+        "_EVICTING",
+        "_LOADING",
+        "_PINS",
+        "_PARAMS",
+        "_PREFIX",
+        "_RETIRED",
+        "_NAME",
+        "TOOLS",
+        "DIRECTORY",
+        "MAXSESSIONS",
+        "MAXMESSAGES",
+        "JOURNAL",
+        "MAXHOT",
+        "COMPACTAT",
+        "KEEPALIVE",
+        "THINKING",
+        "SCHEDULER",
+        "POOLLOCK"
+    )
+
+    def __init__(
+        self,
+        params: str,
+        name: str | None,
+        prefix: Sequence[Message] = (),
+        retired_prefix: Sequence[Message] = (),
+        tools: list[Tool] = None,
+        directory: str = "sessions",
+        max_sessions: int = 64,
+        max_messages: int | None = None,
+        journal: bool = False,
+        max_hot_messages: int | None = None,
+        compact_at: int | None = None,
+        keep_alive: float | str | None = None,
+        thinking: Mapping[str, ThinkingMode] | None = None,
+        scheduler: InferenceScheduler | None = None
+    ) -> None:
+        """
+        Initializes a SessionPool instance.
+
+        Args:
+            params (str): The model configuration key used for every session.
+            name (str | None): The name of the already initialized model.
+            prefix (Sequence[Message]): The system-prompt prefix shared by every session.
+            retired_prefix (Sequence[Message]): System messages earlier prefixes had, dropped
+                                                from the head of histories which still store them.
+            tools (list[Tool]): The tools available to every session.
+            directory (str): The sub-directory of the memory folder sessions are saved in.
+            max_sessions (int): The maximum number of sessions kept in memory.
+            max_messages (int | None): The maximum number of messages kept in memory
+                                       across all sessions, or None for no limit.
+            journal (bool): Whether sessions persist to an append-only journal.
+            max_hot_messages (int | None): The maximum number of messages each session keeps
+                                           in memory before spilling older ones to disk.
+            compact_at (int | None): The estimated history size in tokens at which each session
+                                     folds its oldest turns into a summary, or None to disable.
+            keep_alive (float | str | None): How long Ollama keeps the model loaded after each request.
+            thinking (Mapping[str, ThinkingMode] | None): The thinking mode of each command.
+            scheduler (InferenceScheduler | None): The scheduler background compactions take a slot from.
+        """
+        self._SESSIONS: OrderedDict[str, BotSession] = OrderedDict()
+        """
+        The sessions held in memory, from least to most recently used.
+        """
+
+        self._EVICTING: dict[str, BotSession] = {}
+        """
+        Sessions which have been evicted but are still being saved.
+        A request for one of these keys revives the session instead
+        of reloading a possibly incomplete log file.
+        """
+
+        self._LOADING: dict[str, Event] = {}
+        """
+        Keys whose session is being built outside of the pool lock, set once it is installed.
+        Other requests for these keys wait instead of building a second session.
+        """
+
+        self._PINS: dict[str, int] = {}
+        """
+        The number of holders of each pinned session.
+        """
+
+        self._PARAMS = params
+        self._PREFIX: tuple[Message, ...] = tuple(prefix)
+        self._RETIRED: tuple[Message, ...] = tuple(retired_prefix)
+        self._NAME = name
+        self.TOOLS = tools if tools else []
+        self.DIRECTORY = directory
+        self.MAXSESSIONS = max(1, max_sessions)
+        self.MAXMESSAGES = max_messages
+        self.JOURNAL = journal
+        self.MAXHOT = max_hot_messages
+        self.COMPACTAT = compact_at
+        self.KEEPALIVE = keep_alive
+        self.THINKING = thinking
+        self.SCHEDULER = scheduler
+
+        self.POOLLOCK: Lock = Lock()
+        """
+        A threading lock to ensure that the pool
+        is interacted with in a thread-safe manner.
+        """
+
+    def __len__(self) -> int:
+        with self.POOLLOCK:
+            return len(self._SESSIONS)
+
+    def __contains__(self, key: object) -> bool:
+        with self.POOLLOCK:
+            return self._clean_key(str(key)) in self._SESSIONS
+
+    @staticmethod
+    def _clean_key(key: str) -> str:
+        return _UNSAFE_KEY.sub("_", key)
+
+    def get(self, key: str) -> BotSession:
+        """
+        Retrieves the session for a key, creating or reloading it if necessary.
+        The session may be evicted at any later request; use `acquire` to hold on to it.
+        This is a thread-safe operation.
+
+        Args:
+            key (str): The conversation key, e.g. "channel-<id>" or "user-<id>".
+
+        Returns:
+            BotSession: The session for the key.
+        """
+        return self._get(key, pin=False)
+
+    def acquire(self, key: str) -> BotSession:
+        """
+        Retrieves the session for a key like `get`, and pins it until `release`.
+        Loading the session and saving evicted ones blocks; call from a worker thread.
+        This is a thread-safe operation.
+
+        Args:
+            key (str): The conversation key, e.g. "channel-<id>" or "user-<id>".
+
+        Returns:
+            BotSession: The session for the key.
+        """
+        return self._get(key, pin=True)
+
+    def release(self, key: str) -> None:
+        """
+        Unpins a session acquired with `acquire`, evicting sessions
+        if the pool went over its caps while it was held.
+        This is a thread-safe operation.
+
+        Args:
+            key (str): The conversation key passed to `acquire`.
+        """
+        key = self._clean_key(key)
+        with self.POOLLOCK:
+            self._unpin(key)
+            evicted = self._collect_evictions()
+
+        self._save_evicted(evicted)
+
+    def _unpin(self, key: str) -> None:
+        """
+        Removes one holder of a pinned session.
+        Must be called while holding POOLLOCK.
+        """
+        holders = self._PINS.get(key, 0) - 1
+        if holders > 0:
+            self._PINS[key] = holders
+        else:
+            self._PINS.pop(key, None)
+
+    def _get(self, key: str, pin: bool) -> BotSession:
+        key = self._clean_key(key)
+        with self.POOLLOCK:
+            if pin:
+                # Pinned before loading, so a concurrent request cannot evict it meanwhile
+                self._PINS[key] = self._PINS.get(key, 0) + 1
+
+        while True:
+            with self.POOLLOCK:
+                session = self._SESSIONS.get(key, None)
+                if session is not None:
+                    self._SESSIONS.move_to_end(key)
+                    return session
+
+                session = self._EVICTING.pop(key, None)
+                if session is not None:
+                    self._SESSIONS[key] = session
+                    evicted = self._collect_evictions()
+                    break
+
+                loading = self._LOADING.get(key, None)
+                if loading is None:
+                    # Reserve the key, the session is built outside of the lock
+                    loading = self._LOADING[key] = Event()
+                    break
+
+            # Another request is loading the session, take it once installed
+            loading.wait()
+
+        if session is None:
+            try:
+                session = self._load(key)
+            except BaseException:
+                with self.POOLLOCK:
+                    del self._LOADING[key]
+                    if pin:
+                        self._unpin(key)
+                loading.set()
+                raise
+
+            with self.POOLLOCK:
+                del self._LOADING[key]
+                self._SESSIONS[key] = session
+                evicted = self._collect_evictions()
+            loading.set()
+
+        self._save_evicted(evicted)
+        return session
+
+    def _load(self, key: str) -> BotSession:
+        """
+        Builds the session for a key, reading the model configuration and its log file.
+        Called without holding POOLLOCK, as it blocks on the disk.
+        """
+        cap = self.MAXHOT or self.MAXMESSAGES
+        session = BotSession(
+            params=self._PARAMS,
+            logfile=f"{self.DIRECTORY}/{key}.json",
+            tools=self.TOOLS,
+            prefix=self._PREFIX,
+            name=self._NAME,
+            journal=self.JOURNAL,
+            max_hot_messages=self.MAXHOT,
+            compact_at=self.COMPACTAT,
+            keep_alive=self.KEEPALIVE,
+            thinking=self.THINKING,
+            scheduler=self.SCHEDULER,
+            # A session holds at most the hot messages, or every message the pool may hold
+            estimate_cache=estimate_cache_size(cap, len(self._PREFIX)) if cap else None
+        )
+        try:
+            # Drops prefix copies left in histories saved by earlier versions
+            session.set_prefix(self._PREFIX, self._RETIRED)
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    def _collect_evictions(self) -> list[tuple[str, BotSession]]:
+        """
+        Removes the least recently used sessions until the pool is within its caps.
+        Pinned sessions and the most recently used one are kept, even over the caps.
+        Must be called while holding POOLLOCK.
+
+        Returns:
+            list[tuple[str, BotSession]]: The evicted keys and sessions, still to be saved.
+        """
+        evicted = []
+        total = sum(s.message_count for s in self._SESSIONS.values()) if self.MAXMESSAGES else 0
+
+        newest = next(reversed(self._SESSIONS), None)
+
+        for key in list(self._SESSIONS):
+            if not (
+                len(self._SESSIONS) > self.MAXSESSIONS
+                or (self.MAXMESSAGES and total > self.MAXMESSAGES)
+            ): break
+            if key == newest or key in self._PINS: continue
+
+            session = self._SESSIONS.pop(key)
+            total -= session.message_count if self.MAXMESSAGES else 0
+            self._EVICTING[key] = session
+            evicted.append((key, session,))
+
+        return evicted
+
+    def _save_evicted(self, evicted: list[tuple[str, BotSession]]) -> None:
+        """
+        Saves evicted sessions outside of the pool lock.
+        """
+        for key, session in evicted:
+            session.save()
+            with self.POOLLOCK:
+                if self._EVICTING.get(key, None) is not session: continue
+                del self._EVICTING[key]
+            session.close()
+            LOGGER.info(f"Session {key} evicted to disk.")
+
+    def save_all(self) -> None:
+        """
+        Saves and closes every session currently held in memory.
+        Used at shutdown.
+        """
+        with self.POOLLOCK:
+            sessions = list(self._SESSIONS.values())
+        for session in sessions:
+            session.save()
+            session.close()
@@ -0,0 +1,188 @@
+from ._types import StartupPhase
+
+from .startup import LOGGER
+
+from typing import Any, Awaitable, Callable, Iterable
+from time import monotonic
+import asyncio
+
+
+class Readiness:
+    """
+    Runs and times the phases of the bot's startup, which proceed concurrently.
+    A phase is either run here, a blocking function in a worker thread or a
+    coroutine, optionally after another phase succeeded, or it is driven
+    elsewhere and marked with `begin` and `end`, like connecting to Discord.
+    Commands check `ready` to know whether what they need is up yet.
+    """
+    __slots__ = (
+        "_START",
+        "_BEGUN",
+        "_ENDED",
+        "_ERRORS",
+        "_EVENTS",
+        "_TASKS"
+    )
+
+    def __init__(self) -> None:
+        """
+        Initializes a Readiness instance. Phase times are measured from its creation.
+        """
+        self._START = monotonic()
+        self._BEGUN: dict[str, float] = {}
+        self._ENDED: dict[str, float] = {}
+        self._ERRORS: dict[str, str] = {}
+        self._EVENTS: dict[str, asyncio.Event] = {}
+        self._TASKS: set[asyncio.Task] = set()
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._EVENTS:
+            self._EVENTS[name] = asyncio.Event()
+        return self._EVENTS[name]
+
+    def begin(self, name: str) -> None:
+        """
+        Marks a phase as started, unless it already was.
+
+        Args:
+            name (str): The phase.
+        """
+        if name not in self._BEGUN:
+            self._BEGUN[name] = monotonic()
+
+    def end(self, name: str, error: str | None = None) -> None:
+        """
+        Marks a phase as finished, unless it already was.
+
+        Args:
+            name (str): The phase.
+            error (str | None): Why the phase failed, None if it succeeded.
+        """
+        if name in self._ENDED: return
+        self.begin(name)
+        self._ENDED[name] = monotonic()
+        if error is not None:
+            self._ERRORS[name] = error
+            LOGGER.error(f"Startup phase {name} failed after {self.seconds(name):.2f}s: {error}")
+        else:
+            LOGGER.info(f"Startup phase {name} finished in {self.seconds(name):.2f}s.")
+        self._event(name).set()
+
+    def run(
+            self,
+            name: str,
+            func: Callable[..., Any] | Callable[..., Awaitable[Any]],
+            *args: Any,
+            after: str | None = None
+    ) -> asyncio.Task:
+        """
+        Runs a phase as a task on the running event loop.
+        Blocking functions run in a worker thread, so that phases overlap.
+
+        Args:
+            name (str): The phase.
+            func (Callable): A blocking function or a coroutine function.
+            *args (Any): The arguments of `func`.
+            after (str | None): A phase which must succeed first. If it fails, this phase fails too.
+
+        Returns:
+            asyncio.Task: The task running the phase.
+        """
+        async def phase() -> None:
+            if after is not None:
+                await self.wait(after)
+                if after in self._ERRORS:
+                    self.end(name, f"{after} failed")
+                    return
+            self.begin(name)
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    await func(*args)
+                else:
+                    await asyncio.to_thread(func, *args)
+            except Exception as err:
+                self.end(name, str(err) or type(err).__name__)
+                return
+            self.end(name)
+
+        task = asyncio.get_running_loop().create_task(phase())
+        # Keep a reference, the event loop only holds weak ones
+        self._TASKS.add(task)
+        task.add_done_callback(self._TASKS.discard)
+        return task
+
+    def ready(self, name: str) -> bool:
+        """
+        Whether a phase finished successfully.
+        """
+        return name in self._ENDED and name not in self._ERRORS
+
+    def failed(self, name: str) -> bool:
+        """
+        Whether a phase finished with an error.
+        """
+        return name in self._ERRORS
+
+    def error(self, name: str) -> str | None:
+        """
+        Why a phase failed, None if it did not.
+        """
+        return self._ERRORS.get(name, None)
+
+    def seconds(self, name: str) -> float | None:
+        """
+        How long a phase took, or has been running so far. None if it has not started.
+        """
+        if name not in self._BEGUN: return None
+        return self._ENDED.get(name, monotonic()) - self._BEGUN[name]
+
+    async def wait(self, *names: str) -> None:
+        """
+        Waits until the phases finished, successfully or not.
+
+        Args:
+            *names (str): The phases.
+        """
+        for name in names:
+            await self._event(name).wait()
+
+    def timings(self) -> dict[str, StartupPhase]:
+        """
+        Returns when each phase started and how long it took, in the order they started.
+
+        Returns:
+            dict[str, StartupPhase]: The phases by name.
+        """
+        return {
+            name: {
+                'started': begun - self._START,
+                'seconds': self.seconds(name) or 0.0,
+                'done': name in self._ENDED,
+                'error': self._ERRORS.get(name, None)
+            }
+            for name, begun in sorted(self._BEGUN.items(), key=lambda item: item[1])
+        }
+
+    def summary(self, names: Iterable[str] | None = None) -> str:
+        """
+        Formats the phase timings on one line,
+        e.g. "model 0.41s, preload 2.85s, login 0.30s, gateway 1.12s; 3.26s in total".
+
+        Args:
+            names (Iterable[str] | None): The phases to include, all of them if None.
+
+        Returns:
+            str: The summary.
+        """
+        timings = self.timings()
+        if names is not None:
+            timings = {name: timings[name] for name in names if name in timings}
+
+        parts = []
+        for name, timing in timings.items():
+            state = "" if timing['done'] else " (running)"
+            if timing['error'] is not None:
+                state = " (failed)"
+            parts.append(f"{name} {timing['seconds']:.2f}s{state}")
+        total = max((timing['started'] + timing['seconds'] for timing in timings.values()), default=0.0)
+        return f"{', '.join(parts)}; {total:.2f}s in total"
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from ._types import ResidencyStats
+
+from .startup import (
+    LOGGER,
+    async_client
+)
+
+from .scheduler import (
+    InferenceScheduler,
+    Priority,
+    SchedulerBusy
+)
+
+from typing import TYPE_CHECKING, Mapping, Sequence
+from collections import deque
+from contextlib import nullcontext
+from time import monotonic
+import asyncio
+
+if TYPE_CHECKING:
+    from ollama import (
+        ChatResponse,
+        GenerateResponse,
+        Message
+    )
+
+NANOSECONDS: float = 1e9
+
+MAX_BACKOFF: float = 300.0
+"""
+The longest wait, in seconds, between keep-warm pings which keep failing.
+"""
+
+
+class ModelResidency:
+    """
+    Keeps the model loaded in Ollama between requests.
+    Every request pins the model with `keep_alive`, and while the bot is idle a
+    cheap empty generate is sent every `ping_interval` seconds, which reloads the
+    model if something else evicted it in the meantime.
+    Each response's `load_duration` tells whether the model had to be loaded for
+    it, so first-token latency is recorded separately for cold and warm requests.
+    Preloads and pings take a `Priority.SCHEDULED` slot from the scheduler, if one is
+    given, so they count towards its in-flight bound and wait for interactive requests.
+    """
+    __slots__ = (
+        "MODEL",
+        "KEEPALIVE",
+        "PINGINTERVAL",
+        "COLDTHRESHOLD",
+        "OPTIONS",
+        "SCHEDULER",
+        "_LASTUSE",
+        "_COLD",
+        "_WARM",
+        "_EVICTIONS",
+        "_PINGS",
+        "_TASK"
+    )
+
+    def __init__(
+            self,
+            model: str | None,
+            keep_alive: float | str = -1,
+            ping_interval: float = 240.0,
+            cold_threshold: float = 0.5,
+            window: int = 256,
+            options: Mapping[str, int] | None = None,
+            scheduler: InferenceScheduler | None = None
+    ) -> None:
+        """
+        Initializes a ModelResidency instance.
+
+        Args:
+            model (str | None): The name of the model to keep loaded.
+            keep_alive (float | str): How long Ollama keeps the model loaded after a request.
+                                      -1 keeps it loaded indefinitely.
+            ping_interval (float): Seconds of inactivity after which a keep-warm ping is sent.
+            cold_threshold (float): Load time in seconds above which a request counts as cold.
+            window (int): The number of recent latency samples kept per kind.
+            options (Mapping[str, int] | None): The context options the sessions send, see
+                                               `context_options`. Preloads and pings must match
+                                               them, or Ollama reloads the model for the next request.
+            scheduler (InferenceScheduler | None): The scheduler the commands' requests go through.
+        """
+        self.MODEL = model
+        self.KEEPALIVE = keep_alive
+        self.PINGINTERVAL = ping_interval
+        self.COLDTHRESHOLD = cold_threshold
+        self.OPTIONS: dict[str, int] = dict(options or {})
+        self.SCHEDULER = scheduler
+        self._LASTUSE = monotonic()
+        self._COLD: deque[float] = deque(maxlen=window)
+        self._WARM: deque[float] = deque(maxlen=window)
+        self._EVICTIONS = 0
+        self._PINGS = 0
+        self._TASK: asyncio.Task | None = None
+
+    def preload(self, prefix: Sequence[Message]) -> None:
+        """
+        Loads and pins the model, evaluating the system-prompt prefix so that
+        Ollama can reuse it for the first real request. Only one token is generated.
+
+        Args:
+            prefix (Sequence[Message]): The system-prompt prefix.
+        """
+        from ollama import ResponseError, chat
+
+        start = monotonic()
+        slot = self.SCHEDULER.hold(Priority.SCHEDULED) if self.SCHEDULER is not None else nullcontext()
+        try:
+            with slot:
+                response = chat(
+                    model=self.MODEL,
+                    messages=list(prefix),
+                    stream=False,
+                    keep_alive=self.KEEPALIVE,
+                    options={**self.OPTIONS, 'num_predict': 1}
+                )
+            self.observe(response)
+            LOGGER.info(f"Preloaded {self.MODEL} in {monotonic() - start:.2f}s.")
+        except (ResponseError, ConnectionError) as err:
+            LOGGER.error(f"Error preloading {self.MODEL}: {err}")
+
+    def observe(
+            self,
+            response: ChatResponse | GenerateResponse,
+            first_token: float | None = None
+    ) -> None:
+        """
+        Records a completed request.
+
+        Args:
+            response (ChatResponse | GenerateResponse): The final response, carrying Ollama's timings.
+            first_token (float | None): Measured seconds until the first token arrived. Estimated
+                                        from the load and prompt-eval durations when not given.
+        """
+        self._LASTUSE = monotonic()
+        load = (response.get('load_duration', None) or 0) / NANOSECONDS
+        if first_token is None:
+            first_token = load + (response.get('prompt_eval_duration', None) or 0) / NANOSECONDS
+
+        if load > self.COLDTHRESHOLD:
+            self._COLD.append(first_token)
+            LOGGER.warning(f"{self.MODEL} was loaded cold ({load:.2f}s), first token after {first_token:.2f}s.")
+        else:
+            self._WARM.append(first_token)
+
+    def touch(self) -> None:
+        """
+        Marks the model as in use, postponing the next keep-warm ping.
+        """
+        self._LASTUSE = monotonic()
+
+    async def ping(self) -> bool:
+        """
+        Sends an empty generate, which loads the model if needed and renews `keep_alive`.
+        The ping is skipped if the model was used while it waited for a slot.
+
+        Returns:
+            bool: Whether Ollama answered, or the ping was not needed.
+        """
+        if self.SCHEDULER is None:
+            return await self._ping()
+        try:
+            async with self.SCHEDULER.slot(Priority.SCHEDULED):
+                if monotonic() - self._LASTUSE < self.PINGINTERVAL:
+                    return True
+                return await self._ping()
+        except SchedulerBusy:
+            # Requests are queued for the model, which keeps it loaded
+            return True
+
+    async def _ping(self) -> bool:
+        from ollama import ResponseError
+
+        try:
+            response = await async_client().generate(
+                model=self.MODEL,
+                prompt="",
+                keep_alive=self.KEEPALIVE,
+                options=self.OPTIONS
+            )
+        except (ResponseError, ConnectionError) as err:
+            LOGGER.error(f"Error pinging {self.MODEL}: {err}")
+            return False
+
+        self._PINGS += 1
+        self._LASTUSE = monotonic()
+        load = (response.get('load_duration', None) or 0) / NANOSECONDS
+        if load > self.COLDTHRESHOLD:
+            self._EVICTIONS += 1
+            LOGGER.warning(f"{self.MODEL} had been evicted, reloaded in {load:.2f}s.")
+        return True
+
+    async def run(self) -> None:
+        """
+        Sends keep-warm pings whenever the model has been idle for `ping_interval`.
+        While pings fail, the wait between them doubles, up to MAX_BACKOFF.
+        """
+        failures = 0
+        while True:
+            try:
+                idle = monotonic() - self._LASTUSE
+                if idle < self.PINGINTERVAL:
+                    await asyncio.sleep(self.PINGINTERVAL - idle)
+                    continue
+                if await self.ping():
+                    failures = 0
+                    continue
+            except Exception as err:
+                LOGGER.exception(f"Unexpected error in the keep-warm loop of {self.MODEL}: {err}")
+
+            failures += 1
+            await asyncio.sleep(min(MAX_BACKOFF, self.PINGINTERVAL * 2 ** (failures - 1)))
+
+    def start(self) -> None:
+        """
+        Starts the keep-warm loop on the running event loop, unless it is already running.
+        """
+        if self._TASK is None or self._TASK.done():
+            self._TASK = asyncio.get_running_loop().create_task(self.run())
+
+    def stats(self) -> ResidencyStats:
+        """
+        Returns cold and warm first-token latencies and eviction counts.
+
+        Returns:
+            ResidencyStats: The metrics.
+        """
+        def mean(samples: deque[float]) -> float:
+            return sum(samples) / len(samples) if samples else 0.0
+
+        return {
+            'cold_requests': len(self._COLD),
+            'warm_requests': len(self._WARM),
+            'cold_first_token': mean(self._COLD),
+            'warm_first_token': mean(self._WARM),
+            'evictions': self._EVICTIONS,
+            'pings': self._PINGS
+        }
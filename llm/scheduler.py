@@ -0,0 +1,192 @@
+from ._types import SchedulerStats
+
+from typing import AsyncIterator, Iterator
+from enum import IntEnum
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from heapq import heappush, heappop
+from itertools import count
+from time import monotonic
+import asyncio
+
+
+class Priority(IntEnum):
+    """
+    Scheduling priority of an inference request. Lower values run first.
+    """
+    LOGIN = 0
+    ASK = 1
+    SCHEDULED = 2
+
+
+class SchedulerBusy(Exception):
+    """
+    Raised when the scheduler's queue is full and a request is shed.
+    """
+
+
+class InferenceScheduler:
+    """
+    Admission control in front of Ollama.
+    At most `max_in_flight` requests run at once; the rest wait in a priority
+    queue, first by priority and then in arrival order. Once `max_queue`
+    requests are waiting, new ones are rejected with SchedulerBusy instead of
+    growing the latency tail without bound.
+    Must be used from a single event loop; worker threads take a slot with `hold`.
+    """
+    __slots__ = (
+        "MAXINFLIGHT",
+        "MAXQUEUE",
+        "_INFLIGHT",
+        "_QUEUE",
+        "_SEQUENCE",
+        "_WAITS",
+        "_ADMITTED",
+        "_SHED",
+        "_LOOP"
+    )
+
+    def __init__(
+            self,
+            max_in_flight: int = 1,
+            max_queue: int = 16,
+            window: int = 1024
+    ) -> None:
+        """
+        Initializes an InferenceScheduler instance.
+
+        Args:
+            max_in_flight (int): The maximum number of concurrent inference requests.
+            max_queue (int): The maximum number of waiting requests before shedding load.
+            window (int): The number of recent queue-wait samples kept for the metrics.
+        """
+        self.MAXINFLIGHT = max(1, max_in_flight)
+        self.MAXQUEUE = max_queue
+        self._INFLIGHT = 0
+        self._QUEUE: list[tuple[int, int, asyncio.Future]] = []
+        self._SEQUENCE = count()
+        self._WAITS: deque[float] = deque(maxlen=window)
+        self._ADMITTED = 0
+        self._SHED = 0
+        self._LOOP: asyncio.AbstractEventLoop | None = None
+        """
+        The event loop the scheduler is used from, known once a slot was first requested.
+        """
+
+    @property
+    def queued(self) -> int:
+        """
+        The number of requests waiting for a slot.
+        """
+        return sum(1 for _, _, waiter in self._QUEUE if not waiter.done())
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.ASK) -> AsyncIterator[float]:
+        """
+        Waits for an inference slot and holds it for the duration of the block.
+
+        Args:
+            priority (Priority): The priority of the request.
+
+        Yields:
+            float: The time spent waiting in the queue, in seconds.
+
+        Raises:
+            SchedulerBusy: If the queue is full.
+        """
+        waited = await self._acquire(priority)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    @contextmanager
+    def hold(self, priority: Priority = Priority.SCHEDULED) -> Iterator[float]:
+        """
+        Blocking counterpart of `slot` for worker threads, e.g. background compaction.
+        The slot is taken and given back on the scheduler's event loop. Before any
+        slot was requested there, nothing is in flight and the block runs right away.
+
+        Args:
+            priority (Priority): The priority of the request.
+
+        Yields:
+            float: The time spent waiting in the queue, in seconds.
+
+        Raises:
+            SchedulerBusy: If the queue is full.
+            RuntimeError: If called from the scheduler's event loop, which it would block.
+        """
+        loop = self._LOOP
+        if loop is None or loop.is_closed():
+            yield 0.0
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("InferenceScheduler.hold would block its own event loop, use slot.")
+
+        waited = asyncio.run_coroutine_threadsafe(self._acquire(priority), loop).result()
+        try:
+            yield waited
+        finally:
+            loop.call_soon_threadsafe(self._release)
+
+    async def _acquire(self, priority: Priority) -> float:
+        self._LOOP = asyncio.get_running_loop()
+        start = monotonic()
+        if self._INFLIGHT < self.MAXINFLIGHT and not self.queued:
+            self._INFLIGHT += 1
+        else:
+            if self.queued >= self.MAXQUEUE:
+                self._SHED += 1
+                raise SchedulerBusy(f"{self.queued} inference requests already queued")
+
+            waiter = asyncio.get_running_loop().create_future()
+            heappush(self._QUEUE, (int(priority), next(self._SEQUENCE), waiter,))
+            try:
+                # The releasing request hands its slot over by resolving the future
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before the cancellation
+                    self._release()
+                raise
+
+        waited = monotonic() - start
+        self._WAITS.append(waited)
+        self._ADMITTED += 1
+        return waited
+
+    def _release(self) -> None:
+        while self._QUEUE:
+            _, _, waiter = heappop(self._QUEUE)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._INFLIGHT -= 1
+
+    def stats(self) -> SchedulerStats:
+        """
+        Returns the scheduler's current load and queue-wait metrics.
+
+        Returns:
+            SchedulerStats: The metrics.
+        """
+        waits = sorted(self._WAITS)
+
+        def percentile(p: float) -> float:
+            if not waits: return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            'in_flight': self._INFLIGHT,
+            'queued': self.queued,
+            'admitted': self._ADMITTED,
+            'shed': self._SHED,
+            'wait_p50': percentile(0.50),
+            'wait_p95': percentile(0.95),
+            'wait_max': waits[-1] if waits else 0.0
+        }
@@ -1,29 +1,59 @@
-from ollama import (
-    chat,
-    ChatResponse,
-    Message,
-    create,
-    list as list_models,
-    ListResponse,
-    ResponseError
-)
+from __future__ import annotations
 
 from ._types import (
-    Modelfile
+    Modelfile,
+    ContextStats,
+    ThinkingStats
+)
+
+from .context import (
+    ContextWindow,
+    ESTIMATE_CACHE_SIZE,
+    estimate_cache_size
+)
+
+from .journal import (
+    Journal,
+    encode_message
+)
+
+from .history import (
+    MessageHistory,
+    HistoryView
+)
+
+from .metrics import METRICS
+
+from .scheduler import (
+    InferenceScheduler,
+    Priority,
+    SchedulerBusy
 )
 
 from .utils import (
-    Tool,
+    SYSTEM_PROMPT_SUMMARY,
+    SUMMARY_TAG
 )
 
-from typing import Iterator, Sequence
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator, Mapping, Sequence
 from logging import getLogger, Logger
 from os.path import exists, isfile
 from pathlib import Path
 from os import makedirs
 
 from json import load, dumps
-from threading import Lock
+from threading import Lock, Thread
+from contextlib import nullcontext
+
+if TYPE_CHECKING:
+    # ollama, and pydantic with it, is only imported where it is first called
+    from ollama import (
+        AsyncClient,
+        ChatResponse,
+        ListResponse,
+        Message,
+        Tool
+    )
 
 LOGGER: Logger = getLogger(__name__)
 """
@@ -32,15 +62,129 @@ Set to log at the INFO level by default (convenience).
 """
 LOGGER.setLevel('INFO')
 
+_ASYNC_CLIENT: AsyncClient | None = None
+"""
+Shared asynchronous Ollama client.
+Created lazily so that it binds to the running event loop
+and reuses one connection pool across every session.
+"""
+
+
+def async_client() -> AsyncClient:
+    """
+    Returns the shared asynchronous Ollama client, creating it on first use.
+
+    Returns:
+        AsyncClient: The shared asynchronous client.
+    """
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        from ollama import AsyncClient
+        _ASYNC_CLIENT = AsyncClient()
+    return _ASYNC_CLIENT
+
+
+def context_options(modelfile: Modelfile | None) -> dict[str, int]:
+    """
+    Request options making Ollama allocate the configured context window.
+    Every request for a model must send the same `num_ctx`,
+    or Ollama reloads the model with the other context size.
+
+    Args:
+        modelfile (Modelfile | None): The model's configuration.
+
+    Returns:
+        dict[str, int]: The options, empty if no context length is configured.
+    """
+    if not modelfile or 'context_length' not in modelfile: return {}
+    return {'num_ctx': modelfile['context_length']}
+
+
+ThinkingMode = bool | int | None
+"""
+How much a command lets the model think: False disables thinking at the request level,
+True enables it, an int enables it with a budget of that many thinking tokens,
+and None leaves the model's default behaviour.
+"""
+
+_THINKING_STATS: dict[str, ThinkingStats] = {}
+_THINKINGLOCK: Lock = Lock()
+
+
+def _record_thinking(command: str | None, generated: int, thinking: int, exceeded: bool) -> None:
+    """
+    Adds one request to the per-command thinking metrics.
+    """
+    with _THINKINGLOCK:
+        stats = _THINKING_STATS.setdefault(command or "default", {
+            'requests': 0,
+            'generated_tokens': 0,
+            'thinking_tokens': 0,
+            'delivered_tokens': 0,
+            'budget_exceeded': 0
+        })
+        stats['requests'] += 1
+        stats['generated_tokens'] += generated
+        stats['thinking_tokens'] += thinking
+        stats['delivered_tokens'] += max(0, generated - thinking)
+        stats['budget_exceeded'] += int(exceeded)
+
+
+def thinking_stats() -> dict[str, ThinkingStats]:
+    """
+    Returns the tokens generated versus delivered per command, across every session.
+
+    Returns:
+        dict[str, ThinkingStats]: The metrics keyed by command.
+    """
+    with _THINKINGLOCK:
+        return {command: stats.copy() for command, stats in _THINKING_STATS.items()}
+
+async def _collect(parts: AsyncIterator[ChatResponse]) -> ChatResponse:
+    """
+    Gathers a response stream into a single response, as a non-streamed request returns.
+    """
+    from ollama import ChatResponse, Message
+
+    content: list[str] = []
+    thinking: list[str] = []
+    calls = []
+    last: ChatResponse | None = None
+    async for part in parts:
+        content.append(part['message'].get('content', None) or "")
+        thinking.append(part['message'].get('thinking', None) or "")
+        calls.extend(part['message'].get('tool_calls', None) or [])
+        last = part
+
+    message = Message(
+        role="assistant",
+        content="".join(content),
+        thinking="".join(thinking) or None,
+        tool_calls=calls or None
+    )
+    if last is None:
+        return ChatResponse(message=message, done=True)
+    return last.model_copy(update={'message': message})
+
+
 class BotSession:
     __slots__ = (
         "_MODELFILE",
         "_MESSAGES",
+        "_PREFIX",
         "LOGFILE",
         "MFLOCK",
         "MSGLOCK",
         "_NAME",
-        "TOOLS"
+        "TOOLS",
+        "_WINDOW",
+        "_CONTEXTSTATS",
+        "_JOURNAL",
+        "COMPACTAT",
+        "_COMPACTING",
+        "KEEPALIVE",
+        "THINKING",
+        "SCHEDULER"
     )
 
     def __init__(
@@ -48,7 +192,20 @@ class BotSession:
         params: str = "2b",
         logfile: str = "chatlog.json",
         tools: list[Tool] = None,
-        defaultmsgs: Sequence[Message] = []
+        defaultmsgs: Sequence[Message] = [],
+        prefix: Sequence[Message] = (),
+        name: str | None = None,
+        context_budget: int | None = None,
+        journal: bool = False,
+        flush_interval: float = 1.0,
+        compact_every: int = 1000,
+        max_hot_messages: int | None = None,
+        max_hot_bytes: int | None = None,
+        compact_at: int | None = None,
+        keep_alive: float | str | None = None,
+        thinking: Mapping[str, ThinkingMode] | None = None,
+        scheduler: InferenceScheduler | None = None,
+        estimate_cache: int | None = None
     ) -> None:
         
         self._MODELFILE: Modelfile | None = None
@@ -58,29 +215,43 @@ class BotSession:
         the `read_config_file` function.
         """
 
-        self._MESSAGES: list[Message] = []
-        """
-        A list of messages for this session.
-        """
-
         self.LOGFILE = Path(__file__).parent.resolve() / "memory" / logfile
         self.LOGFILE.parent.mkdir(parents=True, exist_ok=True)
         """
         The path to the chat log file where the conversation
         will be saved. Defaults to "chatlog.json".
         """
-        
+
+        self._MESSAGES: MessageHistory = MessageHistory(
+            self.LOGFILE.with_suffix(".cold.jsonl"),
+            max_messages=max_hot_messages,
+            max_bytes=max_hot_bytes
+        )
+        """
+        The messages for this session.
+        Only the newest messages are kept in memory when a cap is given,
+        older ones are spilled to a cold segment next to the log file.
+        """
+
+        self._PREFIX: tuple[Message, ...] = tuple(prefix)
+        """
+        The system-prompt prefix sent ahead of the messages.
+        It is kept apart from the history so that many sessions can
+        share the same prebuilt prefix without copying or saving it.
+        """
+
         self.TOOLS = tools if tools else []
         """
         A list of tools that the bot can use during the chat session.
         If no tools are provided, it defaults to an empty list.
         """
 
-        self._NAME: str | None = None
+        self._NAME: str | None = name
         """
         The name of the model being used.
         This is initialized to None and will be set
-        when the model is successfully initialized.
+        when the model is successfully initialized,
+        unless an already initialized model name is given.
         """
 
         self.MFLOCK: Lock = Lock()
@@ -96,8 +267,71 @@ class BotSession:
         """
         self.read_config_file(params=params)
 
+        if estimate_cache is None:
+            estimate_cache = (
+                estimate_cache_size(max_hot_messages, len(self._PREFIX))
+                if max_hot_messages else ESTIMATE_CACHE_SIZE
+            )
+        self._WINDOW: ContextWindow = ContextWindow(
+            self._context_budget(context_budget),
+            cache_size=estimate_cache
+        )
+        """
+        Selects which messages fit into the prompt token budget of each request.
+        Its estimate cache holds every message kept in memory, unless a size is given.
+        """
+
+        self._CONTEXTSTATS: ContextStats | None = None
+        """
+        Statistics about the messages sent with the latest request.
+        """
+
+        self._JOURNAL: Journal | None = Journal(
+            self.LOGFILE,
+            interval=flush_interval,
+            compact_every=compact_every,
+            on_compact=self.save
+        ) if journal else None
+        """
+        Append-only journal the messages are persisted to, when journal mode is on.
+        Each added message is appended as one line and flushed in batches by a
+        background writer, instead of `save` rewriting the whole history.
+        """
+
+        self.COMPACTAT: int | None = compact_at
+        """
+        Estimated history size in tokens which triggers a background compaction,
+        folding the oldest turns into a model-generated summary. None disables it.
+        """
+
+        self._COMPACTING: bool = False
+        """
+        Whether a compaction is running. Guarded by MSGLOCK.
+        """
+
+        self.KEEPALIVE: float | str | None = keep_alive
+        """
+        How long Ollama keeps the model loaded after each request, -1 for indefinitely.
+        None leaves Ollama's default idle timeout in place.
+        """
+
+        self.THINKING: dict[str, ThinkingMode] = dict(thinking) if thinking else {}
+        """
+        Thinking mode per command, e.g. off for "ask" and a small budget for tool-routing turns.
+        Commands without an entry use the model's default behaviour.
+        """
+
+        self.SCHEDULER: InferenceScheduler | None = scheduler
+        """
+        The scheduler the commands' requests go through. Background compaction
+        takes a slot at `Priority.SCHEDULED` from it, below every interactive request.
+        """
+
         self.load_messages(defaultmsgs)
 
+        if self._JOURNAL is not None:
+            self._JOURNAL.start()
+
         LOGGER.info(f"BotSession initialized with params: {params}, logfile: {logfile}, tools: {tools}")
 
     @property
@@ -116,19 +350,60 @@ class BotSession:
             return modelcopy
         
     @property
-    def messages(self) -> list[Message]:
+    def messages(self) -> HistoryView:
         """
         Property to access the messages of the session.
-        This is a thread-safe way to access the messages.
-        It returns a copy of the messages to ensure that
-        the original content is not modified outside of this class.
+        It returns a read-only view of the in-memory messages rather than a copy,
+        so accessing it is O(1). The view is live: it reflects messages added later.
+        Copy it with `list(...)` for a stable snapshot.
+
+        Returns:
+            - HistoryView: A read-only view of the in-memory messages.
+        """
+        return self._MESSAGES.view()
+
+    def cold_messages(self) -> Iterator[Message]:
+        """
+        Streams the messages spilled to disk, oldest first.
+        These are never read unless requested, e.g. for summarization or export.
+
+        Returns:
+            Iterator[Message]: The spilled messages.
+        """
+        return self._MESSAGES.cold()
+
+    def export_messages(self) -> list[Message]:
+        """
+        Returns the complete history: the spilled messages followed by the in-memory ones.
+        This is a thread-safe operation.
 
         Returns:
-            - list[Message]: A copy of the messages in the session.
+            list[Message]: Every message in the session, excluding the prefix.
         """
         with self.MSGLOCK:
-            return self._MESSAGES.copy()
+            return list(self._MESSAGES.all())
         
+    @property
+    def prefix(self) -> tuple[Message, ...]:
+        """
+        Property to access the system-prompt prefix of the session.
+
+        Returns:
+            - tuple[Message, ...]: The shared, immutable prefix.
+        """
+        return self._PREFIX
+
+    @property
+    def message_count(self) -> int:
+        """
+        Property to access the number of messages in the session,
+        without copying them.
+
+        Returns:
+            - int: The number of messages, excluding the prefix.
+        """
+        return len(self._MESSAGES)
+
     @property
     def name(self) -> str | None:
         """
@@ -138,10 +413,130 @@ class BotSession:
             - str | None: The name of the model, or None if not set.
         """
         return self._NAME
+
+    @property
+    def context_stats(self) -> ContextStats | None:
+        """
+        Property to access statistics about the messages sent with the latest request.
+
+        Returns:
+            - ContextStats | None: The statistics, or None before the first request.
+        """
+        return self._CONTEXTSTATS
+
+    def _context_budget(self, budget: int | None) -> int:
+        """
+        Resolves the prompt token budget: an explicit budget, else `context_budget`
+        from the config file, else three quarters of `context_length` so that the
+        remainder is left for the response.
+        """
+        if budget: return budget
+        with self.MFLOCK:
+            if not self._MODELFILE: return 4096
+            return self._MODELFILE.get(
+                'context_budget',
+                self._MODELFILE.get('context_length', 4096) * 3 // 4
+            )
+
+    def _options(self) -> dict[str, int]:
+        """
+        Request options making Ollama allocate the configured context window
+        instead of its small default one.
+        """
+        with self.MFLOCK:
+            return context_options(self._MODELFILE)
+
+    def _context(self) -> list[Message]:
+        """
+        Selects the messages to send with a request.
+        Must be called while holding MSGLOCK.
+        """
+        messages, self._CONTEXTSTATS = self._WINDOW.fit(self._PREFIX, self._MESSAGES.hot)
+        if self._CONTEXTSTATS['dropped_messages']:
+            LOGGER.info(f"Context window applied: {self._CONTEXTSTATS}")
+
+        if (
+            self.COMPACTAT is not None
+            and not self._COMPACTING
+            and self._CONTEXTSTATS['history_tokens'] > self.COMPACTAT
+        ):
+            self._COMPACTING = True
+            Thread(target=self._compact, name="compaction", daemon=True).start()
+        return messages
+
+    def _compact(self) -> None:
+        """
+        Folds the oldest turns into one summary message, off the request path.
+        The span to fold is chosen under MSGLOCK, the model is called without it,
+        and the span is only replaced if it is still at the head of the history.
+        A previous summary at the head is part of the span, so summaries are
+        incremental: each new one is a summary of the last summary plus newer turns.
+        """
+        from ollama import ResponseError, chat
+
+        try:
+            with self.MSGLOCK:
+                hot = self._MESSAGES.hot
+                keep = self.COMPACTAT // 2
+                kept = 0
+                count = len(hot)
+                while count > 0 and kept + self._WINDOW.estimate(hot[count - 1]) <= keep:
+                    count -= 1
+                    kept += self._WINDOW.estimate(hot[count])
+                # Never split a tool call from its response
+                while count < len(hot) and hot[count].get('role', None) == "tool":
+                    count += 1
+                span = hot[:count]
+
+            if len(span) < 2:
+                return
+
+            transcript = "\n\n".join(
+                f"{msg.get('role', None)}: {msg.get('content', None) or ''}" for msg in span
+            )
+            slot = self.SCHEDULER.hold(Priority.SCHEDULED) if self.SCHEDULER is not None else nullcontext()
+            with slot:
+                response: ChatResponse = chat(
+                    model=self._NAME,
+                    messages=[
+                        {'role': "system", 'content': SYSTEM_PROMPT_SUMMARY},
+                        {'role': "user", 'content': transcript}
+                    ],
+                    stream=False,
+                    options=self._options(),
+                    keep_alive=self.KEEPALIVE
+                )
+            summary: Message = {
+                'role': "system",
+                'content': f"{SUMMARY_TAG}\n{response['message']['content'].strip()}"
+            }
+
+            with self.MSGLOCK:
+                hot = self._MESSAGES.hot
+                if len(hot) < len(span) or any(a is not b for a, b in zip(hot, span)):
+                    LOGGER.info("History changed during compaction, discarding summary.")
+                    return
+                if not self._MESSAGES.fold_head(len(span), summary):
+                    return
+            LOGGER.info(f"Compacted {len(span)} messages into a summary.")
+
+            # The journal can only append, so rewrite the snapshot
+            if self._JOURNAL is not None:
+                self.save()
+
+        except SchedulerBusy:
+            # Retried with a later request, once the queue has drained
+            LOGGER.info("Inference queue is full, postponing compaction.")
+        except (ResponseError, ConnectionError) as err:
+            LOGGER.error(f"Error compacting messages: {err}")
+        finally:
+            with self.MSGLOCK:
+                self._COMPACTING = False
         
     def chat(
         self,
-        stream: bool = True
+        stream: bool = True,
+        think: bool | None = None
     )  -> Iterator[ChatResponse]:
         """
         Starts a chat session with the model using the current messages.
@@ -149,17 +544,130 @@ class BotSession:
 
         Args:
             stream (bool): Whether to stream the response or not. Defaults to True.
+            think (bool | None): Whether the model may think, or None for its default.
 
         Returns:
             Iterator[ChatResponse]: An iterator that yields ChatResponse objects.
         """
+        from ollama import chat
+
         with self.MSGLOCK:
-            return chat(
+            response = chat(
                 model=self._NAME,
-                messages=self._MESSAGES,
+                messages=self._context(),
                 stream=stream,
-                tools=self.TOOLS
+                tools=self.TOOLS,
+                think=think,
+                options=self._options(),
+                keep_alive=self.KEEPALIVE
             )
+        if not stream:
+            METRICS.record_response(self._NAME, response)
+            return response
+        return self._observed(response)
+
+    def _observed(self, parts: Iterator[ChatResponse]) -> Iterator[ChatResponse]:
+        """
+        Passes a response stream through, recording the final part's timings.
+        """
+        for part in parts:
+            if part.get('done', None):
+                METRICS.record_response(self._NAME, part)
+            yield part
+
+    async def achat(
+        self,
+        stream: bool = True,
+        command: str | None = None
+    ) -> ChatResponse | AsyncIterator[ChatResponse]:
+        """
+        Asynchronous counterpart of `chat`, built on the shared `AsyncClient`.
+        The messages are snapshotted under MSGLOCK so the model sees the same
+        consistent history `chat` would, but the lock is released before the
+        request is awaited so the event loop and other sessions are never stalled.
+
+        Responses are always streamed from Ollama; without `stream` they are
+        collected into one response before returning.
+        The command selects the thinking mode from THINKING. With a budget the
+        response is streamed with thinking enabled; once the model has spent
+        the budget, the stream is closed and the request is repeated with
+        thinking disabled so that it answers straight away.
+
+        Args:
+            stream (bool): Whether to stream the response or not. Defaults to True.
+            command (str | None): The command making the request, e.g. "ask".
+
+        Returns:
+            ChatResponse | AsyncIterator[ChatResponse]: The response, or an async iterator
+                                                        of partial responses when streaming.
+        """
+        with self.MSGLOCK:
+            messages = self._context()
+
+        request = {
+            'model': self._NAME,
+            'messages': messages,
+            'tools': self.TOOLS,
+            'options': self._options(),
+            'keep_alive': self.KEEPALIVE
+        }
+        mode = self.THINKING.get(command, None) if command else None
+
+        if isinstance(mode, int) and not isinstance(mode, bool):
+            parts = self._budgeted(command, request, mode)
+            return parts if stream else await _collect(parts)
+
+        # Non-streamed responses are collected from a stream too, so that thinking is
+        # counted in streamed parts, one per generated token, on every path
+        parts = self._metered(command, await async_client().chat(**request, stream=True, think=mode))
+        return parts if stream else await _collect(parts)
+
+    async def _metered(
+        self,
+        command: str | None,
+        parts: AsyncIterator[ChatResponse]
+    ) -> AsyncIterator[ChatResponse]:
+        """
+        Passes a response stream through, counting its thinking tokens.
+        """
+        thinking = 0
+        async for part in parts:
+            if part['message'].get('thinking', None):
+                thinking += 1
+            if part.get('done', None):
+                METRICS.record_response(self._NAME, part, command)
+                _record_thinking(command, part.get('eval_count', None) or 0, thinking, False)
+            yield part
+
+    async def _budgeted(
+        self,
+        command: str | None,
+        request: dict[str, Any],
+        budget: int
+    ) -> AsyncIterator[ChatResponse]:
+        """
+        Streams a response with thinking capped at `budget` tokens.
+        """
+        thinking = 0
+        parts = await async_client().chat(**request, stream=True, think=True)
+        async for part in parts:
+            if part['message'].get('thinking', None):
+                thinking += 1
+                if thinking > budget: break
+            if part.get('done', None):
+                METRICS.record_response(self._NAME, part, command)
+                _record_thinking(command, part.get('eval_count', None) or 0, thinking, False)
+            yield part
+        else:
+            return
+
+        await parts.aclose()
+        LOGGER.info(f"Thinking budget of {budget} tokens spent for {command}, answering without thinking.")
+        async for part in await async_client().chat(**request, stream=True, think=False):
+            if part.get('done', None):
+                METRICS.record_response(self._NAME, part, command)
+                _record_thinking(command, thinking + (part.get('eval_count', None) or 0), thinking, True)
+            yield part
         
     def add_message(
         self,
@@ -174,7 +682,9 @@ class BotSession:
         """
         with self.MSGLOCK:
             self._MESSAGES.append(message)
-            LOGGER.info(f"Message added: {Message}")
+            if self._JOURNAL is not None:
+                self._JOURNAL.append((message,))
+            LOGGER.info(f"Message added: {message['role']}")
 
     def get_message(
             self,
@@ -211,6 +721,8 @@ class BotSession:
         """
         with self.MSGLOCK:
             self._MESSAGES.extend(messages)
+            if self._JOURNAL is not None:
+                self._JOURNAL.append(messages)
             LOGGER.info(f"Messages extended: {messages}")
 
     def prepend_messages(self, startingmsgs: Sequence[Message]) -> None:
@@ -220,34 +732,96 @@ class BotSession:
         WARNING: Big memory and performance impact if the list is large.
         """
         with self.MSGLOCK:
-            if not all(msg in self._MESSAGES for msg in startingmsgs):
-                LOGGER.info("Prepending messages to the session.")
-                self._MESSAGES = list(startingmsgs) + self._MESSAGES
+            if all(msg in self._MESSAGES for msg in startingmsgs): return
+            LOGGER.info("Prepending messages to the session.")
+            self._MESSAGES.load([*startingmsgs, *self._MESSAGES.hot])
+
+        # The journal can only append, so rewrite the snapshot
+        if self._JOURNAL is not None:
+            self.save()
+
+    def set_prefix(
+            self,
+            prefix: Sequence[Message],
+            retired: Sequence[Message] = ()
+    ) -> None:
+        """
+        Sets the shared system-prompt prefix of the session.
+        Histories saved before the prefix was kept separately start with
+        copies of the prefix messages, and of messages which earlier prefixes
+        had but the current one does not. That leading run of system messages
+        is dropped here, once: the history is saved without it.
+        This is a thread-safe operation.
 
+        Args:
+            prefix (Sequence[Message]): The prefix to send ahead of the messages.
+            retired (Sequence[Message]): System messages no longer part of the prefix,
+                                         e.g. the thinking suppression prompt.
+        """
+        with self.MSGLOCK:
+            self._PREFIX = tuple(prefix)
+            count = 0
+            for msg in self._MESSAGES:
+                if msg.get('role', None) != "system": break
+                if msg not in self._PREFIX and msg not in retired: break
+                count += 1
+            if not count: return
+            LOGGER.info(f"Dropping {count} stored prefix messages from the session.")
+            self._MESSAGES.drop_head(count)
+
+        self.save()
         
     def save(self) -> None:
         """
         Saves the current model file content to a JSON file.
+        In journal mode this compacts the journal instead: the history is
+        copied under the lock and the snapshot is written after releasing it.
         This is a thread-safe operation.
         """
+        if self._JOURNAL is not None:
+            # Snapshots must reach the disk in the order their segments were rotated
+            with self._JOURNAL.SNAPSHOTLOCK:
+                with self.MSGLOCK:
+                    messages = self._MESSAGES.copy()
+                    offset = self._MESSAGES.cold_count
+                    through = self._JOURNAL.rotate()
+                self._JOURNAL.write_snapshot(messages, through, offset)
+            return
+
         with self.MSGLOCK:
             try:
                 with open(self.LOGFILE, "w") as f:
-                    f.write(dumps(self._MESSAGES, indent=4))
+                    f.write(dumps(list(self._MESSAGES.all()), indent=4, default=encode_message))
                     LOGGER.info("Messages saved successfully.")    
-            except ValueError as err:
+            except (ValueError, TypeError) as err:
                 LOGGER.error(f"Error saving messages: {err}")
+
+    def close(self) -> None:
+        """
+        Flushes and stops the journal writer, if journal mode is on.
+        """
+        if self._JOURNAL is not None:
+            self._JOURNAL.close()
         
 
     def load_messages(self,
                       defaults: Sequence[Message]) -> None:
         """
         Loads the messages from the chat log file.
+        In journal mode the snapshot and journal are replayed as a stream,
+        falling back to the chat log file for histories saved before.
         This is a thread-safe operation.
         """
+        if self._JOURNAL is not None and self._JOURNAL.exists:
+            with self.MSGLOCK:
+                self._MESSAGES.load(self._JOURNAL.replay(), base=self._JOURNAL.offset)
+                LOGGER.info(f"Replayed {len(self._MESSAGES)} messages from the journal.")
+                if defaults and not all(msg in self._MESSAGES for msg in defaults):
+                    self._MESSAGES.load([*defaults, *self._MESSAGES.hot])
+            return
+
         if not exists(self.LOGFILE) or not isfile(self.LOGFILE):
             LOGGER.warning(f"Log file {self.LOGFILE} does not exist. Starting fresh.")
-            self._MESSAGES = []
             return
 
         with self.MSGLOCK:
@@ -259,12 +833,12 @@ class BotSession:
                 # Check if defaults are already present in the messages
                 if all(msg in messages for msg in defaults):
                     LOGGER.info("Defaults already present in messages, skipping addition.")
-                    self._MESSAGES = messages
+                    self._MESSAGES.load(messages, base=0)
                     return
 
                 # Prepend default messages to the session
                 LOGGER.info("Prepending default messages to the session.")
-                self._MESSAGES = list(defaults) + messages
+                self._MESSAGES.load(list(defaults) + messages, base=0)
 
                 
             except ValueError:
@@ -326,6 +900,8 @@ class BotSession:
             tuple[bool, str | None]: A tuple containing a boolean indicating success or failure,
                                     and an error message if applicable.
         """
+        from ollama import ResponseError, create, list as list_models
+
         # List all models
         models: ListResponse = list_models()
         with self.MFLOCK:
@@ -342,6 +918,7 @@ class BotSession:
 
         system = modelcopy.pop("system", None)
         name = modelcopy.pop("name", None)
+        modelcopy.pop("context_budget", None)
         model = modelcopy.pop("model", None)
 
         try:
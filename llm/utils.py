@@ -1,19 +1,32 @@
-from ollama import Tool, Message
+from __future__ import annotations
+
 from ._types import (
-    ToolCall,
+    ToolPolicy,
     ToolResponse,
     AuthenticationToken,
     ToolCallErrorResponse,
     ToolCallReturnData
 )
-from typing import Sequence, Callable
-import jwt
+from typing import TYPE_CHECKING, Sequence, Callable, Literal
+from concurrent.futures import (
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    TimeoutError as FutureTimeoutError
+)
+from time import monotonic
+
+from .metrics import METRICS
 
 from os import environ
-from dotenv import load_dotenv
 
 from json import dumps
 
+if TYPE_CHECKING:
+    from ollama import Tool, Message
+    from ._models import ToolCall
+
 SYSTEM_PROMPT_TOOLS = (
     """
 {- if .Messages }}
@@ -165,6 +178,22 @@ If the input starts with "ORCA " but doesn't match any command, respond with: "C
 """
 )
 
+SYSTEM_PROMPT_SUMMARY = (
+"""
+You compact the conversation history of ORCA, a medical assistant chatbot.
+Summarise the transcript below into a concise briefing for ORCA to continue the conversation from.
+An earlier summary may open the transcript: fold it in, do not summarise it separately.
+Keep: who the users are, what they asked, facts and figures given, decisions, open questions and commitments.
+Drop: greetings, small talk, repeated content and any credentials or tokens.
+Write plain prose in English spelling, no more than 300 words, and do not address the user.
+"""
+)
+
+SUMMARY_TAG = "[Summary of earlier conversation]"
+"""
+Opens every summary message, marking it as a compacted span.
+"""
+
 # Command definitions for ORCA
 COMMANDS = [
     {
@@ -283,9 +312,12 @@ def _mock_jwt(
         Returns:
             str: The generated JWT token.
         """
+        import jwt
         return jwt.encode(payload, secret, algorithm=algorithm)
 
-    assert load_dotenv(verbose=True), "Failed to load .env file"
+    from dotenv import load_dotenv
+
+    load_dotenv(verbose=True)
     SECRET = environ.get("CLIENT_SECRET", None)
     assert SECRET is not None, "CLIENT_SECRET is not set in the environment variables"
 
@@ -430,17 +462,105 @@ def get_specific_call(name: str, responses: list[ToolResponse]) -> ToolResponse
     return None
 
 
+TOOL_POLICIES: dict[str, ToolPolicy] = {
+    "generate_random_string": {
+        'executor': "thread",
+        'timeout': 5.0
+    },
+    "login": {
+        'executor': "thread",
+        'timeout': 10.0
+    }
+}
+"""
+How each tool is executed: on the shared thread pool (I/O-bound tools) or
+process pool (CPU-bound tools), and how long it may run before the model is told it timed out.
+"""
+
+DEFAULT_TOOL_POLICY: ToolPolicy = {
+    'executor': "thread",
+    'timeout': 10.0
+}
+
+_EXECUTORS: dict[str, Executor] = {}
+
+
+def _executor(kind: Literal["thread", "process"]) -> Executor:
+    """
+    Returns the shared executor of a kind, creating it on first use.
+    """
+    executor = _EXECUTORS.get(kind, None)
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=2) if kind == "process" else ThreadPoolExecutor(
+            max_workers=8,
+            thread_name_prefix="tool"
+        )
+        _EXECUTORS[kind] = executor
+    return executor
+
+
 def handle_tool_calls(message: Message) -> list[ToolResponse]:
-    out = []
-    
-    calls: Sequence[ToolCall] = message.get('tool_calls', [])
-    
+    """
+    Executes the tool calls of a model message concurrently.
+    Every call is submitted to its tool's executor up front, then the results are
+    collected in the order the model made the calls. A call which fails or runs past
+    its tool's timeout is answered with an error response, so the model is told
+    about it instead of the whole request hanging.
+
+    Args:
+        message (Message): The model message containing the tool calls.
+
+    Returns:
+        list[ToolResponse]: One response per known tool, in call order.
+    """
+    calls: Sequence[ToolCall] = message.get('tool_calls', None) or []
+    pending: list[tuple[str, float, Future]] = []
+
     for call in calls:
         name = call.function.name
         args = call.function.arguments
         func = TOOLS_LOOKUP.get(name, None)
         if not func: continue
-        result = func(**args)
+        policy = TOOL_POLICIES.get(name, DEFAULT_TOOL_POLICY)
+        start = monotonic()
+        deadline = start + policy['timeout']
+        future = _executor(policy['executor']).submit(func, **args)
+        # Timed when the call finishes, not when its result is collected
+        future.add_done_callback(
+            lambda _, name=name, start=start: METRICS.observe('orca_span_seconds', monotonic() - start, span="tool", tool=name)
+        )
+        pending.append((name, deadline, future,))
+
+    out = []
+    for name, deadline, future in pending:
+        try:
+            result = future.result(timeout=max(0.0, deadline - monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            METRICS.inc('orca_tool_errors_total', tool=name, status=504)
+            result = create_error_response([{
+                'title': 'Tool Timeout',
+                'details': f"{name} did not finish within {TOOL_POLICIES.get(name, DEFAULT_TOOL_POLICY)['timeout']} seconds",
+                'status': 504,
+                'meta': None
+            }])
+        except TypeError as e:
+            METRICS.inc('orca_tool_errors_total', tool=name, status=400)
+            result = create_error_response([{
+                'title': 'Invalid Arguments',
+                'details': str(e),
+                'status': 400,
+                'meta': None
+            }])
+        except Exception as e:
+            METRICS.inc('orca_tool_errors_total', tool=name, status=500)
+            result = create_error_response([{
+                'title': 'Tool Error',
+                'details': str(e),
+                'status': 500,
+                'meta': None
+            }])
+
         out.append({
             'role':"tool",
             'content':result,
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from llm import (
     TOOLS,
     SYSTEM_PROMPT_TOOLS,
@@ -7,51 +9,183 @@ from llm import (
     handle_tool_calls,
     LOGGER,
     BotSession,
-    ToolCall
+    SessionPool,
+    InferenceScheduler,
+    ResponseCache,
+    ModelResidency,
+    Readiness,
+    context_options,
+    fingerprint
 )
 
+from typing import TYPE_CHECKING
 from json import dumps
+from pathlib import Path
+import asyncio
 
+if TYPE_CHECKING:
+    from ollama import Message
 
-SESSION = BotSession(
-    params="14b",
-    logfile="chat_history.json",
-    tools=TOOLS
-)
-# Attempt to init the model
-yn, err = SESSION.init_model()
-if not yn or not SESSION.modelfile:
-    print(f">> {err}")
-    exit(0)
+    from llm import Modelfile
 
-MODELFILE = SESSION.modelfile
-print(f">> {MODELFILE['name']} is ready to use.")
 
-SESSION.prepend_messages((
-    {
-        'role':"system",
-        'content':MODELFILE['system']
-    },
-    {
-        'role':"system",
-        'content':SYSTEM_PROMPT_TOOLS
-    },
+THINKING = {
+    'ask': False,
+    'login': 256
+}
+"""
+Thinking mode per command, applied at the Ollama request level:
+off for questions, a small budget for the tool-routing login turn.
+"""
+
+RETIRED_PREFIX = (
     {
         'role':"system",
         'content':SYSTEM_PROMPT_THIKING_SUPPRESION
     },
-    {
-        'role':"system",
-        'content':SYSTEM_PROMPT_COMMANDS
-    },
-    {
-        'role':"system",
-        'content':dumps(COMMANDS, ensure_ascii=False)
-    }
-))
+)
+"""
+System prompts earlier versions stored at the head of every history. Thinking
+is now switched per command at the request level, see THINKING, so loading a
+session drops them.
+"""
+
+SESSIONS_DIRECTORY = "sessions"
+"""
+The sub-directory of the memory folder the pooled sessions are saved in.
+"""
 
-# Preload the model into memory with the system prompts
-SESSION.chat(
-    stream=False,
+SCHEDULER = InferenceScheduler(
+    max_in_flight=2,
+    max_queue=16
 )
+"""
+Admission control for every inference request made by the commands.
+"""
+
+CACHE = ResponseCache(
+    ttl=24 * 3600,
+    max_entries=1024,
+    path=Path(__file__).parent.resolve() / "llm" / "memory" / "response_cache.json"
+)
+"""
+Cached answers to `ask` questions, persisted across restarts.
+"""
+
+# Built by the "model" phase from the model configuration, None until then
+SESSION: BotSession | None = None
+MODELFILE: Modelfile | None = None
+PREFIX: tuple[Message, ...] = ()
+"""
+The prebuilt system-prompt prefix, shared by every session.
+"""
+POOL: SessionPool | None = None
+"""
+Per-conversation sessions, keyed by channel or user.
+"""
+FINGERPRINT: str | None = None
+"""
+Fingerprint of the system-prompt prefix, part of every response cache key.
+"""
+RESIDENCY: ModelResidency | None = None
+"""
+Keeps the model pinned in Ollama and records cold versus warm first-token latency.
+"""
+
+READINESS = Readiness()
+"""
+Startup phases of the bot. Commands wait for "preload", which follows "model".
+"""
+
+
+def init_model() -> None:
+    """
+    Reads the model configuration, builds the session pool and the objects
+    which depend on the configuration, and makes sure the model exists in
+    Ollama, creating it from the configuration if needed.
+
+    Raises:
+        RuntimeError: If the configuration is empty or the model could not be found or created.
+    """
+    global SESSION, MODELFILE, PREFIX, POOL, FINGERPRINT, RESIDENCY
+
+    SESSION = BotSession(
+        params="14b",
+        logfile="chat_history.json",
+        tools=TOOLS
+    )
+    MODELFILE = SESSION.modelfile
+    if not MODELFILE:
+        raise RuntimeError("Model configuration file is empty.")
+
+    PREFIX = (
+        {
+            'role':"system",
+            'content':MODELFILE['system']
+        },
+        {
+            'role':"system",
+            'content':SYSTEM_PROMPT_TOOLS
+        },
+        {
+            'role':"system",
+            'content':SYSTEM_PROMPT_COMMANDS
+        },
+        {
+            'role':"system",
+            'content':dumps(COMMANDS, ensure_ascii=False)
+        }
+    )
+    SESSION.set_prefix(PREFIX, RETIRED_PREFIX)
+
+    POOL = SessionPool(
+        params="14b",
+        name=MODELFILE['name'],
+        prefix=PREFIX,
+        retired_prefix=RETIRED_PREFIX,
+        tools=TOOLS,
+        directory=SESSIONS_DIRECTORY,
+        max_sessions=64,
+        max_messages=4096,
+        journal=True,
+        max_hot_messages=256,
+        compact_at=16384,
+        keep_alive=-1,
+        thinking=THINKING,
+        scheduler=SCHEDULER
+    )
+    FINGERPRINT = fingerprint(PREFIX)
+    RESIDENCY = ModelResidency(
+        model=MODELFILE['name'],
+        keep_alive=-1,
+        ping_interval=240.0,
+        options=context_options(MODELFILE),
+        scheduler=SCHEDULER
+    )
+
+    yn, err = SESSION.init_model()
+    if not yn:
+        raise RuntimeError(err)
+    print(f">> {MODELFILE['name']} is ready to use.")
+
+
+async def preload() -> None:
+    """
+    Preloads the model with the system prompts, then keeps it warm while the bot is idle.
+    The keep-warm pings start even if the preload fails, as they load the model too.
+    """
+    try:
+        await asyncio.to_thread(RESIDENCY.preload, PREFIX)
+    finally:
+        RESIDENCY.start()
+
+
+def warm_up() -> None:
+    """
+    Starts initializing the model and then preloading it with the system prompts,
+    in the background of the running event loop.
+    Neither blocks, so that the bot connects to Discord meanwhile.
+    """
+    READINESS.run("model", init_model)
+    READINESS.run("preload", preload, after="model")
 
@@ -0,0 +1,312 @@
+from typing import Any, Final, Mapping
+from asyncio import Lock, sleep
+from time import monotonic
+from json import loads
+from aiohttp import (
+    BasicAuth,
+    ClientError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector
+)
+from multidict import CIMultiDict
+
+from utils import (
+    API_ENDPOINT,
+    LOGGER,
+    TOKEN
+)
+
+USER_AGENT: Final[str] = "DiscordBot (orca, 1.0)"
+
+MAJOR_PARAMETERS: Final[frozenset[str]] = frozenset({"channels", "guilds", "webhooks"})
+"""
+Path segments whose following ID is part of the rate-limit bucket.
+"""
+
+RETRY_STATUSES: Final[frozenset[int]] = frozenset({500, 502, 503, 504})
+
+
+def route_key(method: str, path: str) -> str:
+    """
+    Builds the rate-limit route of a request: IDs are folded into a placeholder,
+    except those of the major parameters, which Discord limits separately.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The path below the API endpoint, e.g. "/channels/123/messages/456".
+
+    Returns:
+        str: The route, e.g. "POST /channels/123/messages/:id".
+    """
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    for i, part in enumerate(parts):
+        if part.isdigit() and not (i and parts[i - 1] in MAJOR_PARAMETERS):
+            parts[i] = ":id"
+    return f"{method.upper()} /{'/'.join(parts)}"
+
+
+class RestError(Exception):
+    """
+    Raised for an unsuccessful Discord API response.
+    """
+
+    def __init__(self, response: "RestResponse") -> None:
+        super().__init__(f"{response.method} {response.path} failed with {response.status}: {response.text[:200]}")
+        self.response = response
+
+
+class RestResponse:
+    """
+    A fully read Discord API response.
+    """
+    __slots__ = (
+        "method",
+        "path",
+        "status",
+        "headers",
+        "body"
+    )
+
+    def __init__(
+            self,
+            method: str,
+            path: str,
+            status: int,
+            headers: Mapping[str, str],
+            body: bytes
+    ) -> None:
+        self.method = method
+        self.path = path
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        """
+        Decodes the body as JSON, returning None for an empty body.
+        """
+        return loads(self.body) if self.body else None
+
+    def raise_for_status(self) -> None:
+        """
+        Raises:
+            RestError: If the response is not successful.
+        """
+        if not self.ok:
+            raise RestError(self)
+
+
+class _Bucket:
+    """
+    One rate-limit bucket. Requests in it are queued on a FIFO lock and only
+    wait when Discord reported the bucket as exhausted.
+    """
+    __slots__ = ("LOCK", "REMAINING", "RESETAT")
+
+    def __init__(self) -> None:
+        self.LOCK = Lock()
+        self.REMAINING: int | None = None
+        self.RESETAT = 0.0
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        remaining = headers.get('X-RateLimit-Remaining', None)
+        reset_after = headers.get('X-RateLimit-Reset-After', None)
+        if remaining is not None:
+            self.REMAINING = int(remaining)
+        if reset_after is not None:
+            self.RESETAT = monotonic() + float(reset_after)
+
+    def delay(self) -> float:
+        if self.REMAINING == 0:
+            return max(0.0, self.RESETAT - monotonic())
+        return 0.0
+
+
+class RestClient:
+    """
+    Discord REST client on one persistent keep-alive aiohttp session.
+    Requests are sorted into rate-limit buckets by route, using the bucket hashes
+    Discord reports in `X-RateLimit-Bucket`, and queued per bucket. A request only
+    waits when its bucket is exhausted, until the bucket resets. A 429 is retried
+    after its `retry_after`, pausing every request when the limit was global.
+    The session is created on first use, on the running event loop.
+    """
+    __slots__ = (
+        "TOKEN",
+        "BASEURL",
+        "MAXRETRIES",
+        "TIMEOUT",
+        "_SESSION",
+        "_ROUTES",
+        "_BUCKETS",
+        "_GLOBALRESET"
+    )
+
+    def __init__(
+            self,
+            token: str | None = None,
+            base_url: str = API_ENDPOINT,
+            max_retries: int = 5,
+            timeout: float = 30.0
+    ) -> None:
+        """
+        Initializes a RestClient instance.
+
+        Args:
+            token (str | None): The bot's token, sent with requests unless they opt out.
+            base_url (str): The API endpoint requests are relative to.
+            max_retries (int): How often a rate-limited or failed request is retried.
+            timeout (float): Seconds before a request times out.
+        """
+        self.TOKEN = token
+        self.BASEURL = base_url.rstrip("/")
+        self.MAXRETRIES = max_retries
+        self.TIMEOUT = timeout
+        self._SESSION: ClientSession | None = None
+        self._ROUTES: dict[str, str] = {}
+        """
+        Bucket hashes reported by Discord, by route.
+        """
+        self._BUCKETS: dict[str, _Bucket] = {}
+        self._GLOBALRESET = 0.0
+
+    def _session(self) -> ClientSession:
+        if self._SESSION is None or self._SESSION.closed:
+            self._SESSION = ClientSession(
+                connector=TCPConnector(limit=64, keepalive_timeout=60.0),
+                timeout=ClientTimeout(total=self.TIMEOUT),
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self._SESSION
+
+    async def close(self) -> None:
+        """
+        Closes the session and its pooled connections.
+        """
+        if self._SESSION is not None and not self._SESSION.closed:
+            await self._SESSION.close()
+        self._SESSION = None
+
+    def _bucket_key(self, route: str) -> str:
+        bucket = self._ROUTES.get(route, None)
+        if bucket is None:
+            return route
+        # Routes sharing a hash share a bucket only for the same major parameters
+        majors = [part for part in route.split("/") if part.isdigit()]
+        return f"{bucket}:{'/'.join(majors)}"
+
+    def _bucket(self, route: str) -> _Bucket:
+        key = self._bucket_key(route)
+        bucket = self._BUCKETS.get(key, None)
+        if bucket is None:
+            bucket = self._BUCKETS[key] = _Bucket()
+        return bucket
+
+    async def request(
+            self,
+            method: str,
+            path: str,
+            *,
+            json: Any = None,
+            data: Any = None,
+            headers: dict[str, str] | None = None,
+            basic_auth: tuple[str, str] | None = None,
+            bot_auth: bool = True
+    ) -> RestResponse:
+        """
+        Sends a request, waiting for its rate-limit bucket and retrying 429s and server errors.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path below the API endpoint.
+            json (Any): A JSON body.
+            data (Any): A form body.
+            headers (dict[str, str] | None): Extra headers.
+            basic_auth (tuple[str, str] | None): HTTP basic credentials, e.g. for OAuth, instead of the bot token.
+            bot_auth (bool): Whether to authorize with the bot token.
+
+        Returns:
+            RestResponse: The final response, which may still be unsuccessful.
+
+        Raises:
+            ClientError: If the request could not be sent after all retries.
+        """
+        route = route_key(method, path)
+        headers = dict(headers or {})
+        if basic_auth is None and bot_auth and self.TOKEN:
+            headers.setdefault('Authorization', f"Bot {self.TOKEN}")
+        auth = BasicAuth(*basic_auth) if basic_auth is not None else None
+
+        for attempt in range(self.MAXRETRIES + 1):
+            bucket = self._bucket(route)
+            async with bucket.LOCK:
+                delay = max(bucket.delay(), self._GLOBALRESET - monotonic())
+                if delay > 0:
+                    LOGGER.debug(f"RestClient:::{route} waits {delay:.2f}s for its rate limit.")
+                    await sleep(delay)
+
+                try:
+                    async with self._session().request(
+                        method,
+                        f"{self.BASEURL}{path}",
+                        json=json,
+                        data=data,
+                        headers=headers,
+                        auth=auth
+                    ) as res:
+                        response = RestResponse(method, path, res.status, CIMultiDict(res.headers), await res.read())
+                except (ClientError, TimeoutError) as err:
+                    if attempt == self.MAXRETRIES: raise
+                    LOGGER.warning(f"RestClient:::{route} failed: {err!r}, retrying.")
+                    await sleep(min(2.0 ** attempt, 30.0))
+                    continue
+
+                bucket.update(response.headers)
+                bucket_hash = response.headers.get('X-RateLimit-Bucket', None)
+                if bucket_hash is not None and self._ROUTES.get(route, None) != bucket_hash:
+                    self._ROUTES[route] = bucket_hash
+                    self._BUCKETS.setdefault(self._bucket_key(route), bucket)
+
+            if response.status == 429:
+                body = response.json() or {}
+                retry_after = float(body.get('retry_after', response.headers.get('Retry-After', 1.0)))
+                if body.get('global', False) or response.headers.get('X-RateLimit-Global', None):
+                    self._GLOBALRESET = monotonic() + retry_after
+                    LOGGER.warning(f"RestClient:::Global rate limit hit, pausing requests for {retry_after:.2f}s.")
+                else:
+                    bucket.REMAINING = 0
+                    bucket.RESETAT = monotonic() + retry_after
+                    LOGGER.warning(f"RestClient:::{route} was rate limited, retrying in {retry_after:.2f}s.")
+                if attempt < self.MAXRETRIES: continue
+            elif response.status in RETRY_STATUSES and attempt < self.MAXRETRIES:
+                await sleep(min(2.0 ** attempt, 30.0))
+                continue
+            return response
+        return response
+
+    async def get(self, path: str, **kwargs: Any) -> RestResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> RestResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs: Any) -> RestResponse:
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: Any) -> RestResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+
+REST: RestClient = RestClient(TOKEN)
+"""
+The process-wide client, so that every caller shares one connection pool and one view of the rate limits.
+"""
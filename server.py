@@ -14,23 +14,39 @@ from logging import (
     ERROR
 )
 
+from discord.utils import setup_logging
+
 from utils import (
-    HANDLER,
-    TOKEN,
+    environment,
+    log_handler,
     check_time,
     remove_think_tags_section
 )
 
 from llm import (
+    METRICS,
+    BotSession,
+    Priority,
+    SchedulerBusy,
     ToolCallErrorResponse,
     handle_tool_calls,
     get_specific_call,
     create_error_response
 )
 
+from streaming import StreamedReply
+from delivery import Outbox
+
+from typing import TYPE_CHECKING
 import asyncio
+from time import monotonic, perf_counter
 
-from llm_stuff import SESSION
+from llm_stuff import SCHEDULER, CACHE, READINESS, warm_up
+# The session pool and the model residency are built by the "model" startup phase
+import llm_stuff
+
+if TYPE_CHECKING:
+    from ollama import ChatResponse
 
 intents = Intents.default()
 intents.presences = True
@@ -40,16 +56,139 @@ intents.members = True
 KACK = "ORCA "
 ORCA_CHANNEL = None
 ANNOUNCMENTS_CHANNEL = None
+DAILY_CHANNEL_IDS: list[int] = [1390131108670079130]
+"""
+The channels the daily message is sent to.
+"""
+DAILY_CHANNELS = []
+SESSION_SCOPE = "channel"
+"""
+Whether conversations are kept per "channel" or per "user".
+"""
+BUSY_MESSAGE = "I am answering a lot of questions right now. Please try again in a moment."
+WARMING_MESSAGE = "I am still warming up. Please try again in a moment."
+UNAVAILABLE_MESSAGE = "My model is unavailable right now, sorry."
+UNANSWERED_MESSAGE = "I couldn't process your question."
+STREAM_REPLIES = True
+"""
+Whether `ask` edits its reply in place as tokens arrive,
+rather than replying once the full answer is generated.
+"""
+METRICS_PORT = 9464
+"""
+The local port serving latency metrics as Prometheus text at /metrics.
+"""
 
 orca = commands.Bot(command_prefix=KACK, intents=intents)
+OUTBOX = Outbox()
+STARTUP_REPORT: asyncio.Task | None = None
+INVOKED: dict[int, float] = {}
+"""
+Start times of the commands being handled, by context.
+"""
+LEASES: dict[int, tuple[str, BotSession]] = {}
+"""
+The pool key and pinned session of the commands being handled, by context.
+"""
+
+
+class WarmingUp(commands.CheckFailure):
+    """Raised when a command is invoked before the model is ready."""
+
+
+class ModelUnavailable(commands.CheckFailure):
+    """Raised when a command is invoked after the model failed to initialize."""
+
+
+def session_key(ctx: commands.Context) -> str:
+    """The pool key of the conversation of the context's channel or author."""
+    if SESSION_SCOPE == "user":
+        return f"user-{ctx.author.id}"
+    return f"channel-{ctx.channel.id}"
+
+
+def session_for(ctx: commands.Context) -> BotSession:
+    """Retrieve the conversation session, pinned in the pool while the command runs."""
+    lease = LEASES.get(id(ctx), None)
+    if lease is not None:
+        return lease[1]
+    return llm_stuff.POOL.get(session_key(ctx))
+
+
+async def deliver(ctx: commands.Context, text: str) -> None:
+    """Send a reply through the outbox, timing the Discord send."""
+    with METRICS.span("discord_send", command=ctx.command.name if ctx.command else None):
+        try:
+            await OUTBOX.send(ctx, text)
+        except asyncio.TimeoutError:
+            # The outbox dropped the reply after it waited too long behind others
+            print(f">> Reply in channel {ctx.channel.id} went stale and was dropped")
+
+
+async def scheduled_chat(session: BotSession, command: str, priority: Priority) -> "ChatResponse":
+    """
+    Make one non-streamed request, holding an inference slot for it alone.
+    Raises SchedulerBusy if the queue is full.
+    """
+    async with SCHEDULER.slot(priority) as waited:
+        METRICS.observe('orca_span_seconds', waited, span="queue_wait", command=command)
+        with METRICS.span("inference", command=command):
+            response = await session.achat(stream=False, command=command)
+    llm_stuff.RESIDENCY.observe(response)
+    return response
+
+
+@orca.check
+async def model_ready(ctx: commands.Context) -> bool:
+    """Hold commands back until the model is initialized and preloaded."""
+    if READINESS.failed("model"):
+        raise ModelUnavailable(READINESS.error("model"))
+    if READINESS.failed("preload"):
+        # The model exists, a failed preload only makes the first request load it cold
+        return True
+    if not READINESS.ready("preload"):
+        raise WarmingUp()
+    return True
+
+
+@orca.event
+async def on_command_error(ctx: commands.Context, error: commands.CommandError) -> None:
+    if isinstance(error, WarmingUp):
+        await ctx.send(WARMING_MESSAGE)
+        return
+    if isinstance(error, ModelUnavailable):
+        await ctx.send(UNAVAILABLE_MESSAGE)
+        return
+    await commands.Bot.on_command_error(orca, ctx, error)
+
+
+@orca.before_invoke
+async def start_command(ctx: commands.Context) -> None:
+    INVOKED[id(ctx)] = perf_counter()
+    # Loading a session replays its journal and may save evicted ones, off the event loop
+    key = session_key(ctx)
+    LEASES[id(ctx)] = (key, await asyncio.to_thread(llm_stuff.POOL.acquire, key))
+
+
+@orca.after_invoke
+async def finish_command(ctx: commands.Context) -> None:
+    start = INVOKED.pop(id(ctx), None)
+    if start is not None:
+        METRICS.observe('orca_span_seconds', perf_counter() - start, span="command", command=ctx.command.name)
+    lease = LEASES.pop(id(ctx), None)
+    if lease is not None:
+        await asyncio.to_thread(llm_stuff.POOL.release, lease[0])
 
 
 @tasks.loop(hours=24)
 async def daily_message():
-    if ORCA_CHANNEL  is None:
+    if not DAILY_CHANNELS:
         print("CHANNEL IS NONE!!!")
         return
-    await ORCA_CHANNEL.send("I am Orca, this is my daily message")
+    results = await OUTBOX.broadcast(DAILY_CHANNELS, "I am Orca, this is my daily message")
+    for channel, result in zip(DAILY_CHANNELS, results):
+        if isinstance(result, BaseException):
+            print(f">> Daily message to {channel} failed: {result}")
 
 @daily_message.before_loop
 async def before_daily_message():
@@ -58,16 +197,27 @@ async def before_daily_message():
     print(f"Waiting {wait_time} seconds to send the first message")
     await asyncio.sleep(wait_time)
 
+@orca.event
+async def setup_hook() -> None:
+    # Runs once logged in, before connecting to the gateway
+    READINESS.end("login")
+    READINESS.begin("gateway")
+
+
 @orca.event
 async def on_ready() -> None:
-    global ORCA_CHANNEL
+    global ORCA_CHANNEL, DAILY_CHANNELS
     ORCA_CHANNEL  = orca.get_channel(1390131108670079130)
     print(f"Channel set to: {ORCA_CHANNEL .name if ORCA_CHANNEL  else 'None'}")
+    DAILY_CHANNELS = [channel for channel in map(orca.get_channel, DAILY_CHANNEL_IDS) if channel is not None]
     
     # Start the daily message task
     if not daily_message.is_running():
         daily_message.start()
 
+    METRICS.serve(METRICS_PORT)
+
+    READINESS.end("gateway")
     print(f">> We are ready to rumble on {orca.user.name}")
 
 
@@ -76,6 +226,7 @@ async def login(ctx: commands.Context, username: str | None = None, password: st
     """Login to the bot with a username and password."""
 
     print(f"Received login request with username: {username} and password: {password}")
+    SESSION = session_for(ctx)
     errors: ToolCallErrorResponse = []
     if not username:
         errors.append({
@@ -107,31 +258,37 @@ async def login(ctx: commands.Context, username: str | None = None, password: st
             'content': f"Login with username: {username} and password: {password}"
         })
 
-    response = SESSION.chat(stream=False)
+    try:
+        response = await scheduled_chat(SESSION, "login", Priority.LOGIN)
 
-    if 'tool_calls' in response["message"]:
-        print(f'Tool calls found in response: {response["message"]["tool_calls"]}')
-        calls = handle_tool_calls(response['message'])
-        print(f'Processed tool calls: {calls}')
-        call = get_specific_call("login", calls)
-        if not call:
-            print("No login tool call found in the response.")
-            await ctx.send("No ability to login found within the system.")
-            return
-        
-        for call in calls:
-            SESSION.add_message(call)
+        if 'tool_calls' in response["message"]:
+            print(f'Tool calls found in response: {response["message"]["tool_calls"]}')
+            # The tools run without holding an inference slot
+            with METRICS.span("tools", command="login"):
+                calls = await asyncio.to_thread(handle_tool_calls, response['message'])
+            print(f'Processed tool calls: {calls}')
+            call = get_specific_call("login", calls)
+            if not call:
+                print("No login tool call found in the response.")
+                await ctx.send("No ability to login found within the system.")
+                return
 
-        response = SESSION.chat(stream=False)
-        print(f">> Response after tool call: {response['message']['content']}")
+            for call in calls:
+                SESSION.add_message(call)
 
-        if not response:
-            await ctx.send("I couldn't process your question after searching for functionality to complete your last request.")
-            return
+            response = await scheduled_chat(SESSION, "login", Priority.LOGIN)
+            print(f">> Response after tool call: {response['message']['content']}")
+
+            if not response:
+                await ctx.send("I couldn't process your question after searching for functionality to complete your last request.")
+                return
+    except SchedulerBusy:
+        await ctx.send(BUSY_MESSAGE)
+        return
 
     after_no_think = remove_think_tags_section(response['message']['content'])
     print(f">> Response after processing: {after_no_think}")
-    await ctx.send(after_no_think)
+    await deliver(ctx, after_no_think)
 
 @orca.command(name="ask")
 async def ask(ctx: commands.Context, *, question: str) -> None:
@@ -141,27 +298,140 @@ async def ask(ctx: commands.Context, *, question: str) -> None:
         return
 
     print(f"Received question: {question}")
-    
+    SESSION = session_for(ctx)
+    question_message = {
+        'role': "user",
+        'content': question
+    }
+
+    # Answer repeated questions from the cache, tool-calling turns are never cached.
+    # The cache is keyed on the question alone, not on the conversation before it:
+    # it serves the standalone questions which keep recurring. A hit is recorded
+    # as one question and answer pair, the exchange the user saw.
+    key = CACHE.key(SESSION.name, llm_stuff.FINGERPRINT, question)
+    cached = CACHE.get(key)
+    if cached:
+        SESSION.extend_messages([
+            question_message,
+            {
+                'role': "assistant",
+                'content': cached
+            }
+        ])
+        await deliver(ctx, cached)
+        return
+
     # Process the question using the SESSION
-    SESSION.add_message(
-        {
-            'role': "user",
-            'content': question
+    SESSION.add_message(question_message)
+
+    if STREAM_REPLIES:
+        # The placeholder is sent before queueing, and edits run outside of the slot
+        reply = StreamedReply(ctx)
+        await reply.start()
+        toolcalls = []
+        thinking = []
+        try:
+            async with SCHEDULER.slot(Priority.ASK) as waited:
+                METRICS.observe('orca_span_seconds', waited, span="queue_wait", command="ask")
+                start = monotonic()
+                first_token = None
+                async for part in await SESSION.achat(stream=True, command="ask"):
+                    if first_token is None and part['message']['content']:
+                        first_token = monotonic() - start
+                        METRICS.observe('orca_span_seconds', first_token, span="first_token", command="ask")
+                    toolcalls.extend(part['message'].get('tool_calls', None) or [])
+                    thinking.append(part['message'].get('thinking', None) or "")
+                    await reply.feed(part['message']['content'])
+                    if part.get('done', None):
+                        llm_stuff.RESIDENCY.observe(part, first_token)
+                METRICS.observe('orca_span_seconds', monotonic() - start, span="inference", command="ask")
+        except SchedulerBusy:
+            await reply.abort(BUSY_MESSAGE)
+            return
+        except Exception as err:
+            # E.g. Ollama dropped the stream; answer the question in the history too,
+            # so the next request does not see it unanswered
+            print(f">> Streaming the answer in channel {ctx.channel.id} failed: {err!r}")
+            SESSION.add_message({
+                'role': "assistant",
+                'content': UNANSWERED_MESSAGE
+            })
+            await reply.abort(UNANSWERED_MESSAGE)
+            return
+
+        with METRICS.span("discord_send", command="ask"):
+            await reply.finish()
+        # The whole assistant turn, as the non-streamed path stores it, so that
+        # tool results which follow have the calls they answer
+        message = {
+            'role': "assistant",
+            'content': reply.text
         }
-    )
-    response = SESSION.chat(stream=False)
+        if "".join(thinking):
+            message['thinking'] = "".join(thinking)
+        if toolcalls:
+            message['tool_calls'] = toolcalls
+        SESSION.add_message(message)
+        if not toolcalls:
+            CACHE.put(key, reply.visible)
+        return
+
+    try:
+        response = await scheduled_chat(SESSION, "ask", Priority.ASK)
+    except SchedulerBusy:
+        await ctx.send(BUSY_MESSAGE)
+        return
 
     if not response:
-        await ctx.send("I couldn't process your question.")
+        await ctx.send(UNANSWERED_MESSAGE)
         return
 
-    await ctx.send(remove_think_tags_section(response['message']['content']))
+    answer = remove_think_tags_section(response['message']['content'])
+    await deliver(ctx, answer)
     SESSION.add_message(response['message'])
+    if not response['message'].get('tool_calls', None):
+        CACHE.put(key, answer)
         
 
-orca.run(
-    TOKEN,
-    log_handler=HANDLER,
-    log_formatter=Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"),
-    log_level=ERROR
-)
\ No newline at end of file
+async def report_startup() -> None:
+    """Print the startup timings once the bot is connected and the model is warm."""
+    await READINESS.wait("preload", "gateway")
+    print(f">> Started: {READINESS.summary()}")
+
+
+async def start(token: str | None = None) -> None:
+    """
+    Log in and connect to Discord while the model is initialized and preloaded.
+    Commands answer with `WARMING_MESSAGE` until the model is ready.
+    The token defaults to TOKEN from the environment.
+    """
+    global STARTUP_REPORT
+    warm_up()
+    STARTUP_REPORT = asyncio.create_task(report_startup())
+    READINESS.begin("login")
+    try:
+        await orca.start(token or environment()['TOKEN'])
+    except Exception as err:
+        READINESS.end("login", str(err))
+        raise
+
+
+async def main() -> None:
+    async with orca:
+        await start()
+
+
+if __name__ == "__main__":
+    setup_logging(
+        handler=log_handler(),
+        formatter=Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"),
+        level=ERROR
+    )
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+    if llm_stuff.POOL is not None:
+        llm_stuff.POOL.save_all()
+    CACHE.save()
@@ -1,22 +1,134 @@
-from typing import Final
-from asyncio import run
+from typing import Any, Awaitable, Callable, Final
+from asyncio import run, sleep, Task, get_running_loop
+from importlib.util import spec_from_file_location, module_from_spec
+from pathlib import Path
+from platform import system
+from random import random, uniform
+from time import monotonic
+from json import dumps, loads
+from zlib import decompressobj
+from re import compile as re_compile
 from os import environ
 from dotenv import load_dotenv
-from requests import Response, get, post
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
 import websockets
+import sys
+
+import etf
+from rest import REST
 
 GATWAY_URL: Final[str] = "wss://gateway.discord.gg/"
+GATEWAY_VERSION: Final[int] = 10
+ENCODINGS: Final[frozenset[str]] = frozenset({"json", "etf"})
 
 from utils import (
     write_json,
     read_json,
-    req,
     LOGGER,
     TOKEN,
     CLIENT_ID,
     CLIENT_SECRET
 )
 
+
+def _load_gateway_types():
+    """
+    Loads `_types.py/WS.py`, which cannot be imported by name
+    because its directory is named like a module file.
+    """
+    path = Path(__file__).parent.resolve() / "_types.py" / "WS.py"
+    spec = spec_from_file_location("gateway_types", path)
+    module = module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_WS = _load_gateway_types()
+GatewayEvent = _WS.GatewayEvent
+GatewayOpcode = _WS.GatewayOpcode
+IdentityEvent = _WS.IdentityEvent
+ResumeEvent = _WS.ResumeEvent
+TransportStats = _WS.TransportStats
+DispatchStats = _WS.DispatchStats
+ShardStats = _WS.ShardStats
+PAYLOAD_DECODERS = _WS.PAYLOAD_DECODERS
+
+INTENTS: Final[int] = (
+    (1 << 0)     # GUILDS
+    | (1 << 1)   # GUILD_MEMBERS
+    | (1 << 8)   # GUILD_PRESENCES
+    | (1 << 9)   # GUILD_MESSAGES
+    | (1 << 12)  # DIRECT_MESSAGES
+    | (1 << 15)  # MESSAGE_CONTENT
+)
+"""
+The same intents the discord.py client requests in server.py.
+"""
+
+FATAL_CLOSE_CODES: Final[frozenset[int]] = frozenset({4004, 4010, 4011, 4012, 4013, 4014})
+"""
+Close codes after which reconnecting cannot succeed, e.g. an invalid token or disallowed intents.
+"""
+
+SESSION_CLOSE_CODES: Final[frozenset[int]] = frozenset({4007, 4009})
+"""
+Close codes after which the session cannot be resumed and a fresh IDENTIFY is needed.
+"""
+
+RECONNECT_CLOSE_CODE: Final[int] = 4000
+"""
+The code used to close the connection ourselves while keeping the session resumable.
+Closing with 1000 or 1001 would invalidate the session.
+"""
+
+ZLIB_SUFFIX: Final[bytes] = b"\x00\x00\xff\xff"
+"""
+The Z_SYNC_FLUSH marker which ends every complete zlib-stream message.
+"""
+
+INTERNAL_EVENTS: Final[frozenset[str]] = frozenset({"READY", "RESUMED"})
+"""
+Dispatches the client itself needs, whether or not a handler is registered.
+"""
+
+_OP = re_compile(rb'"op":\s*(\d+)')
+_SEQUENCE = re_compile(rb'"s":\s*(null|\d+)')
+_TYPE = re_compile(rb'"t":\s*(?:null|"([A-Z0-9_]+)")')
+
+EventHandler = Callable[[GatewayEvent], Awaitable[None]]
+PayloadDecoder = Callable[[Any], Any]
+IdentifyGate = Callable[[], Awaitable[Any]]
+
+
+def peek_header(raw: bytes) -> tuple[int, str | None, int | None] | None:
+    """
+    Reads the `op`, `t` and `s` fields of a gateway message without decoding it.
+    Only the part before the `d` field is searched, so keys nested inside the
+    payload are never mistaken for the header. Discord sends the header first;
+    if it does not, the message cannot be peeked at.
+
+    Args:
+        raw (bytes): The encoded message.
+
+    Returns:
+        tuple[int, str | None, int | None] | None: The opcode, event name and sequence number,
+                                                   or None if the header could not be read.
+    """
+    end = raw.find(b'"d":')
+    if end < 0:
+        end = len(raw)
+    op = _OP.search(raw, 0, end)
+    seq = _SEQUENCE.search(raw, 0, end)
+    name = _TYPE.search(raw, 0, end)
+    if op is None or seq is None or name is None:
+        return None
+    return (
+        int(op.group(1)),
+        name.group(1).decode() if name.group(1) is not None else None,
+        None if seq.group(1) == b"null" else int(seq.group(1))
+    )
+
 AUTHTOKEN = None
 
 async def authorize() -> None:
@@ -27,8 +139,7 @@ async def authorize() -> None:
     """
     global AUTHTOKEN
     try:
-        res = await req(
-            post,
+        res = await REST.post(
             "/oauth2/token",
             headers = {
             'Content-Type': 'application/x-www-form-urlencoded'
@@ -37,33 +148,532 @@ async def authorize() -> None:
             'grant_type': 'client_credentials',
             'scope': 'bot'
             },
-            auth=(CLIENT_ID, CLIENT_SECRET),
+            basic_auth=(CLIENT_ID, CLIENT_SECRET),
         )
 
         tkoen = res.json().get('access_token')
         if not tkoen:
             raise ValueError("Failed to retrieve access token from response.")
-        
+
         AUTHTOKEN = tkoen
-        LOGGER.info(f"Authorization successful. Access Token: {AUTHTOKEN}")
-        
-        print(res.status_code, res.text)
+        LOGGER.info("Authorization successful.")
     except ValueError as e:
         LOGGER.error(f"Authorization error: {e}")
         raise ValueError(f"Authorization error: {e}")
 
 
-async def connect() -> None:
+class ZlibStream:
+    """
+    Decoder for the gateway's zlib-stream transport compression.
+    The whole connection is one zlib stream, so a single decompression context
+    is shared by every message on it, keeping the window Discord compresses against.
+    Fragments are copied into a preallocated buffer until one ends with the
+    Z_SYNC_FLUSH marker, and the message is then inflated straight out of the
+    buffer through a memoryview.
+    `reset` must be called for each new connection; the counters survive it.
+    """
+    __slots__ = (
+        "_INFLATER",
+        "_BUFFER",
+        "_LENGTH",
+        "MESSAGES",
+        "WIREBYTES",
+        "DECODEDBYTES"
+    )
+
+    def __init__(self, capacity: int = 64 * 1024) -> None:
+        """
+        Initializes a ZlibStream instance.
+
+        Args:
+            capacity (int): The initial size of the receive buffer. It grows to the largest message seen.
+        """
+        self._INFLATER = decompressobj()
+        self._BUFFER = bytearray(capacity)
+        self._LENGTH = 0
+        self.MESSAGES = 0
+        self.WIREBYTES = 0
+        self.DECODEDBYTES = 0
+
+    def reset(self) -> None:
+        """
+        Starts a new stream, as each connection has its own.
+        """
+        self._INFLATER = decompressobj()
+        self._LENGTH = 0
+
+    def feed(self, data: bytes) -> bytes | None:
+        """
+        Adds a received fragment.
+
+        Args:
+            data (bytes): The compressed fragment.
+
+        Returns:
+            bytes | None: The decoded message once it is complete, otherwise None.
+        """
+        end = self._LENGTH + len(data)
+        if end > len(self._BUFFER):
+            self._BUFFER.extend(bytes(max(end, 2 * len(self._BUFFER)) - len(self._BUFFER)))
+        self._BUFFER[self._LENGTH:end] = data
+        self._LENGTH = end
+        self.WIREBYTES += len(data)
+
+        if end < len(ZLIB_SUFFIX) or self._BUFFER[end - len(ZLIB_SUFFIX):end] != ZLIB_SUFFIX:
+            return None
+
+        # The view is released before the buffer can be resized again
+        with memoryview(self._BUFFER) as view:
+            decoded = self._INFLATER.decompress(view[:end])
+        self._LENGTH = 0
+        self.MESSAGES += 1
+        self.DECODEDBYTES += len(decoded)
+        return decoded
+
+    def stats(self) -> TransportStats:
+        """
+        Returns the wire and decoded byte counters.
+
+        Returns:
+            TransportStats: The counters.
+        """
+        return {
+            'messages': self.MESSAGES,
+            'wire_bytes': self.WIREBYTES,
+            'decoded_bytes': self.DECODEDBYTES,
+            'ratio': self.DECODEDBYTES / self.WIREBYTES if self.WIREBYTES else 0.0
+        }
+
+
+class GatewayClient:
+    """
+    Lightweight Discord Gateway client, a low-memory alternative to the discord.py client.
+    After HELLO it heartbeats on the announced interval, starting at a random
+    point of the first interval so that reconnecting clients do not beat in step.
+    A heartbeat which is not acknowledged before the next one is due marks the
+    connection as zombied, and it is dropped.
+    The last sequence number, the session ID and the resume URL from READY are
+    kept, so that after a disconnect the client RESUMEs and Discord replays the
+    missed events instead of a full re-IDENTIFY.
+    Dispatch events are handed to the handlers registered with `on`. Dispatches
+    nobody handles are dropped after peeking at their header, before any JSON
+    decoding, which sheds most of the presence and member traffic; the rest have
+    their payload turned into a typed object by the event's decoder.
+    With `compress` the connection uses zlib-stream transport compression.
+    Messages are JSON by default; with `encoding="etf"` they use the more compact
+    Erlang term format, in which snowflakes arrive as integers. ETF messages are
+    never peeked at, so unhandled dispatches are dropped right after decoding.
+    """
+    __slots__ = (
+        "TOKEN",
+        "INTENTS",
+        "PROPERTIES",
+        "SHARD",
+        "URL",
+        "ENCODING",
+        "IDENTIFYGATE",
+        "LATENCY",
+        "_ZLIB",
+        "_WS",
+        "_SEQ",
+        "_SESSIONID",
+        "_RESUMEURL",
+        "_INTERVAL",
+        "_ACKED",
+        "_LASTBEAT",
+        "_HEARTBEAT",
+        "_RECONNECTING",
+        "_CLOSED",
+        "_HANDLERS",
+        "_DECODERS",
+        "_TASKS",
+        "_DECODED",
+        "_DROPPED",
+        "_UNPEEKABLE"
+    )
+
+    def __init__(
+            self,
+            token: str,
+            intents: int = INTENTS,
+            shard: tuple[int, int] | None = None,
+            url: str = GATWAY_URL,
+            compress: bool = True,
+            encoding: str = "json",
+            identify_gate: IdentifyGate | None = None
+    ) -> None:
+        """
+        Initializes a GatewayClient instance.
+
+        Args:
+            token (str): The bot's token.
+            intents (int): Bitwise flags of the events to receive.
+            shard (tuple[int, int] | None): The shard ID and the total number of shards, or None for no sharding.
+            url (str): The gateway URL used for fresh connections.
+            compress (bool): Whether to use zlib-stream transport compression.
+            encoding (str): The message encoding, "json" or "etf".
+            identify_gate (IdentifyGate | None): Awaited before every IDENTIFY, so that a shard
+                                                 manager can space identifies out. Resumes are not gated.
+
+        Raises:
+            ValueError: If the encoding is not supported.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported gateway encoding {encoding!r}, expected one of {sorted(ENCODINGS)}.")
+        self.TOKEN = token
+        self.INTENTS = intents
+        self.PROPERTIES: dict[str, str] = {
+            'os': system().lower(),
+            'browser': "orca",
+            'device': "orca"
+        }
+        self.SHARD = shard
+        self.URL = url
+        self.ENCODING = encoding
+        self.IDENTIFYGATE = identify_gate
+        self.LATENCY: float | None = None
+        """
+        Seconds between the last heartbeat and its acknowledgement.
+        """
+        self._ZLIB: ZlibStream | None = ZlibStream() if compress else None
+        self._WS: websockets.ClientConnection | None = None
+        self._SEQ: int | None = None
+        self._SESSIONID: str | None = None
+        self._RESUMEURL: str | None = None
+        self._INTERVAL = 41.25
+        self._ACKED = True
+        self._LASTBEAT = 0.0
+        self._HEARTBEAT: Task | None = None
+        self._RECONNECTING = False
+        self._CLOSED = False
+        self._HANDLERS: dict[str, list[EventHandler]] = {}
+        self._DECODERS: dict[str, PayloadDecoder] = dict(PAYLOAD_DECODERS)
+        self._TASKS: set[Task] = set()
+        self._DECODED = 0
+        self._DROPPED = 0
+        self._UNPEEKABLE = 0
+
+    @property
+    def sequence(self) -> int | None:
+        """
+        The sequence number of the last event received.
+        """
+        return self._SEQ
+
+    @property
+    def session_id(self) -> str | None:
+        """
+        The ID of the current session, set by READY.
+        """
+        return self._SESSIONID
+
+    @property
+    def resumable(self) -> bool:
+        """
+        Whether the next connection can RESUME instead of IDENTIFYing.
+        """
+        return self._SESSIONID is not None and self._RESUMEURL is not None
+
+    def transport_stats(self) -> TransportStats | None:
+        """
+        Returns the compression counters across all connections, or None without compression.
+        """
+        return self._ZLIB.stats() if self._ZLIB is not None else None
+
+    def dispatch_stats(self) -> DispatchStats:
+        """
+        Returns how many messages were decoded and how many were dropped unread.
+        """
+        return {
+            'decoded': self._DECODED,
+            'dropped': self._DROPPED,
+            'unpeekable': self._UNPEEKABLE
+        }
+
+    def wants(self, event: str | None) -> bool:
+        """
+        Whether a dispatch event has to be decoded.
+
+        Args:
+            event (str | None): The event name.
+
+        Returns:
+            bool: True if a handler is registered for it or the client needs it itself.
+        """
+        return event in self._HANDLERS or event in INTERNAL_EVENTS or "*" in self._HANDLERS
+
+    def on(
+            self,
+            event: str,
+            decoder: PayloadDecoder | None = None
+    ) -> Callable[[EventHandler], EventHandler]:
+        """
+        Registers a coroutine as a handler of a dispatch event.
+        Events without a handler are dropped before they are decoded.
+
+        Args:
+            event (str): The event name, e.g. "MESSAGE_CREATE", or "*" for every event.
+            decoder (PayloadDecoder | None): Turns the event's `d` field into the payload the
+                                             handler receives. Defaults to the decoder in
+                                             PAYLOAD_DECODERS, or the plain decoded JSON.
+
+        Returns:
+            Callable[[EventHandler], EventHandler]: A decorator registering the handler.
+        """
+        if decoder is not None:
+            self._DECODERS[event] = decoder
+
+        def decorator(handler: EventHandler) -> EventHandler:
+            self._HANDLERS.setdefault(event, []).append(handler)
+            return handler
+        return decorator
+
+    async def run(self) -> None:
+        """
+        Connects and keeps the connection alive until `close` is called.
+        Transient failures are retried with exponential backoff.
+
+        Raises:
+            ConnectionClosed: If Discord closed the connection with a fatal close code.
+        """
+        backoff = 1.0
+        while not self._CLOSED:
+            url = self._RESUMEURL if self.resumable else self.URL
+            self._RECONNECTING = False
+            try:
+                await self._connect(url)
+                backoff = 1.0
+            except ConnectionClosed as err:
+                code = err.rcvd.code if err.rcvd is not None else None
+                if code in FATAL_CLOSE_CODES:
+                    LOGGER.error(f"GatewayClient:::Gateway closed the connection with fatal code {code}: {err}")
+                    raise
+                if code in SESSION_CLOSE_CODES:
+                    self._reset_session()
+                if not self._RECONNECTING:
+                    LOGGER.warning(f"GatewayClient:::Connection closed with code {code}: {err}")
+            except (OSError, InvalidHandshake, TimeoutError) as err:
+                LOGGER.warning(f"GatewayClient:::Failed to connect to {url}: {err}")
+
+            if self._CLOSED: break
+            if self._RECONNECTING:
+                continue
+            # Full jitter, so that many clients dropped together do not reconnect in step
+            await sleep(backoff * random())
+            backoff = min(backoff * 2, 60.0)
+
+    async def close(self) -> None:
+        """
+        Closes the connection for good, ending the session.
+        """
+        self._CLOSED = True
+        if self._WS is not None:
+            await self._WS.close()
+
+    async def _connect(self, url: str) -> None:
+        uri = f"{url.rstrip('/')}/?v={GATEWAY_VERSION}&encoding={self.ENCODING}"
+        if self._ZLIB is not None:
+            uri += "&compress=zlib-stream"
+            self._ZLIB.reset()
+        # Discord has its own heartbeats, so websocket pings are turned off
+        async with websockets.connect(uri, max_size=None, ping_interval=None, compression=None) as ws:
+            LOGGER.info(f"GatewayClient:::Connected to Discord Gateway at {uri}")
+            self._WS = ws
+            try:
+                hello = None
+                while hello is None:
+                    hello = self._decode(await ws.recv())
+                if hello.op != GatewayOpcode.HELLO:
+                    raise ValueError(f"Expected HELLO, received opcode {hello.op}")
+                self._INTERVAL = hello.d['heartbeat_interval'] / 1000
+                self._ACKED = True
+                self._HEARTBEAT = get_running_loop().create_task(self._heartbeat())
+
+                if self.resumable:
+                    await self._resume()
+                else:
+                    await self._identify()
+
+                async for msg in ws:
+                    event = self._decode(msg)
+                    if event is not None:
+                        await self._receive(event)
+            finally:
+                if self._HEARTBEAT is not None:
+                    self._HEARTBEAT.cancel()
+                    self._HEARTBEAT = None
+                self._WS = None
+
+    def _decode(self, msg: str | bytes) -> GatewayEvent | None:
+        if self._ZLIB is not None and isinstance(msg, bytes):
+            msg = self._ZLIB.feed(msg)
+            if msg is None:
+                return None
+        raw = msg.encode() if isinstance(msg, str) else msg
+
+        if self.ENCODING == "etf":
+            event = GatewayEvent.from_payload(etf.loads(raw))
+            self._DECODED += 1
+            if event.op == GatewayOpcode.DISPATCH and not self.wants(event.t):
+                if event.s is not None:
+                    self._SEQ = event.s
+                self._DROPPED += 1
+                return None
+        else:
+            header = peek_header(raw)
+            if header is None:
+                self._UNPEEKABLE += 1
+            else:
+                op, name, seq = header
+                if op == GatewayOpcode.DISPATCH and not self.wants(name):
+                    # Still tracked, the next RESUME must acknowledge every event
+                    if seq is not None:
+                        self._SEQ = seq
+                    self._DROPPED += 1
+                    return None
+            self._DECODED += 1
+            event = GatewayEvent.from_payload(loads(raw))
+
+        if event.op == GatewayOpcode.DISPATCH:
+            decoder = self._DECODERS.get(event.t, None)
+            if decoder is not None:
+                event.d = decoder(event.d)
+        return event
+
+    def _encode(self, payload: dict[str, Any]) -> str | bytes:
+        if self.ENCODING == "etf":
+            return etf.dumps(payload)
+        return dumps(payload, separators=(',', ':'))
+
+    async def send(self, op: int, d: Any) -> None:
+        """
+        Sends a message to the gateway.
+
+        Args:
+            op (int): The opcode.
+            d (Any): The payload, either plain data or an EventPayload.
+        """
+        if self._WS is None:
+            raise ConnectionError("Not connected to the gateway.")
+        await self._WS.send(self._encode(GatewayEvent(op, d).to_payload()))
+
+    async def _receive(self, event: GatewayEvent) -> None:
+        if event.s is not None:
+            self._SEQ = event.s
+
+        if event.op == GatewayOpcode.DISPATCH:
+            if event.t == "READY":
+                self._SESSIONID = event.d.session_id
+                self._RESUMEURL = event.d.resume_gateway_url
+                LOGGER.info(f"GatewayClient:::Session {self._SESSIONID} ready.")
+            elif event.t == "RESUMED":
+                LOGGER.info(f"GatewayClient:::Session {self._SESSIONID} resumed at sequence {self._SEQ}.")
+            self._dispatch(event)
+        elif event.op == GatewayOpcode.HEARTBEAT:
+            await self._beat()
+        elif event.op == GatewayOpcode.HEARTBEAT_ACK:
+            self._ACKED = True
+            self.LATENCY = monotonic() - self._LASTBEAT
+        elif event.op == GatewayOpcode.RECONNECT:
+            LOGGER.info("GatewayClient:::Gateway requested a reconnect.")
+            await self._reconnect()
+        elif event.op == GatewayOpcode.INVALID_SESSION:
+            LOGGER.warning(f"GatewayClient:::Session invalidated, resumable: {bool(event.d)}.")
+            await sleep(uniform(1.0, 5.0))
+            if event.d:
+                await self._reconnect()
+            else:
+                self._reset_session()
+                await self._identify()
+
+    def _dispatch(self, event: GatewayEvent) -> None:
+        # Handlers run as tasks, so a slow one never delays heartbeat acknowledgements
+        handlers = self._HANDLERS.get(event.t, []) + self._HANDLERS.get("*", [])
+        for handler in handlers:
+            task = get_running_loop().create_task(handler(event))
+            self._TASKS.add(task)
+            task.add_done_callback(self._handled)
+
+    def _handled(self, task: Task) -> None:
+        self._TASKS.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error(f"GatewayClient:::Event handler failed: {task.exception()!r}")
+
+    async def _heartbeat(self) -> None:
+        await sleep(self._INTERVAL * random())
+        try:
+            while True:
+                if not self._ACKED:
+                    LOGGER.warning("GatewayClient:::Heartbeat was not acknowledged, connection is zombied.")
+                    await self._reconnect()
+                    return
+                await self._beat()
+                await sleep(self._INTERVAL)
+        except ConnectionClosed:
+            # The receive loop handles the closure
+            return
+
+    async def _beat(self) -> None:
+        self._ACKED = False
+        self._LASTBEAT = monotonic()
+        await self.send(GatewayOpcode.HEARTBEAT, self._SEQ)
+
+    async def _identify(self) -> None:
+        if self.IDENTIFYGATE is not None:
+            await self.IDENTIFYGATE()
+        await self.send(
+            GatewayOpcode.IDENTIFY,
+            IdentityEvent(
+                self.TOKEN,
+                self.PROPERTIES,
+                shard=self.SHARD,
+                intents=self.INTENTS
+            )
+        )
+
+    async def _resume(self) -> None:
+        LOGGER.info(f"GatewayClient:::Resuming session {self._SESSIONID} from sequence {self._SEQ}.")
+        await self.send(
+            GatewayOpcode.RESUME,
+            ResumeEvent(self.TOKEN, self._SESSIONID, self._SEQ)
+        )
+
+    async def _reconnect(self) -> None:
+        """
+        Drops the connection while keeping the session, so that `run` resumes it straight away.
+        """
+        self._RECONNECTING = True
+        if self._WS is not None:
+            await self._WS.close(code=RECONNECT_CLOSE_CODE, reason="Reconnecting")
+
+    def _reset_session(self) -> None:
+        self._SESSIONID = None
+        self._RESUMEURL = None
+        self._SEQ = None
+
+
+def register_handlers(client: GatewayClient) -> None:
+    """
+    Registers the bot's event handlers on a gateway client.
+    Args:
+        client (GatewayClient): The client, or one shard's client.
+    """
+    @client.on("MESSAGE_CREATE")
+    async def on_message(event: GatewayEvent) -> None:
+        print(f">> {event.d.author_name}: {event.d.content}")
+
+
+async def connect(encoding: str = "json") -> None:
     """
-    Connects to the Discord gateway using websockets.
+    Connects to the Discord gateway and prints the messages the bot receives.
+    Args:
+        encoding (str): The gateway message encoding, "json" or "etf".
     Raises:
         Exception: If the connection fails.
     """
-    wsuri = f"{GATWAY_URL}?v=10&encoding=json"
-    async with websockets.connect(wsuri) as ws:
-        LOGGER.info(f"Connected to Discord Gateway at {wsuri}")
-        async for msg in ws:
-            print(msg)
+    client = GatewayClient(TOKEN, encoding=encoding)
+    register_handlers(client)
+    await client.run()
 
 async def main() -> None:
     """
@@ -71,10 +681,12 @@ async def main() -> None:
     """
     try:
         await authorize()
-        await connect()
+        await connect(environ.get("GATEWAY_ENCODING", "json"))
     except Exception as e:
         LOGGER.error(f"An error occurred: {e}")
         raise
+    finally:
+        await REST.close()
 
 if __name__ == "__main__":
-    run(main())
\ No newline at end of file
+    run(main())
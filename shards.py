@@ -0,0 +1,394 @@
+from typing import Any, Callable, Final
+from asyncio import run, sleep, to_thread, get_running_loop
+from multiprocessing import get_context
+from multiprocessing.context import SpawnContext, SpawnProcess
+from queue import Empty
+from time import monotonic, time, sleep as block
+from os import getpid
+from websockets.exceptions import ConnectionClosed
+import sys
+
+from utils import (
+    LOGGER,
+    TOKEN
+)
+
+from rest import REST, RestError
+
+from server_raw import (
+    FATAL_CLOSE_CODES,
+    GatewayClient,
+    ShardStats,
+    register_handlers
+)
+
+IDENTIFY_INTERVAL: Final[float] = 5.0
+"""
+Seconds Discord requires between identifies in the same rate-limit bucket.
+"""
+
+FATAL_EXIT_CODE: Final[int] = 3
+"""
+The exit code of a shard which cannot succeed by restarting it: Discord closed
+its connection with one of `FATAL_CLOSE_CODES`, e.g. for an invalid token or
+disallowed intents, the API rejected its credentials, or it was misconfigured.
+Such a shard is not restarted, the other shards keep running.
+"""
+
+FATAL_HTTP_STATUSES: Final[frozenset[int]] = frozenset({401, 403})
+"""
+API statuses which mean the token itself was rejected.
+"""
+
+STABLE_AFTER: Final[float] = 60.0
+"""
+Seconds a shard must run before a crash no longer counts towards its restart backoff.
+"""
+
+
+class IdentifyLimiter:
+    """
+    Spaces out IDENTIFYs across shard processes.
+    Discord allows `max_concurrency` identifies every five seconds, one in each
+    bucket, where a shard's bucket is its ID modulo `max_concurrency`. Each bucket
+    has a process-shared lock and timestamp; a shard holds its bucket's lock until
+    the bucket's interval has elapsed, then records its identify time.
+    It must be handed to the shard processes when they are started.
+    """
+    __slots__ = ("_LOCKS", "_LAST", "INTERVAL")
+
+    def __init__(
+            self,
+            context: SpawnContext,
+            max_concurrency: int = 1,
+            interval: float = IDENTIFY_INTERVAL
+    ) -> None:
+        """
+        Initializes an IdentifyLimiter instance.
+
+        Args:
+            context (SpawnContext): The multiprocessing context the shards are started with.
+            max_concurrency (int): The number of identify buckets.
+            interval (float): Seconds between identifies in one bucket.
+        """
+        buckets = max(1, max_concurrency)
+        self._LOCKS = [context.Lock() for _ in range(buckets)]
+        self._LAST = [context.Value('d', 0.0, lock=False) for _ in range(buckets)]
+        self.INTERVAL = interval
+
+    def wait(self, shard_id: int) -> None:
+        """
+        Blocks until the shard may IDENTIFY.
+
+        Args:
+            shard_id (int): The shard about to identify.
+        """
+        bucket = shard_id % len(self._LOCKS)
+        with self._LOCKS[bucket]:
+            delay = self._LAST[bucket].value + self.INTERVAL - time()
+            if delay > 0:
+                block(delay)
+            self._LAST[bucket].value = time()
+
+
+async def _report(client: GatewayClient, shard_id: int, reports: Any, interval: float) -> None:
+    last_events = 0
+    last = monotonic()
+    while True:
+        await sleep(interval)
+        stats = client.dispatch_stats()
+        events = stats['decoded'] + stats['dropped']
+        now = monotonic()
+        report: ShardStats = {
+            'shard_id': shard_id,
+            'pid': getpid(),
+            'events': events,
+            'rate': (events - last_events) / (now - last),
+            'sequence': client.sequence,
+            'latency': client.LATENCY,
+            'resumable': client.resumable
+        }
+        reports.put_nowait(report)
+        last_events, last = events, now
+
+
+async def _shard(
+        shard_id: int,
+        shard_count: int,
+        token: str,
+        options: dict[str, Any],
+        limiter: IdentifyLimiter,
+        reports: Any,
+        report_interval: float,
+        setup: Callable[[GatewayClient], None] | None
+) -> None:
+    try:
+        client = GatewayClient(
+            token,
+            shard=(shard_id, shard_count),
+            identify_gate=lambda: to_thread(limiter.wait, shard_id),
+            **options
+        )
+        if setup is not None:
+            setup(client)
+    except (ValueError, TypeError) as err:
+        # Bad options fail the same way on every restart
+        LOGGER.error(f"Shard {shard_id}:::Misconfigured: {err}")
+        sys.exit(FATAL_EXIT_CODE)
+
+    reporter = get_running_loop().create_task(_report(client, shard_id, reports, report_interval))
+    try:
+        await client.run()
+    except ConnectionClosed as err:
+        code = err.rcvd.code if err.rcvd is not None else None
+        if code not in FATAL_CLOSE_CODES:
+            raise
+        LOGGER.error(f"Shard {shard_id}:::Closed for good with code {code}: {err}")
+        sys.exit(FATAL_EXIT_CODE)
+    except RestError as err:
+        if err.response.status not in FATAL_HTTP_STATUSES:
+            raise
+        LOGGER.error(f"Shard {shard_id}:::Token rejected: {err}")
+        sys.exit(FATAL_EXIT_CODE)
+    finally:
+        reporter.cancel()
+
+
+def shard_main(*args: Any) -> None:
+    """
+    Entry point of a shard process. Takes the arguments of `_shard`.
+    """
+    run(_shard(*args))
+
+
+class ShardManager:
+    """
+    Runs the bot's gateway connection as N shard processes, spreading event
+    decoding and handling over several cores.
+    Each process runs a GatewayClient identifying as `[shard_id, shard_count]`.
+    The shard count and `max_concurrency` are taken from `/gateway/bot` unless given.
+    Identifies are spaced out through a shared IdentifyLimiter. Crashed shards are
+    restarted with exponential backoff. A shard which exits with `FATAL_EXIT_CODE`
+    stops only itself: it is not restarted, but the other shards keep serving their
+    guilds, as a refusal like 4014 can be specific to one shard's connection.
+    Only once every shard was refused, as with an invalid token, does `run` give up.
+    Every shard reports its event rate and heartbeat latency through a queue.
+    """
+    __slots__ = (
+        "TOKEN",
+        "SHARDCOUNT",
+        "MAXCONCURRENCY",
+        "OPTIONS",
+        "SETUP",
+        "REPORTINTERVAL",
+        "_CONTEXT",
+        "_LIMITER",
+        "_REPORTS",
+        "_PROCESSES",
+        "_STARTED",
+        "_RESTARTS",
+        "_PENDING",
+        "_REFUSED",
+        "_STATS",
+        "_STOPPING"
+    )
+
+    def __init__(
+            self,
+            token: str,
+            shard_count: int | None = None,
+            max_concurrency: int | None = None,
+            setup: Callable[[GatewayClient], None] | None = register_handlers,
+            report_interval: float = 10.0,
+            **options: Any
+    ) -> None:
+        """
+        Initializes a ShardManager instance.
+
+        Args:
+            token (str): The bot's token.
+            shard_count (int | None): The number of shards, or None to use Discord's recommendation.
+            max_concurrency (int | None): Identifies allowed per five seconds, or None to ask Discord.
+            setup (Callable[[GatewayClient], None] | None): Registers handlers on each shard's client.
+                                                            Must be a module-level function, as it is
+                                                            pickled into the shard processes.
+            report_interval (float): Seconds between shard reports.
+            **options (Any): Further GatewayClient arguments, e.g. `encoding` or `compress`.
+        """
+        self.TOKEN = token
+        self.SHARDCOUNT = shard_count
+        self.MAXCONCURRENCY = max_concurrency
+        self.OPTIONS = options
+        self.SETUP = setup
+        self.REPORTINTERVAL = report_interval
+        # Spawned rather than forked, so shards never inherit a running event loop or threads
+        self._CONTEXT: SpawnContext = get_context("spawn")
+        self._LIMITER: IdentifyLimiter | None = None
+        self._REPORTS = self._CONTEXT.Queue()
+        self._PROCESSES: dict[int, SpawnProcess] = {}
+        self._STARTED: dict[int, float] = {}
+        self._RESTARTS: dict[int, int] = {}
+        self._PENDING: dict[int, float] = {}
+        """
+        Shards waiting to be restarted, with the time they may restart at.
+        """
+        self._REFUSED: set[int] = set()
+        self._STATS: dict[int, ShardStats] = {}
+        self._STOPPING = False
+
+    async def _discover(self) -> None:
+        """
+        Fills in the shard count and identify concurrency from `/gateway/bot`.
+        """
+        if self.SHARDCOUNT is not None and self.MAXCONCURRENCY is not None: return
+        res = await REST.get("/gateway/bot", headers={'Authorization': f"Bot {self.TOKEN}"})
+        res.raise_for_status()
+        data = res.json()
+        limit = data.get('session_start_limit', {})
+        if self.SHARDCOUNT is None:
+            self.SHARDCOUNT = data['shards']
+        if self.MAXCONCURRENCY is None:
+            self.MAXCONCURRENCY = limit.get('max_concurrency', 1)
+        LOGGER.info(
+            f"ShardManager:::{self.SHARDCOUNT} shards, max concurrency {self.MAXCONCURRENCY}, "
+            f"{limit.get('remaining')} of {limit.get('total')} session starts left."
+        )
+
+    def _spawn(self, shard_id: int) -> None:
+        process = self._CONTEXT.Process(
+            target=shard_main,
+            args=(
+                shard_id,
+                self.SHARDCOUNT,
+                self.TOKEN,
+                self.OPTIONS,
+                self._LIMITER,
+                self._REPORTS,
+                self.REPORTINTERVAL,
+                self.SETUP
+            ),
+            name=f"shard-{shard_id}",
+            daemon=True
+        )
+        process.start()
+        self._PROCESSES[shard_id] = process
+        self._STARTED[shard_id] = monotonic()
+        LOGGER.info(f"ShardManager:::Started shard {shard_id} as process {process.pid}.")
+
+    async def run(self) -> None:
+        """
+        Starts every shard and supervises them until `stop` is called.
+
+        Raises:
+            RuntimeError: If every shard was refused by Discord for good.
+        """
+        await self._discover()
+        self._LIMITER = IdentifyLimiter(self._CONTEXT, self.MAXCONCURRENCY)
+        # All shards start at once; the limiter makes them queue for their identify
+        for shard_id in range(self.SHARDCOUNT):
+            self._spawn(shard_id)
+
+        logged = monotonic()
+        try:
+            while not self._STOPPING:
+                self._drain()
+                self._supervise()
+                if monotonic() - logged >= self.REPORTINTERVAL:
+                    logged = monotonic()
+                    self._log_rates()
+                await sleep(1.0)
+        finally:
+            self.stop()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                report: ShardStats = self._REPORTS.get_nowait()
+            except Empty:
+                return
+            self._STATS[report['shard_id']] = report
+
+    def _supervise(self) -> None:
+        now = monotonic()
+        for shard_id, process in self._PROCESSES.items():
+            if shard_id in self._PENDING or shard_id in self._REFUSED or process.is_alive(): continue
+            if process.exitcode == FATAL_EXIT_CODE:
+                self._REFUSED.add(shard_id)
+                self._STATS.pop(shard_id, None)
+                LOGGER.error(f"ShardManager:::Shard {shard_id} was refused by Discord and stays stopped, see the log.")
+                continue
+
+            if now - self._STARTED[shard_id] >= STABLE_AFTER:
+                self._RESTARTS[shard_id] = 0
+            restarts = self._RESTARTS.get(shard_id, 0)
+            delay = min(60.0, 2.0 ** restarts) if restarts else 0.0
+            self._RESTARTS[shard_id] = restarts + 1
+            self._PENDING[shard_id] = now + delay
+            self._STATS.pop(shard_id, None)
+            LOGGER.warning(f"ShardManager:::Shard {shard_id} exited with code {process.exitcode}, restarting in {delay:.0f}s.")
+
+        for shard_id, at in list(self._PENDING.items()):
+            if at <= now:
+                del self._PENDING[shard_id]
+                self._spawn(shard_id)
+
+        if self._PROCESSES and len(self._REFUSED) == len(self._PROCESSES):
+            raise RuntimeError("Every shard was refused by Discord, see the log.")
+
+    def _log_rates(self) -> None:
+        rates = ", ".join(
+            f"{shard_id}: {report['rate']:.1f}/s"
+            for shard_id, report in sorted(self._STATS.items())
+        )
+        LOGGER.info(f"ShardManager:::Events per shard: {rates or 'no reports yet'}.")
+
+    def stop(self) -> None:
+        """
+        Stops every shard process.
+        """
+        self._STOPPING = True
+        for process in self._PROCESSES.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._PROCESSES.values():
+            process.join(timeout=5.0)
+
+    def stats(self) -> dict[int, ShardStats]:
+        """
+        Returns the latest report of every running shard.
+
+        Returns:
+            dict[int, ShardStats]: The reports by shard ID.
+        """
+        self._drain()
+        return dict(self._STATS)
+
+    def restarts(self) -> dict[int, int]:
+        """
+        Returns how often each shard has been restarted since it last ran stably.
+        """
+        return dict(self._RESTARTS)
+
+    def refused(self) -> set[int]:
+        """
+        Returns the shards which Discord refused for good and which stay stopped.
+        """
+        return set(self._REFUSED)
+
+
+async def main() -> None:
+    """
+    Runs the bot's gateway connection sharded over several processes.
+    """
+    manager = ShardManager(TOKEN)
+    try:
+        await manager.run()
+    except Exception as e:
+        LOGGER.error(f"An error occurred: {e}")
+        raise
+    finally:
+        await REST.close()
+
+
+if __name__ == "__main__":
+    run(main())
@@ -0,0 +1,219 @@
+from discord import (
+    HTTPException,
+    Message
+)
+
+from discord.abc import Messageable
+
+from time import monotonic
+from typing import Final
+import asyncio
+
+from utils import LOGGER, ThinkFilter
+
+MESSAGE_LIMIT: Final[int] = 2000
+"""
+The maximum number of characters Discord accepts in one message.
+"""
+
+PLACEHOLDER: Final[str] = "…"
+
+
+def split_point(text: str, limit: int = MESSAGE_LIMIT) -> int:
+    """
+    Finds where to cut text so that the head fits in one message,
+    preferring a line break, then a space.
+    Args:
+        text (str): The text to split.
+        limit (int): The maximum length of the head.
+    Returns:
+        int: The index to cut at.
+    """
+    if len(text) <= limit:
+        return len(text)
+    cut = text.rfind('\n', 0, limit)
+    if cut <= 0:
+        cut = text.rfind(' ', 0, limit)
+    return cut if cut > 0 else limit
+
+
+class StreamedReply:
+    """
+    Delivers a streamed model response to Discord as it is generated.
+    Thinking sections are filtered out incrementally as the chunks arrive.
+    One placeholder message is sent up front and then edited in place.
+    Edits are at least `interval` seconds apart however fast the model
+    generates, which keeps the bot under Discord's limit of 5 edits per
+    5 seconds per message, and an edit also waits for `min_chars` new
+    visible characters. Edits run in the background, so that a slow Discord
+    request never holds up reading the model's stream. Text beyond the
+    message limit rolls over into a new message.
+    """
+    __slots__ = (
+        "_CHANNEL",
+        "_MESSAGES",
+        "_RAW",
+        "_VISIBLE",
+        "_VISIBLELEN",
+        "_FILTER",
+        "_OFFSET",
+        "_SHOWN",
+        "_LASTEDIT",
+        "_FLUSHING",
+        "INTERVAL",
+        "MINCHARS"
+    )
+
+    def __init__(
+            self,
+            channel: Messageable,
+            interval: float = 1.0,
+            min_chars: int = 16
+    ) -> None:
+        """
+        Initializes a StreamedReply instance.
+
+        Args:
+            channel (Messageable): Where to send the reply, e.g. a command context.
+            interval (float): Minimum number of seconds between edits.
+            min_chars (int): Minimum number of new visible characters worth an edit.
+        """
+        self._CHANNEL = channel
+        self._MESSAGES: list[Message] = []
+        self._RAW: list[str] = []
+        self._VISIBLE: list[str] = []
+        self._VISIBLELEN = 0
+        self._FILTER = ThinkFilter()
+        self._OFFSET = 0
+        """
+        How much of the visible text has been finalised into earlier messages.
+        """
+        self._SHOWN = ""
+        """
+        The text currently displayed in the last message.
+        """
+        self._LASTEDIT = 0.0
+        self._FLUSHING: asyncio.Task | None = None
+        """
+        The edit running in the background, if any.
+        """
+        self.INTERVAL = interval
+        self.MINCHARS = min_chars
+
+    @property
+    def text(self) -> str:
+        """
+        The full raw response received so far, including any thinking sections.
+        """
+        return ''.join(self._RAW)
+
+    @property
+    def visible(self) -> str:
+        """
+        The text outside thinking sections received so far.
+        """
+        return ''.join(self._VISIBLE).lstrip()
+
+    @property
+    def thinking_tokens(self) -> int:
+        """
+        The number of streamed tokens spent inside thinking sections.
+        """
+        return self._FILTER.THINKINGTOKENS
+
+    async def start(self) -> None:
+        """
+        Sends the placeholder message which is then edited as tokens arrive.
+        """
+        self._MESSAGES.append(await self._CHANNEL.send(PLACEHOLDER))
+        self._LASTEDIT = monotonic()
+
+    async def feed(self, chunk: str) -> None:
+        """
+        Adds a chunk of the response, starting a background edit of the message once
+        the interval has elapsed and enough new text is visible.
+        Args:
+            chunk (str): The newly generated text.
+        Raises:
+            Exception: The error of a failed background edit.
+        """
+        if not chunk: return
+        self._RAW.append(chunk)
+        self._append_visible(self._FILTER.feed(chunk))
+        if self._FLUSHING is not None and self._FLUSHING.done():
+            flushing, self._FLUSHING = self._FLUSHING, None
+            await flushing
+        if (
+            self._FLUSHING is None
+            and monotonic() - self._LASTEDIT >= self.INTERVAL
+            and self._VISIBLELEN - self._OFFSET - len(self._SHOWN) >= self.MINCHARS
+        ):
+            self._FLUSHING = asyncio.get_running_loop().create_task(self.flush())
+
+    async def _flushed(self) -> None:
+        """
+        Waits for the background edit, if one is running.
+        """
+        if self._FLUSHING is not None:
+            flushing, self._FLUSHING = self._FLUSHING, None
+            await flushing
+
+    def _append_visible(self, text: str) -> None:
+        if not text: return
+        self._VISIBLE.append(text)
+        self._VISIBLELEN += len(text)
+
+    async def flush(self) -> None:
+        """
+        Brings the sent messages up to date with the visible text,
+        rolling over into new messages past the message limit.
+        """
+        if not self._MESSAGES:
+            await self.start()
+
+        current = self.visible[self._OFFSET:]
+        while len(current) > MESSAGE_LIMIT:
+            cut = split_point(current)
+            await self._edit(current[:cut])
+            self._OFFSET += cut
+            current = current[cut:]
+            self._MESSAGES.append(await self._CHANNEL.send(current[:MESSAGE_LIMIT].strip() or PLACEHOLDER))
+            self._SHOWN = current[:MESSAGE_LIMIT]
+
+        await self._edit(current)
+        self._LASTEDIT = monotonic()
+
+    async def finish(self) -> None:
+        """
+        Performs the final edit once the stream has ended.
+        """
+        await self._flushed()
+        self._append_visible(self._FILTER.finish())
+        await self.flush()
+        if not self._SHOWN.strip():
+            await self._edit("I couldn't process your question.")
+
+    async def abort(self, text: str) -> None:
+        """
+        Replaces the message being edited with a notice when the response
+        cannot be completed, so that the placeholder is not left behind.
+        Args:
+            text (str): The notice, e.g. an error message.
+        """
+        if self._FLUSHING is not None:
+            self._FLUSHING.cancel()
+            self._FLUSHING = None
+        if not self._MESSAGES:
+            self._MESSAGES.append(await self._CHANNEL.send(text))
+            return
+        self._SHOWN = ""
+        await self._edit(text)
+
+    async def _edit(self, text: str) -> None:
+        if text == self._SHOWN or not text.strip():
+            return
+        try:
+            await self._MESSAGES[-1].edit(content=text.strip())
+            self._SHOWN = text
+        except HTTPException as err:
+            LOGGER.warning(f"StreamedReply:::Failed to edit message: {err}")
@@ -0,0 +1,15 @@
+from pathlib import Path
+import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Modules which read their configuration at import get placeholders
+for key, value in {
+    'TOKEN': "test-token",
+    'CLIENT_ID': "0",
+    'CLIENT_SECRET': "test-secret-of-at-least-32-bytes",
+    'CODE': "test",
+    'REDIRECT': "http://127.0.0.1/"
+}.items():
+    os.environ.setdefault(key, value)
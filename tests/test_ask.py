@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+import asyncio
+
+from llm import ResponseCache
+import server
+
+
+class Message:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    async def edit(self, content: str) -> None:
+        self.content = content
+
+
+class Context:
+    def __init__(self) -> None:
+        self.channel = SimpleNamespace(id=1)
+        self.command = SimpleNamespace(name="ask")
+        self.messages: list[Message] = []
+
+    async def send(self, content: str) -> Message:
+        self.messages.append(Message(content))
+        return self.messages[-1]
+
+
+class Session:
+    name = "test"
+
+    def __init__(self, *chunks: str, error: Exception | None = None) -> None:
+        self.messages: list[dict] = []
+        self.chunks = chunks
+        self.error = error
+
+    def add_message(self, message: dict) -> None:
+        self.messages.append(message)
+
+    async def achat(self, stream: bool, command: str):
+        async def parts():
+            for chunk in self.chunks:
+                yield {'message': {'role': "assistant", 'content': chunk}}
+            if self.error is not None:
+                raise self.error
+        return parts()
+
+
+def ask(session: Session, question: str, monkeypatch) -> Context:
+    monkeypatch.setattr(server, "session_for", lambda ctx: session)
+    monkeypatch.setattr(server, "CACHE", ResponseCache())
+    ctx = Context()
+    asyncio.run(server.ask.callback(ctx, question=question))
+    return ctx
+
+
+def test_dropped_stream_replaces_the_placeholder(monkeypatch) -> None:
+    session = Session("Drink", " some", error=ConnectionError("Ollama went away"))
+    ctx = ask(session, "How much water?", monkeypatch)
+
+    assert [message.content for message in ctx.messages] == [server.UNANSWERED_MESSAGE]
+    # The question is answered in the history, and nothing was cached
+    assert session.messages[-1] == {'role': "assistant", 'content': server.UNANSWERED_MESSAGE}
+    assert server.CACHE.stats()['entries'] == 0
+
+
+def test_cache_hit_adds_question_and_answer_together(monkeypatch) -> None:
+    cache = ResponseCache()
+    session = Session()
+    calls: list[list[dict]] = []
+    session.extend_messages = calls.append
+    monkeypatch.setattr(server, "session_for", lambda ctx: session)
+    monkeypatch.setattr(server, "CACHE", cache)
+    sent: list[str] = []
+
+    async def deliver(ctx, text: str) -> None:
+        sent.append(text)
+    monkeypatch.setattr(server, "deliver", deliver)
+    cache.put(cache.key("test", None, "How much water?"), "Two litres.")
+
+    asyncio.run(server.ask.callback(Context(), question="how much water"))
+
+    assert sent == ["Two litres."]
+    assert session.messages == []
+    assert calls == [[
+        {'role': "user", 'content': "how much water"},
+        {'role': "assistant", 'content': "Two litres."}
+    ]]
+
+
+def test_streamed_answers_are_cached_stripped(monkeypatch) -> None:
+    monkeypatch.setattr(server.llm_stuff, "RESIDENCY", None)
+    session = Session("  Two", " litres. ", "\n")
+    ask(session, "How much water?", monkeypatch)
+
+    assert server.CACHE.get(server.CACHE.key("test", None, "How much water?")) == "Two litres."
+
+
+def test_cached_answers_are_stripped_on_every_path() -> None:
+    cache = ResponseCache()
+    cache.put("key", "\nTwo litres.  ")
+    assert cache.get("key") == "Two litres."
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import llm.cache
+from llm import ResponseCache, fingerprint, normalize_question
+
+
+def test_trivially_different_questions_share_a_key() -> None:
+    assert normalize_question("  How much  WATER, really?! ") == "how much water really"
+    key = ResponseCache.key("model", "prefix", "How much water?")
+    assert ResponseCache.key("model", "prefix", "how much water") == key
+    assert ResponseCache.key("model", "prefix", "How much   water ?") == key
+    assert ResponseCache.key("other", "prefix", "How much water?") != key
+    assert ResponseCache.key("model", "other", "How much water?") != key
+
+
+def test_prompt_changes_change_the_fingerprint() -> None:
+    prefix = [{'role': "system", 'content': "Be brief."}]
+    assert fingerprint(prefix) == fingerprint([dict(prefix[0])])
+    assert fingerprint(prefix) != fingerprint([{'role': "system", 'content': "Be verbose."}])
+
+
+def test_entries_expire_after_their_ttl(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(llm.cache, "time", lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put("key", "answer")
+
+    now[0] += 59
+    assert cache.get("key") == "answer"
+    now[0] += 2
+    assert cache.get("key") is None
+
+    stats = cache.stats()
+    assert stats['entries'] == 0
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.stats()['entries'] == 2
+
+
+def test_unexpired_entries_survive_a_restart(tmp_path: Path, monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(llm.cache, "time", lambda: now[0])
+    path = tmp_path / "cache.json"
+    cache = ResponseCache(ttl=60, path=path)
+    cache.put("old", "stale")
+    now[0] += 30
+    cache.put("new", "fresh")
+    cache.save()
+
+    now[0] += 40
+    reloaded = ResponseCache(ttl=60, path=path)
+    assert reloaded.get("old") is None
+    assert reloaded.get("new") == "fresh"
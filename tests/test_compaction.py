@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import ollama
+import pytest
+
+from llm import BotSession
+from llm.utils import SUMMARY_TAG
+
+
+def session(tmp_path: Path) -> BotSession:
+    session = BotSession(params="14b", logfile=str(tmp_path / "session.json"), name="test", compact_at=40)
+    for n in range(10):
+        session.add_message({'role': "user" if n % 2 == 0 else "assistant", 'content': f"turn {n} " + "word " * 10})
+    return session
+
+
+def summarize(transcripts: list[str]):
+    def chat(**request) -> ollama.ChatResponse:
+        transcripts.append(request['messages'][-1]['content'])
+        return ollama.ChatResponse(message=ollama.Message(role="assistant", content=" The user asked things. "))
+    return chat
+
+
+def test_oldest_turns_are_folded_into_a_summary(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    transcripts: list[str] = []
+    monkeypatch.setattr(ollama, "chat", summarize(transcripts))
+    compacted = session(tmp_path)
+    newest = compacted.messages[-1]
+
+    compacted._compact()
+
+    head = compacted.messages[0]
+    assert head == {'role': "system", 'content': f"{SUMMARY_TAG}\nThe user asked things."}
+    assert compacted.messages[-1] is newest
+    folded = list(compacted.cold_messages())
+    assert folded and all(f"turn {n} " in transcripts[0] for n in range(len(folded)))
+    assert len(folded) + compacted.message_count - 1 == 10
+
+
+def test_summary_is_discarded_if_the_history_changed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    compacted = session(tmp_path)
+
+    def chat(**request) -> ollama.ChatResponse:
+        # Another command rewrites the head while the summary is generated
+        compacted.prepend_messages([{'role': "system", 'content': "note"}])
+        return ollama.ChatResponse(message=ollama.Message(role="assistant", content="summary"))
+    monkeypatch.setattr(ollama, "chat", chat)
+
+    compacted._compact()
+
+    assert compacted.messages[0] == {'role': "system", 'content': "note"}
+    assert compacted.message_count == 11
+    assert list(compacted.cold_messages()) == []
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+from llm import SessionPool
+from llm.context import ContextWindow, estimate_cache_size
+
+
+def message(role: str, words: int) -> dict:
+    return {'role': role, 'content': " ".join(["word"] * words)}
+
+
+def test_current_turn_is_kept_when_the_prefix_fills_the_budget() -> None:
+    window = ContextWindow(budget=50)
+    prefix = [message("system", 100)]
+    history = [message("user", 5), message("assistant", 5), message("user", 10)]
+
+    messages, stats = window.fit(prefix, history)
+
+    assert messages[0] is prefix[0]
+    assert messages[-1] is history[-1]
+    assert stats['dropped_messages'] == 2
+
+
+def test_current_turn_keeps_its_tool_results() -> None:
+    window = ContextWindow(budget=30)
+    calls = {'role': "assistant", 'content': "", 'tool_calls': [{'function': {'name': "login"}}]}
+    history = [message("user", 40), message("assistant", 40), message("user", 3), calls, message("tool", 30)]
+
+    messages, stats = window.fit([], history)
+
+    assert messages[-3:] == history[-3:]
+    assert stats['dropped_messages'] == 2
+
+
+def test_pooled_sessions_cache_an_estimate_per_message(tmp_path: Path) -> None:
+    sessions = SessionPool(params="14b", name="test", directory=str(tmp_path), max_messages=4096)
+    session = sessions.get("channel-1")
+    assert session._WINDOW._CACHESIZE >= 4096
+    sessions.save_all()
+
+    sessions = SessionPool(params="14b", name="test", directory=str(tmp_path), max_hot_messages=256)
+    session = sessions.get("channel-1")
+    assert session._WINDOW._CACHESIZE == estimate_cache_size(256)
+    sessions.save_all()
+
+
+def test_newest_messages_are_kept_in_order_with_an_omission_note() -> None:
+    window = ContextWindow(budget=60)
+    prefix = [message("system", 5)]
+    history = [message("user", 20), message("assistant", 20), message("user", 5), message("assistant", 5), message("user", 5)]
+
+    messages, stats = window.fit(prefix, history)
+
+    assert messages[0] is prefix[0]
+    assert messages[1]['role'] == "system" and "2 earlier messages omitted" in messages[1]['content']
+    assert messages[2:] == history[2:]
+    assert stats['dropped_messages'] == 2
+    assert stats['sent_messages'] == len(messages)
+    assert stats['prompt_tokens'] <= 60
+
+
+def test_everything_is_sent_within_the_budget() -> None:
+    window = ContextWindow(budget=1000)
+    history = [message("user", 5), message("assistant", 5)]
+
+    messages, stats = window.fit([], history)
+
+    assert messages == history
+    assert stats['dropped_messages'] == 0
+
+
+def test_kept_history_never_starts_with_a_tool_response() -> None:
+    window = ContextWindow(budget=45)
+    calls = {'role': "assistant", 'content': "", 'tool_calls': [{'function': {'name': "login"}}]}
+    # The budget fits the tool response but not the call which requested it
+    history = [message("user", 5), calls, message("tool", 22), message("assistant", 2), message("user", 2)]
+
+    messages, stats = window.fit([], history)
+
+    assert messages[0]['role'] == "system"
+    assert messages[1]['role'] != "tool"
+    assert messages[1:] == history[3:]
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from delivery import Outbox, split_message
+
+
+class Channel:
+    """A destination whose sends fail with the queued errors, in order."""
+
+    def __init__(self, *errors: BaseException | None) -> None:
+        self.id = 1
+        self.errors = list(errors)
+        self.sent: list[str] = []
+
+    async def send(self, text: str) -> str:
+        error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        self.sent.append(text)
+        return text
+
+
+def test_failed_send_fails_its_reply_and_worker_goes_on() -> None:
+    async def run() -> None:
+        outbox = Outbox(rate=100, per=1.0)
+        channel = Channel(ConnectionResetError("dropped"))
+        first = asyncio.ensure_future(outbox.send(channel, "first"))
+        second = asyncio.ensure_future(outbox.send(channel, "second"))
+
+        with pytest.raises(ConnectionResetError):
+            await asyncio.wait_for(first, 1.0)
+        assert await asyncio.wait_for(second, 1.0) == ["second"]
+        assert channel.sent == ["second"]
+
+    asyncio.run(run())
+
+
+def test_stale_reply_raises_timeout() -> None:
+    async def run() -> None:
+        outbox = Outbox(rate=100, per=1.0, stale_after=0.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(outbox.send(Channel(), "late"), 1.0)
+        assert outbox.dropped == 1
+
+    asyncio.run(run())
+
+
+def test_long_text_is_sent_in_order_within_the_limit() -> None:
+    async def run() -> None:
+        outbox = Outbox(rate=100, per=1.0)
+        channel = Channel()
+        text = "\n\n".join(f"Paragraph {i}. " + "word " * 100 for i in range(20))
+        messages = await asyncio.wait_for(outbox.send(channel, text), 1.0)
+
+        assert messages == split_message(text)
+        assert len(messages) > 1
+        assert all(len(message) <= 2000 for message in messages)
+
+    asyncio.run(run())
+
+
+def test_split_message_reopens_code_blocks() -> None:
+    text = "```python\n" + "\n".join(f"print({i})" for i in range(500)) + "\n```"
+    chunks = split_message(text, limit=200)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 200
+        assert chunk.count("```") == 2
+    assert chunks[1].startswith("```python\n")
@@ -0,0 +1,58 @@
+from struct import pack
+from zlib import compress
+
+import pytest
+
+from etf import COMPRESSED, VERSION, ETFError, dumps, loads, py_dumps, py_loads
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    True,
+    False,
+    0,
+    255,
+    256,
+    -1,
+    2**31 - 1,
+    -2**31,
+    2**31,
+    2**60,
+    -2**64,
+    2**2100,
+    1.5,
+    -0.25,
+    "",
+    "MESSAGE_CREATE",
+    "héllo ✓",
+    [],
+    [1, "two", None],
+    {'op': 0, 't': "READY", 's': None, 'd': {'id': 2**60, 'ok': True, 'v': [1.5, "é"]}}
+])
+def test_round_trip(value):
+    assert py_loads(py_dumps(value)) == value
+    assert loads(dumps(value)) == value
+
+
+def test_tuples_become_lists_and_bytes_stay_bytes():
+    assert py_loads(py_dumps((1, 2))) == [1, 2]
+    assert py_loads(py_dumps(b"\xff\xfe")) == b"\xff\xfe"
+    assert py_loads(py_dumps(b"text")) == "text"
+
+
+def test_compressed_term():
+    term = py_dumps({'d': "x" * 1000})[1:]
+    data = bytes((VERSION, COMPRESSED)) + pack(">I", len(term)) + compress(term)
+    assert py_loads(data) == {'d': "x" * 1000}
+
+
+def test_unsupported_type():
+    with pytest.raises(ETFError):
+        py_dumps({1, 2})
+
+
+def test_invalid_data():
+    with pytest.raises(ETFError):
+        py_loads(py_dumps({'op': 0, 'd': "payload"})[:-3])
+    with pytest.raises(ETFError):
+        py_loads(b"\x00\x01")
@@ -0,0 +1,169 @@
+from json import dumps, loads
+from zlib import compressobj, Z_SYNC_FLUSH
+import asyncio
+
+from websockets.exceptions import ConnectionClosed
+from websockets.frames import Close
+
+import server_raw
+from server_raw import (
+    RECONNECT_CLOSE_CODE,
+    ZLIB_SUFFIX,
+    GatewayClient,
+    GatewayOpcode,
+    ZlibStream,
+    peek_header
+)
+
+
+def compressed(messages: list[bytes]) -> list[bytes]:
+    # One stream for the whole connection, flushed after every message like Discord does
+    compressor = compressobj()
+    return [compressor.compress(message) + compressor.flush(Z_SYNC_FLUSH) for message in messages]
+
+
+def test_peek_header_reads_dispatch():
+    raw = b'{"op": 0, "t": "MESSAGE_CREATE", "s": 42, "d": {"op": 9, "t": "NESTED", "s": 7}}'
+    assert peek_header(raw) == (0, "MESSAGE_CREATE", 42)
+
+
+def test_peek_header_reads_nulls():
+    assert peek_header(b'{"op":11,"t":null,"s":null,"d":null}') == (11, None, None)
+
+
+def test_peek_header_ignores_keys_inside_payload():
+    # The header follows the payload, so the only op/t/s are nested ones
+    raw = b'{"d": {"op": 0, "t": "FAKE", "s": 1}, "op": 0, "t": "READY", "s": 2}'
+    assert peek_header(raw) is None
+
+
+def test_zlib_stream_round_trip():
+    messages = [dumps({'op': 0, 't': "EVENT", 's': i, 'd': "x" * i}).encode() for i in range(0, 500, 50)]
+    stream = ZlibStream(capacity=16)
+    for message, data in zip(messages, compressed(messages)):
+        assert data.endswith(ZLIB_SUFFIX)
+        assert stream.feed(data) == message
+    stats = stream.stats()
+    assert stats['messages'] == len(messages)
+    assert stats['decoded_bytes'] == sum(map(len, messages))
+
+
+def test_zlib_stream_joins_fragments():
+    message = dumps({'op': 0, 'd': list(range(1000))}).encode()
+    data = compressed([message])[0]
+    stream = ZlibStream(capacity=8)
+    fragments = [data[i:i + 7] for i in range(0, len(data), 7)]
+    assert all(stream.feed(fragment) is None for fragment in fragments[:-1])
+    assert stream.feed(fragments[-1]) == message
+
+
+def test_zlib_stream_reset_starts_new_stream():
+    stream = ZlibStream()
+    first, second = b'{"op":10}', b'{"op":11}'
+    assert stream.feed(compressed([first])[0]) == first
+    stream.reset()
+    assert stream.feed(compressed([second])[0]) == second
+    assert stream.stats()['messages'] == 2
+
+
+class Socket:
+    """
+    Records what the client sends and how it closes the connection.
+    """
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.closed: int | None = None
+
+    async def send(self, data: str) -> None:
+        self.sent.append(loads(data))
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.closed = code
+
+
+async def no_wait(*_) -> None:
+    return None
+
+
+def connected_client(monkeypatch) -> tuple[GatewayClient, Socket]:
+    monkeypatch.setattr(server_raw, "sleep", no_wait)
+    client = GatewayClient("token", compress=False)
+    client._WS = Socket()
+    return client, client._WS
+
+
+async def receive(client: GatewayClient, payload: dict) -> None:
+    event = client._decode(dumps(payload))
+    if event is not None:
+        await client._receive(event)
+
+
+READY = {
+    'op': 0, 't': "READY", 's': 1,
+    'd': {'session_id': "abc", 'resume_gateway_url': "wss://resume.example", 'user': {'id': "1"}}
+}
+
+
+def test_ready_makes_the_session_resumable(monkeypatch) -> None:
+    client, _ = connected_client(monkeypatch)
+
+    async def run() -> None:
+        await receive(client, READY)
+        # Unhandled dispatches are dropped unread, but their sequence still counts
+        await receive(client, {'op': 0, 't': "PRESENCE_UPDATE", 's': 5, 'd': {}})
+
+    asyncio.run(run())
+    assert client.resumable
+    assert (client.session_id, client.sequence) == ("abc", 5)
+    assert client.dispatch_stats()['dropped'] == 1
+
+
+def test_resumable_invalid_session_reconnects_keeping_the_session(monkeypatch) -> None:
+    client, socket = connected_client(monkeypatch)
+
+    async def run() -> None:
+        await receive(client, READY)
+        await receive(client, {'op': 9, 't': None, 's': None, 'd': True})
+        await client._resume()
+
+    asyncio.run(run())
+    assert socket.closed == RECONNECT_CLOSE_CODE
+    assert client.resumable
+    assert socket.sent == [{
+        'op': GatewayOpcode.RESUME,
+        'd': {'token': "token", 'session_id': "abc", 'seq': 1}
+    }]
+
+
+def test_invalid_session_identifies_afresh(monkeypatch) -> None:
+    client, socket = connected_client(monkeypatch)
+
+    async def run() -> None:
+        await receive(client, READY)
+        await receive(client, {'op': 9, 't': None, 's': None, 'd': False})
+
+    asyncio.run(run())
+    assert socket.closed is None
+    assert not client.resumable
+    assert client.sequence is None
+    assert [message['op'] for message in socket.sent] == [GatewayOpcode.IDENTIFY]
+
+
+def test_run_resumes_at_the_resume_url_and_identifies_after_session_close_codes(monkeypatch) -> None:
+    monkeypatch.setattr(server_raw, "sleep", no_wait)
+    client = GatewayClient("token", url="wss://gateway.example", compress=False)
+    urls: list[str] = []
+
+    async def connect(self: GatewayClient, url: str) -> None:
+        urls.append(url)
+        if len(urls) == 1:
+            self._SESSIONID, self._RESUMEURL, self._SEQ = "abc", "wss://resume.example", 3
+            raise ConnectionClosed(Close(1006, "dropped"), None)
+        if len(urls) == 2:
+            raise ConnectionClosed(Close(4009, "timed out"), None)
+        self._CLOSED = True
+
+    monkeypatch.setattr(GatewayClient, "_connect", connect)
+    asyncio.run(client.run())
+    assert urls == ["wss://gateway.example", "wss://resume.example", "wss://gateway.example"]
+    assert client.sequence is None
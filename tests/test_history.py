@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from llm.history import MessageHistory
+
+
+def message(n: int) -> dict:
+    return {'role': "user" if n % 2 == 0 else "assistant", 'content': f"message {n}"}
+
+
+def test_spilled_messages_stay_readable_in_order(tmp_path: Path) -> None:
+    history = MessageHistory(tmp_path / "session.cold.jsonl", max_messages=8)
+    for n in range(20):
+        history.append(message(n))
+
+    assert len(history) <= 8
+    assert history.cold_count + len(history) == 20
+    assert list(history.all()) == [message(n) for n in range(20)]
+    assert history.hot[-1] == message(19)
+
+
+def test_byte_cap_spills_large_messages(tmp_path: Path) -> None:
+    history = MessageHistory(tmp_path / "session.cold.jsonl", max_bytes=100)
+    history.extend({'role': "user", 'content': "x" * 40} for _ in range(5))
+
+    assert sum(len(msg['content']) for msg in history.hot) <= 100
+    assert history.cold_count + len(history) == 5
+
+
+def test_load_skips_messages_already_spilled(tmp_path: Path) -> None:
+    coldfile = tmp_path / "session.cold.jsonl"
+    history = MessageHistory(coldfile, max_messages=8)
+    for n in range(20):
+        history.append(message(n))
+    spilled = history.cold_count
+
+    # A restart replays the whole stream, positioned from the first message
+    reloaded = MessageHistory(coldfile, max_messages=8)
+    reloaded.load((message(n) for n in range(20)), base=0)
+
+    assert reloaded.cold_count == spilled
+    assert list(reloaded.all()) == [message(n) for n in range(20)]
+
+
+def test_fold_head_archives_the_folded_messages(tmp_path: Path) -> None:
+    coldfile = tmp_path / "session.cold.jsonl"
+    history = MessageHistory(coldfile)
+    history.extend(message(n) for n in range(6))
+    summary = {'role': "system", 'content': "summary of 0 to 3"}
+
+    assert history.fold_head(4, summary)
+
+    assert history.hot == [summary, message(4), message(5)]
+    assert list(history.cold()) == [message(n) for n in range(4)]
+    # Positions continue after the archived messages
+    reloaded = MessageHistory(coldfile)
+    reloaded.load([summary, message(4), message(5)])
+    assert reloaded.cold_count == 4
+    assert reloaded.hot == history.hot
@@ -0,0 +1,65 @@
+from pathlib import Path
+from threading import Thread
+
+from llm.journal import Journal
+from llm import BotSession
+
+
+def contents(journal: Journal) -> list[str]:
+    return [msg['content'] for msg in journal.replay()]
+
+
+def test_replay_snapshot_then_segments(tmp_path: Path) -> None:
+    journal = Journal(tmp_path / "log.json")
+    journal.append([{'role': "user", 'content': "m1"}])
+    through = journal.rotate()
+    journal.write_snapshot([{'role': "user", 'content': "m1"}], through)
+    journal.append([{'role': "user", 'content': "m2"}])
+    journal.close()
+
+    assert contents(Journal(tmp_path / "log.json")) == ["m1", "m2"]
+
+
+def test_older_snapshot_does_not_replace_newer(tmp_path: Path) -> None:
+    journal = Journal(tmp_path / "log.json")
+    journal.append([{'role': "user", 'content': "m1"}])
+    older = journal.rotate()
+    journal.append([{'role': "user", 'content': "m2"}])
+    newer = journal.rotate()
+    journal.write_snapshot([{'role': "user", 'content': "m1"}, {'role': "user", 'content': "m2"}], newer)
+    journal.write_snapshot([{'role': "user", 'content': "m1"}], older)
+    journal.close()
+
+    assert contents(journal) == ["m1", "m2"]
+
+
+def test_append_after_close_is_written(tmp_path: Path) -> None:
+    journal = Journal(tmp_path / "log.json")
+    journal.start()
+    journal.append([{'role': "user", 'content': "m1"}])
+    journal.close()
+    journal.append([{'role': "user", 'content': "m2"}])
+
+    assert contents(Journal(tmp_path / "log.json")) == ["m1", "m2"]
+
+
+def test_concurrent_saves_keep_every_message(tmp_path: Path) -> None:
+    session = BotSession(params="14b", logfile=str(tmp_path / "session.json"), journal=True)
+    expected = []
+
+    def writer(name: str) -> None:
+        for i in range(50):
+            content = f"{name}{i}"
+            session.add_message({'role': "user", 'content': content})
+            expected.append(content)
+            session.save()
+
+    threads = [Thread(target=writer, args=(name,)) for name in "abc"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.close()
+
+    replayed = contents(Journal(tmp_path / "session.json"))
+    assert sorted(replayed) == sorted(expected)
@@ -0,0 +1,64 @@
+from ollama import ChatResponse, Message
+
+from llm import Metrics
+
+
+def samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def test_counters_and_histograms_render_as_prometheus_text() -> None:
+    metrics = Metrics()
+    metrics.inc('orca_tool_errors_total', tool="login", status=504)
+    metrics.inc('orca_tool_errors_total', tool="login", status=504)
+    for value in (0.003, 0.2, 0.2, 45.0):
+        metrics.observe('orca_span_seconds', value, span="ask", command=None)
+
+    text = metrics.render()
+    assert "# TYPE orca_tool_errors_total counter" in text
+    assert "# TYPE orca_span_seconds histogram" in text
+    assert "# TYPE orca_span_seconds_recent gauge" in text
+
+    values = samples(text)
+    assert values['orca_tool_errors_total{status="504",tool="login"}'] == 2
+    # Buckets are cumulative, and labels which are None are left out
+    assert values['orca_span_seconds_bucket{span="ask",le="0.005"}'] == 1
+    assert values['orca_span_seconds_bucket{span="ask",le="0.25"}'] == 3
+    assert values['orca_span_seconds_bucket{span="ask",le="30.0"}'] == 3
+    assert values['orca_span_seconds_bucket{span="ask",le="+Inf"}'] == 4
+    assert values['orca_span_seconds_count{span="ask"}'] == 4
+    assert values['orca_span_seconds_sum{span="ask"}'] == 45.403
+    assert values['orca_span_seconds_recent{span="ask",quantile="0.5"}'] == 0.2
+    assert values['orca_span_seconds_recent{span="ask",quantile="0.99"}'] == 45.0
+
+
+def test_label_values_are_escaped() -> None:
+    metrics = Metrics()
+    metrics.inc('orca_ollama_requests_total', model='say "hi"\\\n')
+
+    assert 'orca_ollama_requests_total{model="say \\"hi\\"\\\\\\n"} 1.0' in metrics.render()
+
+
+def test_ollama_timings_are_recorded_from_the_final_response() -> None:
+    metrics = Metrics()
+    metrics.record_response("model", ChatResponse(
+        message=Message(role="assistant", content=""),
+        done=True,
+        prompt_eval_count=100,
+        prompt_eval_duration=500_000_000,
+        eval_count=20,
+        eval_duration=2_000_000_000,
+        total_duration=3_000_000_000
+    ), "ask")
+
+    values = samples(metrics.render())
+    assert values['orca_ollama_requests_total{command="ask",model="model"}'] == 1
+    assert values['orca_ollama_eval_tokens_total{model="model"}'] == 20
+    assert values['orca_ollama_total_seconds_sum{command="ask",model="model"}'] == 3.0
+    assert metrics.quantiles('orca_ollama_tokens_per_second', model="model", phase="prompt")[0.5] == 200.0
+    assert metrics.quantiles('orca_ollama_tokens_per_second', model="model", phase="eval")[0.5] == 10.0
+    # No load time was reported, so there is no load histogram
+    assert "orca_ollama_load_seconds" not in metrics.render()
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event
+from json import dumps
+
+import pytest
+
+from llm import SessionPool
+
+
+def pool(tmp_path: Path, **kwargs) -> SessionPool:
+    # The memory folder joined with an absolute directory is that directory
+    return SessionPool(params="14b", name="test", directory=str(tmp_path), journal=True, **kwargs)
+
+
+def contents(session) -> list[str]:
+    return [msg['content'] for msg in session.messages]
+
+
+def test_held_session_is_not_evicted(tmp_path: Path) -> None:
+    sessions = pool(tmp_path, max_sessions=1)
+    held = sessions.acquire("channel-1")
+    held.add_message({'role': "user", 'content': "question"})
+
+    # Another conversation arrives while the first command is still running
+    sessions.acquire("channel-2")
+    held.add_message({'role': "assistant", 'content': "answer"})
+
+    assert sessions.get("channel-1") is held
+    assert contents(held) == ["question", "answer"]
+
+
+def test_released_session_is_evicted_and_reloaded(tmp_path: Path) -> None:
+    sessions = pool(tmp_path, max_sessions=1)
+    held = sessions.acquire("channel-1")
+    held.add_message({'role': "user", 'content': "question"})
+    sessions.acquire("channel-2")
+    held.add_message({'role': "assistant", 'content': "answer"})
+
+    sessions.release("channel-1")
+    sessions.release("channel-2")
+    assert "channel-1" not in sessions
+    assert len(sessions) == 1
+
+    reloaded = sessions.get("channel-1")
+    assert reloaded is not held
+    assert contents(reloaded) == ["question", "answer"]
+    sessions.save_all()
+
+
+def test_unpinned_sessions_are_evicted_least_recent_first(tmp_path: Path) -> None:
+    sessions = pool(tmp_path, max_sessions=2)
+    for key in ("a", "b", "c"):
+        sessions.get(key)
+
+    assert "a" not in sessions
+    assert "b" in sessions and "c" in sessions
+    sessions.save_all()
+
+
+def test_failed_load_does_not_pin_forever(tmp_path: Path, monkeypatch) -> None:
+    sessions = pool(tmp_path, max_sessions=1)
+    load = SessionPool._load
+
+    def broken(self, key):
+        raise OSError("disk gone")
+    monkeypatch.setattr(SessionPool, "_load", broken)
+    with pytest.raises(OSError):
+        sessions.acquire("channel-1")
+
+    monkeypatch.setattr(SessionPool, "_load", load)
+    sessions.get("channel-1")
+    sessions.get("channel-2")
+    assert "channel-1" not in sessions
+    sessions.save_all()
+
+
+def test_slow_load_does_not_block_other_keys(tmp_path: Path, monkeypatch) -> None:
+    sessions = pool(tmp_path)
+    load = SessionPool._load
+    started, unblock = Event(), Event()
+    loads: list[str] = []
+
+    def slow(self, key):
+        loads.append(key)
+        if key == "slow":
+            started.set()
+            unblock.wait(5)
+        return load(self, key)
+    monkeypatch.setattr(SessionPool, "_load", slow)
+
+    with ThreadPoolExecutor(3) as executor:
+        first = executor.submit(sessions.acquire, "slow")
+        started.wait(5)
+        second = executor.submit(sessions.acquire, "slow")
+        # Loads of other keys and releases go through while "slow" is loading
+        sessions.get("fast")
+        sessions.release("fast")
+        assert not first.done()
+        unblock.set()
+        assert first.result(5) is second.result(5)
+
+    assert loads.count("slow") == 1
+    sessions.save_all()
+
+
+def test_loading_drops_stored_and_retired_prefix_messages(tmp_path: Path) -> None:
+    prefix = ({'role': "system", 'content': "You are Orca."}, {'role': "system", 'content': "Tools."})
+    retired = {'role': "system", 'content': "/no_think"}
+    history = [prefix[0], retired, prefix[1], {'role': "user", 'content': "question"}]
+    (tmp_path / "channel-1.json").write_text(dumps(history))
+
+    sessions = pool(tmp_path, prefix=prefix, retired_prefix=(retired,))
+    assert contents(sessions.get("channel-1")) == ["question"]
+    sessions.save_all()
+
+    # Dropped once, the saved history no longer has them
+    reloaded = pool(tmp_path).get("channel-1")
+    assert contents(reloaded) == ["question"]
+    reloaded.close()
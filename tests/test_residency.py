@@ -0,0 +1,39 @@
+import asyncio
+import logging
+
+import pytest
+
+import llm.startup
+from llm import ModelResidency
+
+
+class Records(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+def test_failed_pings_back_off(monkeypatch: pytest.MonkeyPatch) -> None:
+    from ollama import AsyncClient
+
+    records = Records()
+    llm.startup.LOGGER.addHandler(records)
+    try:
+        async def run() -> None:
+            # Nothing listens on the discard port
+            monkeypatch.setattr(llm.startup, "_ASYNC_CLIENT", AsyncClient(host="http://127.0.0.1:9"))
+            residency = ModelResidency("test", ping_interval=0.2)
+            residency.start()
+            await asyncio.sleep(1.0)
+            residency._TASK.cancel()
+
+        asyncio.run(run())
+    finally:
+        llm.startup.LOGGER.removeHandler(records)
+
+    failures = [message for message in records.messages if message.startswith("Error pinging")]
+    # 0.2s, then 0.2s, 0.4s and 0.8s apart: a handful, not one per event loop turn
+    assert 1 <= len(failures) <= 4
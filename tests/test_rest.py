@@ -0,0 +1,137 @@
+from json import dumps
+import asyncio
+
+import pytest
+
+import rest
+from rest import RestClient, route_key
+
+
+class Response:
+    def __init__(self, status: int, headers: dict[str, str] | None = None, body: object = None) -> None:
+        self.status = status
+        self.headers = headers or {}
+        self._BODY = dumps(body).encode() if body is not None else b""
+
+    async def read(self) -> bytes:
+        return self._BODY
+
+    async def __aenter__(self) -> "Response":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        return None
+
+
+class Session:
+    """
+    Answers requests with queued responses, recording every request sent.
+    """
+    def __init__(self, *responses: Response) -> None:
+        self.responses = list(responses)
+        self.requests: list[tuple[str, str, dict]] = []
+        self.closed = False
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        self.requests.append((method, url, kwargs['headers']))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def waits(monkeypatch) -> list[float]:
+    waited: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        waited.append(delay)
+
+    monkeypatch.setattr(rest, "sleep", sleep)
+    return waited
+
+
+def client_with(monkeypatch, *responses: Response) -> tuple[RestClient, Session]:
+    session = Session(*responses)
+    monkeypatch.setattr(RestClient, "_session", lambda self: session)
+    return RestClient("token", base_url="https://discord.example/api"), session
+
+
+@pytest.mark.parametrize(("method", "path", "route"), [
+    ("post", "/channels/123/messages", "POST /channels/123/messages"),
+    ("PATCH", "/channels/123/messages/456", "PATCH /channels/123/messages/:id"),
+    ("GET", "/guilds/1/members/2?limit=5", "GET /guilds/1/members/:id"),
+    ("DELETE", "/webhooks/9/token/messages/8", "DELETE /webhooks/9/token/messages/:id"),
+    ("GET", "/users/42", "GET /users/:id")
+])
+def test_route_keeps_only_major_parameters(method: str, path: str, route: str) -> None:
+    assert route_key(method, path) == route
+
+
+def test_routes_sharing_a_bucket_hash_share_a_bucket_per_major_parameter(monkeypatch, waits) -> None:
+    client, _ = client_with(
+        monkeypatch,
+        Response(200, {'X-RateLimit-Bucket': "abc", 'X-RateLimit-Remaining': "0", 'X-RateLimit-Reset-After': "5"})
+    )
+    asyncio.run(client.get("/channels/1/messages/10"))
+    client._ROUTES[route_key("PATCH", "/channels/1/messages/10")] = "abc"
+
+    bucket = client._bucket(route_key("GET", "/channels/1/messages/11"))
+    assert bucket is client._bucket(route_key("PATCH", "/channels/1/messages/12"))
+    assert bucket.delay() > 4.0
+    assert client._bucket(route_key("GET", "/channels/2/messages/10")).delay() == 0.0
+
+
+def test_exhausted_bucket_waits_for_its_reset(monkeypatch, waits) -> None:
+    client, session = client_with(
+        monkeypatch,
+        Response(200, {'X-RateLimit-Remaining': "0", 'X-RateLimit-Reset-After': "2.5"}),
+        Response(200)
+    )
+
+    async def run() -> None:
+        await client.get("/channels/1/messages")
+        await client.get("/channels/1/messages")
+
+    asyncio.run(run())
+    assert len(waits) == 1 and 2.0 < waits[0] <= 2.5
+    assert session.requests[0][2]['Authorization'] == "Bot token"
+
+
+def test_rate_limited_request_is_retried_after_retry_after(monkeypatch, waits) -> None:
+    client, session = client_with(
+        monkeypatch,
+        Response(429, body={'retry_after': 1.5, 'global': False}),
+        Response(200, body={'id': "1"})
+    )
+
+    response = asyncio.run(client.post("/channels/1/messages", json={'content': "hi"}))
+    assert response.ok and response.json() == {'id': "1"}
+    assert len(session.requests) == 2
+    assert len(waits) == 1 and 1.0 < waits[0] <= 1.5
+    assert client._GLOBALRESET == 0.0
+
+
+def test_global_rate_limit_pauses_every_route(monkeypatch, waits) -> None:
+    client, _ = client_with(
+        monkeypatch,
+        Response(429, {'X-RateLimit-Global': "true"}, body={'retry_after': 3.0, 'global': True}),
+        Response(200),
+        Response(200)
+    )
+
+    async def run() -> None:
+        await client.post("/channels/1/messages")
+        await client.get("/users/42")
+
+    asyncio.run(run())
+    assert len(waits) == 2
+    assert all(0.0 < wait <= 3.0 for wait in waits)
+
+
+def test_rate_limit_gives_up_after_max_retries(monkeypatch, waits) -> None:
+    client, session = client_with(monkeypatch, *[Response(429, body={'retry_after': 0.01})] * 3)
+    client.MAXRETRIES = 2
+
+    response = asyncio.run(client.get("/users/42"))
+    assert response.status == 429
+    assert len(session.requests) == 3
+    with pytest.raises(rest.RestError):
+        response.raise_for_status()
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from llm import InferenceScheduler, Priority, SchedulerBusy
+
+
+def test_worker_threads_wait_below_interactive_requests() -> None:
+    async def run() -> list[str]:
+        scheduler = InferenceScheduler(max_in_flight=1)
+        order: list[str] = []
+
+        def compaction() -> None:
+            with scheduler.hold(Priority.SCHEDULED):
+                order.append("scheduled")
+
+        async def ask() -> None:
+            async with scheduler.slot(Priority.ASK):
+                order.append("ask")
+
+        async with scheduler.slot(Priority.ASK):
+            background = asyncio.create_task(asyncio.to_thread(compaction))
+            while scheduler.queued < 1:
+                await asyncio.sleep(0.01)
+            interactive = asyncio.create_task(ask())
+            while scheduler.queued < 2:
+                await asyncio.sleep(0.01)
+            assert order == []
+
+        await asyncio.gather(background, interactive)
+        assert scheduler.stats()['in_flight'] == 0
+        return order
+
+    assert asyncio.run(run()) == ["ask", "scheduled"]
+
+
+def test_hold_before_any_slot_runs_right_away() -> None:
+    scheduler = InferenceScheduler(max_in_flight=1)
+    with scheduler.hold() as waited:
+        assert waited == 0.0
+
+
+def test_hold_refuses_to_block_its_event_loop() -> None:
+    async def run() -> None:
+        scheduler = InferenceScheduler(max_in_flight=1)
+        async with scheduler.slot():
+            pass
+        with pytest.raises(RuntimeError):
+            with scheduler.hold():
+                pass
+
+    asyncio.run(run())
+
+
+def test_queued_requests_run_by_priority_then_arrival() -> None:
+    async def run() -> list[str]:
+        scheduler = InferenceScheduler(max_in_flight=1, max_queue=8)
+        order: list[str] = []
+
+        async def request(name: str, priority: Priority) -> None:
+            async with scheduler.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async with scheduler.slot(Priority.ASK):
+            tasks = []
+            for name, priority in (
+                ("ask 1", Priority.ASK),
+                ("scheduled", Priority.SCHEDULED),
+                ("ask 2", Priority.ASK),
+                ("login", Priority.LOGIN)
+            ):
+                tasks.append(asyncio.create_task(request(name, priority)))
+                await asyncio.sleep(0)
+            assert scheduler.queued == 4
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["login", "ask 1", "ask 2", "scheduled"]
+
+
+def test_requests_beyond_the_queue_are_shed() -> None:
+    async def run() -> dict:
+        scheduler = InferenceScheduler(max_in_flight=2, max_queue=1)
+
+        async def request() -> None:
+            async with scheduler.slot():
+                await asyncio.sleep(0.05)
+
+        tasks = [asyncio.create_task(request()) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            async with scheduler.slot():
+                pass
+        await asyncio.gather(*tasks)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats['admitted'] == 3
+    assert stats['shed'] == 1
+    assert stats['in_flight'] == 0 and stats['queued'] == 0
+
+
+def test_cancelled_waiter_gives_up_its_place() -> None:
+    async def run() -> dict:
+        scheduler = InferenceScheduler(max_in_flight=1)
+        async with scheduler.slot():
+            waiter = asyncio.create_task(scheduler.slot().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats['in_flight'] == 0 and stats['queued'] == 0
@@ -0,0 +1,51 @@
+import pytest
+
+from shards import FATAL_EXIT_CODE, ShardManager
+
+
+class Process:
+    def __init__(self, exitcode: int | None = None) -> None:
+        self.exitcode = exitcode
+
+    def is_alive(self) -> bool:
+        return self.exitcode is None
+
+
+def manager_with(*exitcodes: int | None) -> tuple[ShardManager, list[int]]:
+    manager = ShardManager("token", shard_count=len(exitcodes), max_concurrency=1, setup=None)
+    spawned: list[int] = []
+    for shard_id, exitcode in enumerate(exitcodes):
+        manager._PROCESSES[shard_id] = Process(exitcode)
+        manager._STARTED[shard_id] = 0.0
+    return manager, spawned
+
+
+def test_refused_shard_stops_only_itself(monkeypatch):
+    manager, spawned = manager_with(None, FATAL_EXIT_CODE, None)
+    monkeypatch.setattr(ShardManager, "_spawn", lambda self, shard_id: spawned.append(shard_id))
+
+    manager._supervise()
+    manager._supervise()
+
+    assert manager.refused() == {1}
+    assert spawned == []
+    assert not manager._STOPPING
+
+
+def test_crashed_shard_is_restarted(monkeypatch):
+    manager, spawned = manager_with(None, 1)
+    monkeypatch.setattr(ShardManager, "_spawn", lambda self, shard_id: spawned.append(shard_id))
+
+    manager._supervise()
+
+    assert spawned == [1]
+    assert manager.refused() == set()
+
+
+def test_every_shard_refused_gives_up(monkeypatch):
+    manager, spawned = manager_with(FATAL_EXIT_CODE, FATAL_EXIT_CODE)
+    monkeypatch.setattr(ShardManager, "_spawn", lambda self, shard_id: spawned.append(shard_id))
+
+    with pytest.raises(RuntimeError):
+        manager._supervise()
+    assert spawned == []
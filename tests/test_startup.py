@@ -0,0 +1,107 @@
+from pathlib import Path
+import asyncio
+
+import pytest
+
+from llm import Readiness
+import llm_stuff
+import server
+
+
+def test_import_does_not_read_the_configuration() -> None:
+    assert llm_stuff.POOL is None
+    assert llm_stuff.RESIDENCY is None
+
+
+def test_empty_configuration_fails_the_model_phase(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.json").write_text("{}")
+
+    async def main() -> Readiness:
+        readiness = Readiness()
+        readiness.run("model", llm_stuff.init_model)
+        await readiness.wait("model")
+        return readiness
+
+    readiness = asyncio.run(main())
+    assert readiness.error("model") == "Model configuration file is empty."
+
+
+def check(readiness: Readiness, monkeypatch) -> bool:
+    monkeypatch.setattr(server, "READINESS", readiness)
+    return asyncio.run(server.model_ready(None))
+
+
+def test_commands_wait_for_the_preload(monkeypatch) -> None:
+    readiness = Readiness()
+    readiness.end("model")
+    with pytest.raises(server.WarmingUp):
+        check(readiness, monkeypatch)
+
+    readiness.end("preload")
+    assert check(readiness, monkeypatch)
+
+
+def test_failed_preload_does_not_hold_commands_back(monkeypatch) -> None:
+    readiness = Readiness()
+    readiness.end("model")
+    readiness.end("preload", "ReadTimeout")
+    assert check(readiness, monkeypatch)
+
+
+def test_failed_model_makes_commands_unavailable(monkeypatch) -> None:
+    readiness = Readiness()
+    readiness.end("model", "Model configuration file is empty.")
+    readiness.end("preload", "model failed")
+    with pytest.raises(server.ModelUnavailable):
+        check(readiness, monkeypatch)
+
+
+def test_failed_phase_fails_the_phases_after_it() -> None:
+    ran: list[str] = []
+
+    def model() -> None:
+        raise RuntimeError("Model configuration file is empty.")
+
+    async def preload() -> None:
+        ran.append("preload")
+
+    async def run() -> Readiness:
+        readiness = Readiness()
+        tasks = [
+            readiness.run("model", model),
+            readiness.run("preload", preload, after="model"),
+            readiness.run("cache", preload, after="preload")
+        ]
+        await asyncio.gather(*tasks)
+        return readiness
+
+    readiness = asyncio.run(run())
+    assert ran == []
+    assert readiness.error("model") == "Model configuration file is empty."
+    assert readiness.error("preload") == "model failed"
+    assert readiness.error("cache") == "preload failed"
+    assert "preload" in readiness.summary() and "(failed)" in readiness.summary()
+
+
+def test_phases_run_after_their_dependency_succeeds() -> None:
+    order: list[str] = []
+
+    async def phase(name: str) -> None:
+        order.append(name)
+        await asyncio.sleep(0)
+
+    async def run() -> Readiness:
+        readiness = Readiness()
+        # Started first, but it has to wait for the model
+        preload = readiness.run("preload", phase, "preload", after="model")
+        model = readiness.run("model", phase, "model")
+        readiness.begin("gateway")
+        await asyncio.gather(preload, model)
+        readiness.end("gateway")
+        return readiness
+
+    readiness = asyncio.run(run())
+    assert order == ["model", "preload"]
+    assert all(readiness.ready(name) for name in ("model", "preload", "gateway"))
+    assert readiness.timings()["preload"]["started"] >= readiness.timings()["model"]["started"]
@@ -0,0 +1,101 @@
+import asyncio
+
+from streaming import StreamedReply
+
+
+class Message:
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self.edits: list[float] = []
+
+    async def edit(self, content: str) -> None:
+        self.edits.append(asyncio.get_running_loop().time())
+        self.content = content
+
+
+class Channel:
+    def __init__(self) -> None:
+        self.messages: list[Message] = []
+
+    async def send(self, content: str) -> Message:
+        self.messages.append(Message(content))
+        return self.messages[-1]
+
+
+def test_fast_generation_stays_within_the_edit_rate() -> None:
+    async def run() -> Channel:
+        channel = Channel()
+        reply = StreamedReply(channel, interval=0.1, min_chars=16)
+        await reply.start()
+        # 400 characters per 10 ms, far more than min_chars between intervals
+        for _ in range(50):
+            await reply.feed("word " * 80)
+            await asyncio.sleep(0.01)
+        await reply.finish()
+        return channel
+
+    channel = asyncio.run(run())
+    assert len(channel.messages) > 1
+    for message in channel.messages:
+        # The final edit of a message, when it fills up or the stream ends, is not throttled
+        throttled = message.edits[:-1]
+        gaps = [later - earlier for earlier, later in zip(throttled, throttled[1:])]
+        assert all(gap >= 0.1 for gap in gaps)
+        assert len(message.edits) <= 4
+
+
+def test_thinking_is_hidden_and_kept_in_text() -> None:
+    async def run() -> tuple[StreamedReply, Channel]:
+        channel = Channel()
+        reply = StreamedReply(channel, interval=0.0, min_chars=1)
+        await reply.start()
+        for chunk in ("<think>", "plan", "</think>", "Hello", " there"):
+            await reply.feed(chunk)
+        await reply.finish()
+        return reply, channel
+
+    reply, channel = asyncio.run(run())
+    assert reply.visible == "Hello there"
+    assert channel.messages[-1].content == "Hello there"
+    assert "plan" in reply.text
+
+
+def test_slow_edits_do_not_hold_up_the_stream() -> None:
+    class SlowMessage(Message):
+        async def edit(self, content: str) -> None:
+            await asyncio.sleep(0.3)
+            await super().edit(content)
+
+    class SlowChannel(Channel):
+        async def send(self, content: str) -> Message:
+            self.messages.append(SlowMessage(content))
+            return self.messages[-1]
+
+    async def run() -> tuple[float, SlowChannel]:
+        channel = SlowChannel()
+        reply = StreamedReply(channel, interval=0.0, min_chars=1)
+        await reply.start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(20):
+            await reply.feed("word ")
+            await asyncio.sleep(0)
+        fed = loop.time() - start
+        await reply.finish()
+        return fed, channel
+
+    fed, channel = asyncio.run(run())
+    assert fed < 0.2
+    assert channel.messages[-1].content == ("word " * 20).strip()
+
+
+def test_abort_replaces_the_placeholder() -> None:
+    async def run() -> Channel:
+        channel = Channel()
+        reply = StreamedReply(channel)
+        await reply.start()
+        await reply.abort("busy")
+        return channel
+
+    channel = asyncio.run(run())
+    assert [message.content for message in channel.messages] == ["busy"]
@@ -0,0 +1,40 @@
+import pytest
+
+from utils import ThinkFilter
+
+
+def run(chunks: list[str]) -> tuple[str, ThinkFilter]:
+    think = ThinkFilter()
+    visible = "".join(think.feed(chunk) for chunk in chunks) + think.finish()
+    return visible, think
+
+
+@pytest.mark.parametrize("chunks", [
+    ["<think>plan</think>Hello"],
+    ["<", "think>plan</", "think>Hello"],
+    ["<th", "ink>pl", "an</thi", "nk", ">Hel", "lo"],
+    ["<THINK>plan</Think >Hello"],
+    ['<think mode="deep">plan</think>Hello'],
+    ['<think mo', 'de="deep">plan</think>Hello']
+])
+def test_tags_split_across_chunks_are_removed(chunks: list[str]) -> None:
+    visible, _ = run(chunks)
+    assert visible == "Hello"
+
+
+def test_text_around_sections_is_kept() -> None:
+    visible, think = run(["Before ", "<think>", "hidden", "</think>", " after"])
+    assert visible == "Before  after"
+    assert not think.thinking
+    assert (think.THINKINGTOKENS, think.VISIBLETOKENS) == (2, 3)
+
+
+def test_lone_angle_brackets_are_not_swallowed() -> None:
+    visible, _ = run(["a <", "b", " and x<", "thin"])
+    assert visible == "a <b and x<thin"
+
+
+def test_unclosed_section_hides_the_rest_of_the_stream() -> None:
+    visible, think = run(["Hi<think>still", " going", "</thi"])
+    assert visible == "Hi"
+    assert think.thinking
@@ -0,0 +1,129 @@
+from pathlib import Path
+import asyncio
+
+import pytest
+
+import llm.startup
+from llm import BotSession, thinking_stats
+
+
+class Client:
+    """
+    Streams two thinking parts, then three answer parts, like Ollama does per token.
+    """
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+
+    async def chat(self, **request):
+        from ollama import ChatResponse, Message
+
+        self.requests.append(request)
+
+        async def parts():
+            for thinking in ("Let", " me"):
+                yield ChatResponse(message=Message(role="assistant", content="", thinking=thinking))
+            for content in ("Two", " litres", "."):
+                yield ChatResponse(message=Message(role="assistant", content=content))
+            yield ChatResponse(message=Message(role="assistant", content=""), done=True, eval_count=5)
+        return parts()
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_thinking_is_counted_in_tokens_on_both_paths(tmp_path: Path, monkeypatch, stream: bool) -> None:
+    client = Client()
+    monkeypatch.setattr(llm.startup, "_ASYNC_CLIENT", client)
+    command = f"test-{stream}"
+    session = BotSession(params="14b", logfile=str(tmp_path / "session.json"), name="test")
+    session.add_message({'role': "user", 'content': "How much water?"})
+
+    async def run() -> str:
+        response = await session.achat(stream=stream, command=command)
+        if not stream:
+            return response['message']['content']
+        return "".join([part['message']['content'] async for part in response])
+
+    assert asyncio.run(run()) == "Two litres."
+    stats = thinking_stats()[command]
+    assert stats['generated_tokens'] == 5
+    assert stats['thinking_tokens'] == 2
+    assert stats['delivered_tokens'] == 3
+
+
+class OverthinkingClient:
+    """
+    Thinks for longer than any budget unless thinking is disabled.
+    """
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+        self.closed = False
+
+    async def chat(self, **request):
+        from ollama import ChatResponse, Message
+
+        self.requests.append(request)
+
+        async def thoughts():
+            try:
+                for _ in range(10):
+                    yield ChatResponse(message=Message(role="assistant", content="", thinking="hmm"))
+                yield ChatResponse(message=Message(role="assistant", content="Late."), done=True, eval_count=11)
+            finally:
+                self.closed = True
+
+        async def answer():
+            for content in ("Two", " litres", "."):
+                yield ChatResponse(message=Message(role="assistant", content=content))
+            yield ChatResponse(message=Message(role="assistant", content=""), done=True, eval_count=3)
+
+        return thoughts() if request['think'] else answer()
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_spent_budget_falls_back_to_answering_without_thinking(tmp_path: Path, monkeypatch, stream: bool) -> None:
+    client = OverthinkingClient()
+    monkeypatch.setattr(llm.startup, "_ASYNC_CLIENT", client)
+    command = f"budget-{stream}"
+    session = BotSession(
+        params="14b",
+        logfile=str(tmp_path / "session.json"),
+        name="test",
+        thinking={command: 3}
+    )
+    session.add_message({'role': "user", 'content': "How much water?"})
+
+    async def run() -> str:
+        response = await session.achat(stream=stream, command=command)
+        if not stream:
+            return response['message']['content']
+        return "".join([part['message']['content'] async for part in response])
+
+    assert asyncio.run(run()) == "Two litres."
+    assert [request['think'] for request in client.requests] == [True, False]
+    assert client.closed
+    stats = thinking_stats()[command]
+    assert stats['requests'] == 1
+    assert stats['budget_exceeded'] == 1
+    # The four thinking parts read before giving up are counted with the answer
+    assert stats['thinking_tokens'] == 4
+    assert stats['generated_tokens'] == 7
+    assert stats['delivered_tokens'] == 3
+
+
+def test_thinking_within_budget_is_not_repeated(tmp_path: Path, monkeypatch) -> None:
+    client = Client()
+    monkeypatch.setattr(llm.startup, "_ASYNC_CLIENT", client)
+    session = BotSession(
+        params="14b",
+        logfile=str(tmp_path / "session.json"),
+        name="test",
+        thinking={"within": 5}
+    )
+    session.add_message({'role': "user", 'content': "How much water?"})
+
+    async def run() -> str:
+        response = await session.achat(stream=False, command="within")
+        return response['message']['content']
+
+    assert asyncio.run(run()) == "Two litres."
+    assert len(client.requests) == 1
+    assert thinking_stats()["within"]['budget_exceeded'] == 0
@@ -0,0 +1,66 @@
+from json import loads
+from threading import Event
+
+import pytest
+from ollama import Message
+
+import llm.utils
+from llm.utils import handle_tool_calls
+
+
+def calls(*names_and_args: tuple[str, dict]) -> Message:
+    return Message(role="assistant", tool_calls=[
+        Message.ToolCall(function=Message.ToolCall.Function(name=name, arguments=args))
+        for name, args in names_and_args
+    ])
+
+
+@pytest.fixture
+def tools(monkeypatch) -> dict:
+    release = Event()
+
+    def slow() -> str:
+        release.wait(5)
+        return "late"
+
+    def broken() -> str:
+        raise ValueError("backend down")
+
+    registered = {
+        "echo": lambda text: text,
+        "slow": slow,
+        "broken": broken
+    }
+    for name, func in registered.items():
+        monkeypatch.setitem(llm.utils.TOOLS_LOOKUP, name, func)
+    monkeypatch.setitem(llm.utils.TOOL_POLICIES, "slow", {'executor': "thread", 'timeout': 0.05})
+    yield registered
+    release.set()
+
+
+def error(response: dict) -> dict:
+    return loads(response['content'])['errors'][0]
+
+
+def test_results_come_back_in_call_order(tools) -> None:
+    out = handle_tool_calls(calls(("echo", {'text': "a"}), ("missing", {}), ("echo", {'text': "b"})))
+
+    # Unknown tools are skipped, the rest answer in the order they were called
+    assert [(r['name'], r['content']) for r in out] == [("echo", "a"), ("echo", "b")]
+    assert all(r['role'] == "tool" for r in out)
+
+
+def test_timeout_is_reported_without_holding_the_other_calls(tools) -> None:
+    out = handle_tool_calls(calls(("slow", {}), ("echo", {'text': "done"})))
+
+    assert error(out[0])['status'] == 504
+    assert error(out[0])['title'] == "Tool Timeout"
+    assert out[1]['content'] == "done"
+
+
+def test_failures_are_mapped_to_error_responses(tools) -> None:
+    out = handle_tool_calls(calls(("echo", {'wrong': "argument"}), ("broken", {})))
+
+    assert error(out[0])['status'] == 400
+    assert error(out[1])['status'] == 500
+    assert error(out[1])['details'] == "backend down"
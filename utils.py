@@ -1,53 +1,86 @@
 from logging import getLogger, FileHandler, Formatter
 from pathlib import Path
 from json import dump, load, JSONDecodeError
-from typing import Any, Final, Callable, LiteralString
-import asyncio
-from requests import Response
+from typing import Any, Final
 from os import environ
-from dotenv import load_dotenv
 from datetime import datetime
+from re import compile as re_compile, IGNORECASE, DOTALL
 
 API_ENDPOINT = "https://discord.com/api/v10"
-CLIENT_ID: Final[str | None] = None
-CLIENT_SECRET: Final[str | None] = None
-CODE: Final[str | None] = None
-REDIRECT: Final[str | None] = None
-TOKEN: Final[str | None] = None
+LOGFILE: Final[Path] = Path(__file__).parent.resolve() / "discord.log"
+LOGGER = getLogger("orca")
+LOGGER.setLevel("DEBUG")
 
-try:
-    LOGFILE:Path = Path(__file__).parent.resolve() / "discord.log"
-    LOGFILE.parent.mkdir(parents=True, exist_ok=True)
-    HANDLER = FileHandler(filename=LOGFILE, encoding='utf-8', mode='w')
-    HANDLER.setFormatter(Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"))
-    LOGGER = getLogger("orca")
-    LOGGER.addHandler(HANDLER)
-    LOGGER.setLevel("DEBUG")
-except (IOError, OSError) as err:
-    raise ValueError(f"Failed to set up logging: {err}")
+ENVIRONMENT: Final[tuple[str, ...]] = (
+    "TOKEN",
+    "CLIENT_ID",
+    "CLIENT_SECRET",
+    "CODE",
+    "REDIRECT"
+)
+"""
+The variables the bot requires, available as attributes of this module.
+"""
 
-try:
-    assert load_dotenv(verbose=True), "Failed to load .env file"
+_HANDLER: FileHandler | None = None
+_ENVIRONMENT: dict[str, str] | None = None
 
-    TOKEN = environ.get("TOKEN", None)
-    assert TOKEN is not None, "TOKEN is not set in the environment variables"
 
-    CLIENT_ID = environ.get("CLIENT_ID", None)
-    assert CLIENT_ID is not None, "CLIENT_ID is not set in the environment variables"
+def log_handler() -> FileHandler:
+    """
+    Creates the handler writing to discord.log on first use and attaches it to LOGGER.
+    Until then nothing is written, so importing this module leaves the log file alone.
+    Returns:
+        FileHandler: The handler.
+    Raises:
+        ValueError: If the log file cannot be opened.
+    """
+    global _HANDLER
+    if _HANDLER is None:
+        try:
+            LOGFILE.parent.mkdir(parents=True, exist_ok=True)
+            handler = FileHandler(filename=LOGFILE, encoding='utf-8', mode='w')
+            handler.setFormatter(Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"))
+            LOGGER.addHandler(handler)
+        except (IOError, OSError) as err:
+            raise ValueError(f"Failed to set up logging: {err}")
+        _HANDLER = handler
+    return _HANDLER
 
-    CLIENT_SECRET = environ.get("CLIENT_SECRET", None)
-    assert CLIENT_SECRET is not None, "CLIENT_SECRET is not set in the environment variables"
 
-    CODE = environ.get("CODE", None)
-    assert CODE is not None, "CODE is not set in the environment variables"
+def environment() -> dict[str, str]:
+    """
+    Loads .env and reads the required environment variables on first use.
+    Returns:
+        dict[str, str]: The variables by name.
+    Raises:
+        ValueError: If a variable is not set.
+    """
+    global _ENVIRONMENT
+    if _ENVIRONMENT is None:
+        from dotenv import load_dotenv
 
-    REDIRECT = environ.get("REDIRECT", None)
-    assert REDIRECT is not None, "REDIRECT is not set in the environment variables"
+        try:
+            # A .env file is optional, the variables may also come from the environment
+            load_dotenv(verbose=True)
+            variables = {}
+            for name in ENVIRONMENT:
+                variables[name] = environ.get(name, None)
+                assert variables[name] is not None, f"{name} is not set in the environment variables"
+        except AssertionError as e:
+            LOGGER.error(f"Error loading Environment variables: {e}")
+            raise ValueError(f"Environment variable error: {e}")
+        _ENVIRONMENT = variables
+    return _ENVIRONMENT
 
-except AssertionError as e:
-    LOGGER.error(f"Error loading Environment variables: {e}")
-    raise ValueError(f"Environment variable error: {e}")
 
+def __getattr__(name: str) -> Any:
+    # HANDLER and the environment variables are only set up once they are imported
+    if name == "HANDLER":
+        return log_handler()
+    if name in ENVIRONMENT:
+        return environment()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def write_json(fp: Path, data: dict[str, Any] | None) -> bool:
@@ -96,23 +129,6 @@ def read_json(fp: Path) -> dict[str, Any] | None:
         return None
     
 
-async def req(fn: Callable, url: str, **kwargs) -> Response:
-    """
-    Asynchronously performs a request using the provided function and URL.
-    Args:
-        fn (Callable): The function to use for the request (e.g., requests.get, requests.post).
-        url (str): The URL to which the request will be made.
-        **kwargs: Additional keyword arguments to pass to the request function.
-    Returns:
-        Response: The response object returned by the request function.
-    """
-    kwargs['timeout'] = 30
-    kwargs.setdefault('headers', {})
-    r = await asyncio.to_thread(fn, f"{API_ENDPOINT}{url}", **kwargs)
-    await asyncio.sleep(0.10)
-    return r
-
-
 def check_time(hour: int, minute: int) -> int:
     current = datetime.now()
     
@@ -127,6 +143,11 @@ def check_time(hour: int, minute: int) -> int:
         # Next hour is tomorrow (24 hours from now minus time elapsed today)
         return (24 * 3600) - current_seconds + next_seconds
     
+_THINK_SECTION = re_compile(r'<think\b[^>]*>.*?</think\s*>', IGNORECASE | DOTALL)
+_THINK_OPEN = re_compile(r'<think\b[^>]*>', IGNORECASE)
+_THINK_CLOSE = re_compile(r'</think\s*>', IGNORECASE)
+_BLANK_LINES = re_compile(r'\n\s*\n\s*\n')
+
 def remove_think_tags_section(text: str) -> str:
     """
     Removes the 'thinking' sections from the text, which is enclosed in <think></think> tags.
@@ -135,23 +156,111 @@ def remove_think_tags_section(text: str) -> str:
     Returns:
         str: The text with the <think> section removed.
     """
-    import re
-    
-    # Use regex to remove all <think>...</think> sections (including nested or malformed tags)
+    # Remove all <think>...</think> sections (including nested or malformed tags)
     # This pattern handles:
     # - Multiple sections
     # - Whitespace variations
     # - Case insensitive tags
     # - Potential malformed/unclosed tags
-    pattern = r'<think\b[^>]*>.*?</think>'
-    
-    # Remove all think sections (case insensitive, multiline, dotall)
-    cleaned_text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL)
+    cleaned_text = _THINK_SECTION.sub('', text)
     
     # Clean up any leftover orphaned opening tags that might not have been closed
-    cleaned_text = re.sub(r'<think\b[^>]*>', '', cleaned_text, flags=re.IGNORECASE)
+    cleaned_text = _THINK_OPEN.sub('', cleaned_text)
     
     # Clean up multiple consecutive whitespace/newlines that might be left behind
-    cleaned_text = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned_text)
+    cleaned_text = _BLANK_LINES.sub('\n\n', cleaned_text)
     
     return cleaned_text.strip()
+
+
+class ThinkFilter:
+    """
+    Incremental filter over a token stream which passes through only the text
+    outside <think>...</think> sections.
+    Tags split across chunk boundaries are handled by holding back a trailing
+    fragment which may still turn into a tag. A section which is never closed
+    is treated as thinking until the end of the stream.
+    Every chunk which contributed thinking text is counted as a thinking token,
+    since Ollama streams one token per chunk.
+    """
+    __slots__ = (
+        "_INSIDE",
+        "_CARRY",
+        "THINKINGTOKENS",
+        "VISIBLETOKENS"
+    )
+
+    def __init__(self) -> None:
+        self._INSIDE = False
+        self._CARRY = ""
+        self.THINKINGTOKENS = 0
+        self.VISIBLETOKENS = 0
+
+    @property
+    def thinking(self) -> bool:
+        """
+        Whether the stream is currently inside a thinking section.
+        """
+        return self._INSIDE
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consumes one chunk of the stream.
+        Args:
+            chunk (str): The newly generated text.
+        Returns:
+            str: The visible text which can be emitted so far.
+        """
+        if not chunk: return ""
+        text = self._CARRY + chunk
+        self._CARRY = ""
+        visible = []
+        thought = False
+
+        while text:
+            if self._INSIDE:
+                close = _THINK_CLOSE.search(text)
+                if close is None:
+                    text, self._CARRY = self._hold_back(text, "</think")
+                    thought = thought or bool(text)
+                    break
+                thought = True
+                self._INSIDE = False
+                text = text[close.end():]
+            else:
+                opening = _THINK_OPEN.search(text)
+                if opening is None:
+                    text, self._CARRY = self._hold_back(text, "<think")
+                    visible.append(text)
+                    break
+                visible.append(text[:opening.start()])
+                self._INSIDE = True
+                text = text[opening.end():]
+
+        if thought:
+            self.THINKINGTOKENS += 1
+        else:
+            self.VISIBLETOKENS += 1
+        return "".join(visible)
+
+    def finish(self) -> str:
+        """
+        Ends the stream, releasing held back text which never became a tag.
+        Returns:
+            str: The remaining visible text.
+        """
+        carry, self._CARRY = self._CARRY, ""
+        return "" if self._INSIDE else carry
+
+    @staticmethod
+    def _hold_back(text: str, tag: str) -> tuple[str, str]:
+        """
+        Splits off a trailing fragment of text which could be the start of `tag`,
+        including an opening tag whose attributes have not been closed yet.
+        """
+        start = text.rfind("<")
+        if start == -1: return text, ""
+        tail = text[start:].lower()
+        if tag.startswith(tail) or (tail.startswith(tag) and ">" not in tail):
+            return text[:start], text[start:]
+        return text, ""